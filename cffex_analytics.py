@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中金所持仓排名分析
+功能: 对排名历史做向量化计算 (不逐行循环): 会员净持仓、前5/前20名集中度、
+      按相邻交易日核对增减量, 以及用np.gradient (同slope.py) 计算净持仓变化斜率
+输入: 长表格式的DataFrame, 列为 date/product_id/instrument_id/ranking_type/rank/member_name/volume/change,
+      可来自RankingWarehouse.query_rankings、ParquetStore.read或records_frame
+"""
+
+import numpy as np
+import pandas as pd
+
+from cffex_models import iter_records
+
+COLUMNS = ['date', 'product_id', 'instrument_id', 'ranking_type', 'rank', 'member_name', 'volume', 'change']
+
+
+def records_frame(all_data, all_contracts=False):
+    """
+    将爬取结果转换为分析使用的DataFrame, 合计行不包括在内
+    Args:
+        all_data: get_date_range_data/get_products_range_data返回的结果列表
+        all_contracts: 是否包括每天的全部合约
+    Returns:
+        DataFrame: COLUMNS中的各列
+    """
+    rows = [(r.date, r.product_id, r.instrument_id, r.ranking_type.value, r.rank, r.member_name, r.volume, r.change)
+            for r in iter_records(all_data, all_contracts) if not r.is_total]
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+
+def net_positions(df, by_instrument=False):
+    """
+    计算会员每日的持买、持卖和净持仓
+    Args:
+        df: 排名明细
+        by_instrument: 为True时按合约分别计算, 否则合计同一产品的全部合约
+    Returns:
+        DataFrame: 索引为 (date, product_id[, instrument_id], member_name), 列为long/short/net;
+                   只进入一方排名的会员另一方按0计算
+    """
+    keys = ['date', 'product_id'] + (['instrument_id'] if by_instrument else []) + ['member_name']
+    positions = df[df['ranking_type'].isin(['buy_position_ranking', 'sell_position_ranking'])]
+    wide = positions.pivot_table(index=keys, columns='ranking_type', values='volume',
+                                 aggfunc='sum', fill_value=0, observed=True)
+    wide = wide.reindex(columns=['buy_position_ranking', 'sell_position_ranking'], fill_value=0)
+    wide.columns = ['long', 'short']
+    wide['net'] = wide['long'] - wide['short']
+    return wide
+
+
+def concentration(df, top=(5, 20)):
+    """
+    计算每日各排名的前N名集中度
+    Args:
+        df: 排名明细
+        top: 需要计算的名次范围, 默认前5名和前20名
+    Returns:
+        DataFrame: 索引为 (date, product_id, instrument_id, ranking_type), 列为top5/top20等前N名合计量,
+                   以及 cr5 等 (前N名合计 / 最大N名合计) 占比
+    """
+    keys = ['date', 'product_id', 'instrument_id', 'ranking_type']
+    volume = df['volume'].fillna(0).to_numpy()
+    rank = df['rank'].to_numpy()
+    sums = pd.DataFrame({f'top{n}': np.where(rank <= n, volume, 0) for n in top})
+    for key in keys:
+        sums[key] = df[key].to_numpy()
+    result = sums.groupby(keys, sort=True, observed=True).sum()
+    base = result[f'top{max(top)}'].replace(0, np.nan)
+    for n in top:
+        if n != max(top):
+            result[f'cr{n}'] = result[f'top{n}'] / base
+    return result
+
+
+def check_changes(df):
+    """
+    用相邻交易日的数量之差核对报告的增减量
+    Args:
+        df: 排名明细, 同一产品的交易日按数据中出现的日期确定
+    Returns:
+        DataFrame: 原明细加上 computed_change (与上一交易日的差, 上一交易日未进入排名时为NaN)
+                   和 mismatch (两者都有值且不相等) 两列
+    """
+    keys = ['product_id', 'instrument_id', 'ranking_type', 'member_name']
+    result = df.sort_values(keys + ['date'], kind='stable').reset_index(drop=True)
+    # 每个产品的交易日序号, 用于判断两条记录是否是相邻交易日
+    day_index = result.groupby('product_id', observed=True)['date'].rank(method='dense').to_numpy()
+    same_key = np.ones(len(result), dtype=bool)
+    for key in keys:
+        column = result[key].to_numpy()
+        same_key[1:] &= column[1:] == column[:-1]
+    same_key[0] = False
+
+    volume = result['volume'].to_numpy(dtype=float)
+    previous = np.full(len(result), np.nan)
+    adjacent = same_key.copy()
+    adjacent[1:] &= day_index[1:] - day_index[:-1] == 1
+    previous[1:] = np.where(adjacent[1:], volume[:-1], np.nan)
+
+    result['computed_change'] = volume - previous
+    reported = result['change'].to_numpy(dtype=float)
+    result['mismatch'] = ~np.isnan(result['computed_change'].to_numpy()) & ~np.isnan(reported) \
+        & (result['computed_change'].to_numpy() != reported)
+    return result
+
+
+def net_position_matrix(df, product_id=None):
+    """
+    会员净持仓矩阵
+    Args:
+        df: 排名明细
+        product_id: 只计算该产品, 默认全部产品合计
+    Returns:
+        DataFrame: 行为日期, 列为会员, 值为净持仓; 当天未进入排名时为NaN
+    """
+    if product_id:
+        df = df[df['product_id'] == product_id]
+    net = net_positions(df)['net']
+    return net.groupby(level=['date', 'member_name'], observed=True).sum().unstack('member_name').sort_index()
+
+
+def position_slopes(matrix, window=1):
+    """
+    用np.gradient计算每个会员净持仓随时间的变化斜率 (每自然日)
+    Args:
+        matrix: net_position_matrix返回的矩阵 (日期 x 会员)
+        window: 先按该交易日数做滚动平均再求斜率, 1表示不平滑
+    Returns:
+        DataFrame: 与matrix形状相同的斜率; 日期间隔不均匀 (周末、节假日) 时按实际天数计算
+    """
+    values = matrix.ffill().fillna(0)
+    if window > 1:
+        values = values.rolling(window, min_periods=1).mean()
+    if len(values) < 2:
+        return pd.DataFrame(np.zeros(values.shape), index=matrix.index, columns=matrix.columns)
+    days = pd.to_datetime(pd.Series(matrix.index)).to_numpy().astype('datetime64[D]').astype(float)
+    slopes = np.gradient(values.to_numpy(dtype=float), days, axis=0)
+    return pd.DataFrame(slopes, index=matrix.index, columns=matrix.columns)
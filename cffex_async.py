@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中金所异步下载工具
+功能: 基于asyncio批量下载XML, 使用有界连接池和长连接 (keep-alive), 请求压缩传输,
+      每个请求单独超时, 失败时按指数退避加随机抖动重试; 数百个文件只占用少量连接
+依赖: aiohttp 或 httpx (可选, 只在异步下载时需要, 优先使用aiohttp)
+"""
+
+import asyncio
+import logging
+import random
+import time
+from urllib.parse import urlparse
+
+# 这些状态码通常是临时性的, 重试可能成功; 其他状态码 (如404) 直接返回
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def _import_backend(backend=None):
+    """
+    按需导入HTTP客户端库
+    Args:
+        backend: "aiohttp"或"httpx", 默认优先aiohttp, 未安装时使用httpx
+    Returns:
+        tuple: (库名, 模块)
+    """
+    names = [backend] if backend else ["aiohttp", "httpx"]
+    for name in names:
+        try:
+            return name, __import__(name)
+        except ImportError:
+            continue
+    raise ImportError("异步下载需要aiohttp或httpx, 请先安装: pip install aiohttp")
+
+
+class AsyncFetcher:
+    def __init__(self, headers=None, max_connections=4, timeout=10, retries=3, backoff=0.5, backend=None,
+                 rate_limiter=None, validate=None, metrics=None):
+        """
+        初始化异步下载器
+        Args:
+            headers: 所有请求共用的请求头
+            max_connections: 连接池大小, 同时进行的请求数不超过该值
+            timeout: 每个请求的超时秒数
+            retries: 连接失败、超时或临时性状态码时的最大重试次数
+            backoff: 重试等待的基数秒数, 第n次重试前等待 [0, backoff * 2**n] 内的随机时间
+            backend: "aiohttp"或"httpx", 默认自动选择
+            rate_limiter: 按主机的自适应限速器 (AdaptiveRateLimiter), 每次请求前等待令牌并反馈延迟和错误
+            validate: 校验函数 (内容, Content-Type, 地址) -> bool, 未通过的内容 (如错误页面) 按失败处理并返回None
+            metrics: 运行指标 (CrawlMetrics), 记录下载耗时、字节数和重试次数
+        """
+        self.headers = dict(headers or {})
+        # 两个库都会自动解压gzip/deflate响应
+        self.headers.setdefault('Accept-Encoding', 'gzip, deflate')
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.rate_limiter = rate_limiter
+        self.validate = validate
+        self.metrics = metrics
+        self.backend, self._module = _import_backend(backend)
+        self._client = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def open(self):
+        """创建连接池, 连接在请求之间保持并复用"""
+        if self._client is not None:
+            return
+        if self.backend == "aiohttp":
+            aiohttp = self._module
+            connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=self.max_connections,
+                                             keepalive_timeout=30, ttl_dns_cache=300)
+            self._client = aiohttp.ClientSession(connector=connector, headers=self.headers,
+                                                 timeout=aiohttp.ClientTimeout(total=self.timeout),
+                                                 auto_decompress=True)
+        else:
+            httpx = self._module
+            limits = httpx.Limits(max_connections=self.max_connections,
+                                  max_keepalive_connections=self.max_connections, keepalive_expiry=30)
+            self._client = httpx.AsyncClient(headers=self.headers, limits=limits, timeout=self.timeout)
+
+    async def close(self):
+        """关闭连接池"""
+        if self._client is None:
+            return
+        if self.backend == "aiohttp":
+            await self._client.close()
+        else:
+            await self._client.aclose()
+        self._client = None
+
+    def _errors(self):
+        """可以重试的网络异常类型"""
+        if self.backend == "aiohttp":
+            return (self._module.ClientError, asyncio.TimeoutError)
+        return (self._module.HTTPError,)
+
+    async def _get(self, url, headers=None):
+        """
+        发出一次GET请求
+        Returns:
+            tuple: (状态码, 响应内容, Content-Type)
+        """
+        start = time.perf_counter()
+        if self.backend == "aiohttp":
+            async with self._client.get(url, headers=headers) as response:
+                status, content, content_type = (response.status, await response.read(),
+                                                 response.headers.get('Content-Type'))
+        else:
+            response = await self._client.get(url, headers=headers)
+            status, content, content_type = response.status_code, response.content, response.headers.get('Content-Type')
+        if self.metrics:
+            self.metrics.observe("fetch", time.perf_counter() - start)
+            self.metrics.count("bytes_fetched", len(content))
+        return status, content, content_type
+
+    async def fetch(self, url, headers=None):
+        """
+        下载单个地址, 临时性错误按退避时间重试
+        Args:
+            url: 地址
+            headers: 该请求额外的请求头 (如Referer)
+        Returns:
+            bytes: 响应内容, 非200状态码、未通过校验或重试用尽时返回None
+        """
+        await self.open()
+        host = urlparse(url).netloc
+        for attempt in range(self.retries + 1):
+            if self.rate_limiter:
+                await asyncio.sleep(self.rate_limiter.reserve(host))
+            start = time.monotonic()
+            try:
+                status, content, content_type = await self._get(url, headers)
+                if status == 200:
+                    ok = self.validate is None or self.validate(content, content_type, url)
+                    self._record(host, start, ok)
+                    return content if ok else None
+                self._record(host, start, status not in RETRY_STATUS)
+                if status not in RETRY_STATUS:
+                    logging.info(f"XML请求返回状态码 {status}: {url}")
+                    return None
+                error = f"状态码 {status}"
+            except self._errors() as e:
+                self._record(host, start, False, slow_down=not self._connect_failed(e))
+                error = e
+            if attempt < self.retries:
+                delay = random.uniform(0, self.backoff * (2 ** attempt))
+                logging.info(f"请求失败 ({error}), {delay:.2f} 秒后第 {attempt + 1} 次重试: {url}")
+                if self.metrics:
+                    self.metrics.count("retries", source="async_fetch")
+                await asyncio.sleep(delay)
+        logging.warning(f"XML请求失败: {url}, {error}")
+        return None
+
+    def _connect_failed(self, error):
+        """是否为无法建立连接 (如域名解析失败), 这类错误与服务器负载无关, 不需要减速"""
+        if self.backend == "aiohttp":
+            return isinstance(error, self._module.ClientConnectorError)
+        return isinstance(error, self._module.ConnectError)
+
+    def _record(self, host, start, ok, slow_down=True):
+        """把请求耗时和结果反馈给限速器"""
+        if self.rate_limiter:
+            self.rate_limiter.record(host, time.monotonic() - start, ok, slow_down)
+
+    async def fetch_all(self, requests):
+        """
+        并发下载多个地址, 并发数受连接池大小限制
+        Args:
+            requests: {键: 地址} 或 {键: (地址, 请求头)}
+        Returns:
+            dict: {键: 响应内容或None}
+        """
+        await self.open()
+        semaphore = asyncio.Semaphore(self.max_connections)
+
+        async def fetch_one(key, request):
+            url, headers = request if isinstance(request, tuple) else (request, None)
+            async with semaphore:
+                return key, await self.fetch(url, headers)
+
+        results = await asyncio.gather(*(fetch_one(key, request) for key, request in requests.items()))
+        return dict(results)
+
+
+def fetch_all(requests, **kwargs):
+    """
+    在同步代码中并发下载多个地址
+    Args:
+        requests: {键: 地址} 或 {键: (地址, 请求头)}
+        **kwargs: AsyncFetcher的参数
+    Returns:
+        dict: {键: 响应内容或None}
+    """
+    async def run():
+        async with AsyncFetcher(**kwargs) as fetcher:
+            return await fetcher.fetch_all(requests)
+
+    return asyncio.run(run())
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中金所原始响应本地缓存
+功能: 按 (产品, 日期) 缓存下载的XML/页面内容, 在该交易日发布截止时间之后获取的内容永久有效,
+      之前获取的内容 (数据可能尚未发布) 需要重新验证; 超过容量上限时按最近最少使用淘汰
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+
+
+class ResponseCache:
+    def __init__(self, path, max_bytes=200 * 1024 * 1024, today_ttl=600, publish_cutoff="19:00",
+                 clock=None):
+        """
+        初始化缓存
+        Args:
+            path: SQLite缓存文件路径
+            max_bytes: 压缩后内容的总容量上限 (字节)
+            today_ttl: 发布截止时间之前获取的内容的有效期 (秒)
+            publish_cutoff: 数据发布截止时间 (HH:MM), 在该日期的这一时间之后获取的内容永久有效
+            clock: 返回当前时间的函数, 默认为datetime.now
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.today_ttl = today_ttl
+        self.publish_cutoff = datetime.strptime(publish_cutoff, '%H:%M').time()
+        self.clock = clock or datetime.now
+        self._conn = None
+        self._lock = threading.Lock()
+        # 命中缓存时只在内存中记录访问时间, 下次写入时一并更新, 只读取时不写文件
+        self._accessed = {}
+
+    @property
+    def conn(self):
+        """首次使用时才创建缓存文件"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    hash TEXT PRIMARY KEY,
+                    data BLOB NOT NULL,
+                    size INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS entries (
+                    product_id TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    hash TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (product_id, date, kind)
+                );
+                CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries (last_access);
+            """)
+        return self._conn
+
+    def is_fresh(self, date, fetched_at):
+        """
+        判断缓存内容是否仍然有效: 在该日期发布截止时间之后获取的内容永久有效,
+        之前获取的内容 (可能是发布前的空数据) 超过today_ttl后需要重新获取, 即使日期已经过去
+        """
+        try:
+            published_at = datetime.combine(datetime.strptime(date, '%Y-%m-%d').date(), self.publish_cutoff)
+        except ValueError:
+            published_at = None
+        if published_at is not None and fetched_at >= published_at.timestamp():
+            return True
+        return self.clock().timestamp() - fetched_at < self.today_ttl
+
+    def get(self, product_id, date, kind="xml", allow_stale=False):
+        """
+        读取缓存
+        Args:
+            product_id: 产品代码
+            date: 日期字符串 (格式: YYYY-MM-DD)
+            kind: 内容类型, 如"xml"、"html"
+            allow_stale: 是否返回已过期的内容 (离线模式使用)
+        Returns:
+            bytes: 缓存的原始内容, 未命中时返回None
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT e.fetched_at, b.data FROM entries e JOIN blobs b ON e.hash = b.hash "
+                "WHERE e.product_id = ? AND e.date = ? AND e.kind = ?",
+                (product_id, date, kind)
+            ).fetchone()
+            if row is None:
+                return None
+            fetched_at, data = row
+            if not allow_stale and not self.is_fresh(date, fetched_at):
+                return None
+            self._accessed[(product_id, date, kind)] = self.clock().timestamp()
+        return zlib.decompress(data)
+
+    def put(self, product_id, date, content, kind="xml"):
+        """
+        写入缓存, 相同内容只保存一份, 被替换的内容不再被引用时一并删除
+        Args:
+            product_id: 产品代码
+            date: 日期字符串 (格式: YYYY-MM-DD)
+            content: 原始内容 (bytes)
+            kind: 内容类型, 如"xml"、"html"
+        """
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        digest = hashlib.sha256(content).hexdigest()
+        now = self.clock().timestamp()
+        with self._lock:
+            old = self.conn.execute("SELECT hash FROM entries WHERE product_id = ? AND date = ? AND kind = ?",
+                                    (product_id, date, kind)).fetchone()
+            if self.conn.execute("SELECT 1 FROM blobs WHERE hash = ?", (digest,)).fetchone() is None:
+                data = zlib.compress(content, 6)
+                self.conn.execute("INSERT INTO blobs (hash, data, size) VALUES (?, ?, ?)",
+                                  (digest, data, len(data)))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries (product_id, date, kind, hash, fetched_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (product_id, date, kind, digest, now, now)
+            )
+            if old and old[0] != digest:
+                self._delete_unreferenced(old[0])
+            self._flush_accessed()
+            self._evict()
+            self.conn.commit()
+
+    def _delete_unreferenced(self, digest):
+        """删除不再被任何条目引用的内容, 返回是否删除"""
+        return self.conn.execute(
+            "DELETE FROM blobs WHERE hash = ? AND NOT EXISTS (SELECT 1 FROM entries WHERE hash = ?)",
+            (digest, digest)
+        ).rowcount > 0
+
+    def _flush_accessed(self):
+        """把内存中记录的访问时间写入条目, 淘汰前按最新的访问顺序排列"""
+        if self._accessed:
+            self.conn.executemany(
+                "UPDATE entries SET last_access = ? WHERE product_id = ? AND date = ? AND kind = ?",
+                [(accessed_at, *key) for key, accessed_at in self._accessed.items()]
+            )
+            self._accessed = {}
+
+    def _evict(self):
+        """超过容量上限时删除最近最少使用的条目"""
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self.conn.execute(
+            "SELECT e.product_id, e.date, e.kind, e.hash, b.size FROM entries e JOIN blobs b ON e.hash = b.hash "
+            "ORDER BY e.last_access"
+        ).fetchall()
+        evicted = 0
+        for product_id, date, kind, digest, size in rows:
+            if total <= self.max_bytes:
+                break
+            self.conn.execute("DELETE FROM entries WHERE product_id = ? AND date = ? AND kind = ?",
+                              (product_id, date, kind))
+            # 同一内容可能被多个条目引用, 只有不再被引用时才真正释放空间
+            if self._delete_unreferenced(digest):
+                total -= size
+            evicted += 1
+        logging.info(f"缓存超过容量上限，淘汰 {evicted} 个条目")
+
+    def stats(self):
+        """
+        缓存统计信息
+        Returns:
+            dict: 条目数、内容数和占用字节数
+        """
+        with self._lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            blobs, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        return {"entries": entries, "blobs": blobs, "bytes": size, "max_bytes": self.max_bytes}
+
+    def close(self):
+        """关闭缓存文件"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中金所交易日历
+功能: 按周末规则、休市日文件和已知无数据日期规划需要爬取的交易日
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+
+# 默认的休市日文件和无数据日期缓存放在模块所在目录, 定时任务从其他目录启动时也使用同一份文件
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_HOLIDAY_FILE = os.path.join(MODULE_DIR, "cffex_holidays.txt")
+DEFAULT_NO_DATA_FILE = os.path.join(MODULE_DIR, "cffex_no_data_dates.json")
+
+
+class TradingCalendar:
+    def __init__(self, holiday_file=DEFAULT_HOLIDAY_FILE, no_data_file=DEFAULT_NO_DATA_FILE):
+        """
+        初始化交易日历
+        Args:
+            holiday_file: 休市日文件, 每行一个YYYY-MM-DD日期, 不存在时只按周末判断 (会记录警告)
+            no_data_file: 已知无数据日期的缓存文件, 为None时不持久化
+        """
+        self.holiday_file = holiday_file
+        self.no_data_file = no_data_file
+        self.holidays = self.load_holidays(holiday_file)
+        # {产品代码: set(日期)}, 由爬取结果中的"无数据"自动学习
+        self.no_data_dates = {}
+        self._lock = threading.Lock()
+        self.load_no_data_dates()
+
+    @staticmethod
+    def load_holidays(holiday_file):
+        """读取休市日文件"""
+        holidays = set()
+        if not holiday_file:
+            return holidays
+        if not os.path.exists(holiday_file):
+            logging.warning(f"休市日文件不存在, 只按周末判断交易日: {holiday_file}")
+            return holidays
+        with open(holiday_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                try:
+                    datetime.strptime(line, '%Y-%m-%d')
+                except ValueError:
+                    logging.warning(f"休市日文件中的日期格式不正确: {line}")
+                    continue
+                holidays.add(line)
+        return holidays
+
+    def load_no_data_dates(self):
+        """读取已知无数据日期缓存"""
+        if not self.no_data_file or not os.path.exists(self.no_data_file):
+            return
+        try:
+            with open(self.no_data_file, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            self.no_data_dates = {product_id: set(dates) for product_id, dates in saved.items()}
+        except (OSError, ValueError) as e:
+            logging.warning(f"读取无数据日期缓存失败: {e}")
+
+    def save_no_data_dates(self):
+        """保存已知无数据日期缓存"""
+        if not self.no_data_file:
+            return
+        with self._lock:
+            saved = {product_id: sorted(dates) for product_id, dates in self.no_data_dates.items()}
+        try:
+            with open(self.no_data_file, 'w', encoding='utf-8') as f:
+                json.dump(saved, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            logging.warning(f"保存无数据日期缓存失败: {e}")
+
+    def mark_no_data(self, date_str, product_id):
+        """
+        记录某产品在某日无数据, 之后的规划会跳过该日期
+        Args:
+            date_str: 日期字符串 (格式: YYYY-MM-DD)
+            product_id: 产品代码
+        """
+        # 当天的数据可能尚未发布, 不记录
+        if date_str >= datetime.now().strftime('%Y-%m-%d'):
+            return
+        with self._lock:
+            dates = self.no_data_dates.setdefault(product_id, set())
+            if date_str in dates:
+                return
+            dates.add(date_str)
+        logging.info(f"记录无数据日期: {product_id} {date_str}")
+        self.save_no_data_dates()
+
+    def is_trading_day(self, date_str, product_id=None):
+        """
+        判断是否需要爬取该日期
+        Args:
+            date_str: 日期字符串 (格式: YYYY-MM-DD)
+            product_id: 产品代码, 指定时同时排除该产品已知的无数据日期
+        Returns:
+            bool: 是否为交易日
+        """
+        if datetime.strptime(date_str, '%Y-%m-%d').weekday() >= 5:
+            return False
+        if date_str in self.holidays:
+            return False
+        if product_id and date_str in self.no_data_dates.get(product_id, ()):
+            return False
+        return True
+
+    def trading_days(self, start_date, end_date, product_id=None):
+        """
+        规划日期范围内需要爬取的交易日
+        Args:
+            start_date: 开始日期字符串 (格式: YYYY-MM-DD)
+            end_date: 结束日期字符串 (格式: YYYY-MM-DD)
+            product_id: 产品代码
+        Returns:
+            list: YYYY-MM-DD格式的交易日列表
+        """
+        current_date = datetime.strptime(start_date, '%Y-%m-%d')
+        end_dt = datetime.strptime(end_date, '%Y-%m-%d')
+        days = []
+        while current_date <= end_dt:
+            date_str = current_date.strftime('%Y-%m-%d')
+            if self.is_trading_day(date_str, product_id):
+                days.append(date_str)
+            current_date += timedelta(days=1)
+        return days
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中金所爬取断点记录
+功能: 以追加写入的日志文件记录已完成和失败的 (产品, 日期) 任务,
+      中断后从上次进度继续, 只对失败的任务按指数退避重试
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from cffex_metrics import get_shared_metrics
+
+
+class CrawlCheckpoint:
+    def __init__(self, path="cffex_checkpoint.jsonl", max_attempts=5, base_delay=2.0, max_delay=300.0,
+                 metrics=None):
+        """
+        初始化断点记录
+        Args:
+            path: 断点日志文件路径, 每行一条JSON记录
+            max_attempts: 单个任务最多尝试次数, 超过后不再自动重试
+            base_delay: 重试退避的基础等待秒数
+            max_delay: 重试退避的最大等待秒数
+            metrics: 运行指标 (CrawlMetrics), 默认使用进程内共享的指标
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.metrics = metrics or get_shared_metrics()
+        # {(产品, 日期): 状态}, 状态为"done"或"no_data"
+        self.completed = {}
+        # {(产品, 日期): {"attempts": 次数, "error": 错误信息, "next_retry": 时间戳}}
+        self.failed = {}
+        self._lock = threading.Lock()
+        self._journal_lines = 0
+        self.load()
+
+    def load(self):
+        """重放断点日志, 恢复上次的进度"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # 进程被中断时最后一行可能不完整
+                    continue
+                self._journal_lines += 1
+                self._apply(entry)
+        logging.info(f"已加载断点记录: 完成 {len(self.completed)} 个任务, 失败 {len(self.failed)} 个任务")
+        # 日志中被覆盖的旧记录过多时压缩
+        if self._journal_lines > 2 * (len(self.completed) + len(self.failed)) + 100:
+            self.compact()
+
+    def _apply(self, entry):
+        unit = (entry['product_id'], entry['date'])
+        if entry['status'] == 'failed':
+            self.failed[unit] = {
+                "attempts": entry.get('attempts', 1),
+                "error": entry.get('error', ''),
+                "next_retry": entry.get('next_retry', 0)
+            }
+        else:
+            self.completed[unit] = entry['status']
+            self.failed.pop(unit, None)
+
+    def _append(self, entry):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._journal_lines += 1
+
+    def compact(self):
+        """按当前状态重写断点日志"""
+        with self._lock:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for (product_id, date), status in sorted(self.completed.items()):
+                    f.write(json.dumps({"product_id": product_id, "date": date, "status": status},
+                                       ensure_ascii=False) + '\n')
+                for (product_id, date), info in sorted(self.failed.items()):
+                    f.write(json.dumps({"product_id": product_id, "date": date, "status": "failed", **info},
+                                       ensure_ascii=False) + '\n')
+            os.replace(tmp_path, self.path)
+            self._journal_lines = len(self.completed) + len(self.failed)
+
+    def is_completed(self, product_id, date):
+        """任务是否已经完成 (包括确认无数据)"""
+        return (product_id, date) in self.completed
+
+    def mark_completed(self, product_id, date, status="done"):
+        """
+        记录任务完成
+        Args:
+            product_id: 产品代码
+            date: 日期字符串 (格式: YYYY-MM-DD)
+            status: "done"=获取到数据, "no_data"=确认无数据
+        """
+        entry = {"product_id": product_id, "date": date, "status": status}
+        with self._lock:
+            self._apply(entry)
+            self._append(entry)
+
+    def mark_failed(self, product_id, date, error):
+        """
+        记录任务失败, 并计算下次重试时间
+        Returns:
+            int: 该任务累计失败次数
+        """
+        with self._lock:
+            attempts = self.failed.get((product_id, date), {}).get('attempts', 0) + 1
+            entry = {
+                "product_id": product_id,
+                "date": date,
+                "status": "failed",
+                "attempts": attempts,
+                "error": str(error),
+                "next_retry": time.time() + self.backoff_delay(attempts)
+            }
+            self._apply(entry)
+            self._append(entry)
+        return attempts
+
+    def backoff_delay(self, attempts):
+        """第attempts次失败后的等待秒数: 指数退避加随机抖动"""
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def watermark(self, product_id, planned_dates):
+        """
+        计算水位: 计划日期中从头开始连续完成的最后一天
+        Args:
+            product_id: 产品代码
+            planned_dates: 按时间排序的计划日期列表
+        Returns:
+            str: 水位日期, 一个都没完成时返回None
+        """
+        mark = None
+        for date in planned_dates:
+            if not self.is_completed(product_id, date):
+                break
+            mark = date
+        return mark
+
+    def pending(self, units):
+        """
+        过滤掉已完成和已放弃重试的任务
+        Args:
+            units: (产品, 日期) 列表
+        Returns:
+            list: 仍需获取的 (产品, 日期) 列表
+        """
+        pending_units = []
+        for product_id, date in units:
+            if self.is_completed(product_id, date):
+                continue
+            if self.failed.get((product_id, date), {}).get('attempts', 0) >= self.max_attempts:
+                logging.warning(f"{product_id} {date} 已失败 {self.max_attempts} 次，不再自动重试")
+                continue
+            pending_units.append((product_id, date))
+        return pending_units
+
+    def retry_candidates(self, units=None):
+        """
+        需要重试的失败任务, 按下次重试时间排序
+        Args:
+            units: 只在这些 (产品, 日期) 中查找, 为None时返回全部失败任务
+        Returns:
+            list: (产品, 日期, 下次重试时间戳) 列表
+        """
+        with self._lock:
+            failed = dict(self.failed)
+        scope = set(units) if units is not None else None
+        candidates = [
+            (product_id, date, info['next_retry'])
+            for (product_id, date), info in failed.items()
+            if info['attempts'] < self.max_attempts and (scope is None or (product_id, date) in scope)
+        ]
+        return sorted(candidates, key=lambda c: c[2])
+
+    def record_result(self, product_id, date, result):
+        """
+        根据get_product_data的返回结果记录任务状态
+        Args:
+            product_id: 产品代码
+            date: 日期字符串 (格式: YYYY-MM-DD)
+            result: get_product_data返回的字典
+        """
+        if result and result.get('success'):
+            self.mark_completed(product_id, date, "done")
+        elif result and result.get('no_data'):
+            self.mark_completed(product_id, date, "no_data")
+        else:
+            error = result.get('error', '未知错误') if result else '未获取到结果'
+            attempts = self.mark_failed(product_id, date, error)
+            logging.warning(f"{product_id} {date} 第 {attempts} 次失败: {error}")
+
+    def retry_failures(self, fetch_func, units=None):
+        """
+        按退避时间依次重试失败的任务, 直到全部成功或达到最大尝试次数
+        Args:
+            fetch_func: 获取函数, 参数为 (产品, 日期), 返回get_product_data格式的结果
+            units: 只重试这些 (产品, 日期), 为None时重试全部失败任务
+        Returns:
+            list: 重试成功的结果
+        """
+        return list(self.iter_retries(fetch_func, units))
+
+    def iter_retries(self, fetch_func, units=None, record_success=True):
+        """
+        逐个返回重试成功的结果, 参数同retry_failures
+        Args:
+            record_success: 是否立即记录成功; 为False时由调用方在数据保存后调用record_result
+        Yields:
+            dict: 重试成功的结果
+        """
+        recovered = set()
+        while True:
+            candidates = [c for c in self.retry_candidates(units) if (c[0], c[1]) not in recovered]
+            if not candidates:
+                break
+            product_id, date, next_retry = candidates[0]
+            wait_time = next_retry - time.time()
+            if wait_time > 0:
+                logging.info(f"等待 {wait_time:.1f} 秒后重试 {product_id} {date}")
+                time.sleep(wait_time)
+            try:
+                result = fetch_func(product_id, date)
+            except Exception as e:
+                result = {"success": False, "error": f"重试时发生错误: {e}"}
+            self.metrics.count("retries", source="checkpoint", outcome="success" if result.get('success') else "failed")
+            if result.get('success'):
+                logging.info(f"重试成功: {product_id} {date}")
+                recovered.add((product_id, date))
+                if record_success:
+                    self.record_result(product_id, date, result)
+                yield result
+            else:
+                self.record_result(product_id, date, result)
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中金所持仓数据爬虫命令行
+功能: crawl (爬取单日数据)、backfill (补爬日期范围)、export (历史文件转换为CSV/Parquet/SQLite/Excel)、
+      query (查询数据仓库)、cache (缓存统计)、daemon (定时爬取);
+      模块加载时只导入标准库, pandas、selenium等依赖在子命令真正需要时才导入,
+      定时任务中的XML爬取不需要承担浏览器和pandas的导入开销
+
+用法:
+    python cffex_cli.py crawl IF IM --date 2025-09-12
+    python cffex_cli.py backfill IF IM 2025-09-01 2025-09-12 --sqlite cffex_rankings.db
+    python cffex_cli.py export archive/ --parquet cffex_parquet
+    python cffex_cli.py query --product IF --start 2025-09-08 --member 中信期货(代客)
+    python cffex_cli.py cache stats
+"""
+
+import argparse
+import json
+import os
+import sys
+
+
+def _make_spider(args, fetch_mode=None):
+    from cffex_spider import CFFEXSpider
+
+    return CFFEXSpider(fetch_mode=fetch_mode or args.mode,
+                       cache=None if args.no_cache else args.cache,
+                       offline=args.offline)
+
+
+def _make_sinks(args):
+    """按 --csv/--parquet/--sqlite/--excel 参数创建输出目标"""
+    from cffex_pipeline import AmountCsvSink, CsvSink, ExcelSink, ParquetSink, SQLiteSink
+
+    sinks = []
+    if args.csv:
+        sinks.append(CsvSink(args.csv))
+    if args.parquet:
+        sinks.append(ParquetSink(args.parquet))
+    if args.sqlite:
+        sinks.append(SQLiteSink(args.sqlite))
+    if args.excel:
+        sinks.append(ExcelSink(args.excel, sheet_by="product"))
+    if getattr(args, 'amounts_csv', None):
+        sinks.append(AmountCsvSink(args.amounts_csv))
+    return sinks
+
+
+def _write_metrics(args, spider):
+    if args.metrics_json:
+        spider.metrics.write_json(args.metrics_json)
+    if args.metrics_prom:
+        spider.metrics.write_prometheus(args.metrics_prom)
+
+
+def cmd_crawl(args):
+    """爬取各产品单日的数据, 每个产品保存为一个CSV文件"""
+    spider = _make_spider(args)
+    failed = 0
+    try:
+        for product_id in args.products:
+            result = spider.get_product_data(product_id, args.date)
+            if not result.get('success'):
+                failed += 1
+                print(f"❌ {product_id}: {result.get('error', '未知错误')}")
+                continue
+            date = result.get('date')
+            filename = os.path.join(args.output_dir, f"cffex_{product_id}_{date.replace('-', '')}.csv")
+            spider.save_to_csv(result, filename)
+            if result.get('position_amounts'):
+                spider.save_position_amounts_to_csv([result], os.path.join(
+                    args.output_dir, f"cffex_amounts_{product_id}_{date.replace('-', '')}.csv"))
+            if args.excel:
+                spider.save_to_excel(result, filename[:-4] + '.xlsx')
+            print(f"✅ {product_id} {date}: {filename}")
+    finally:
+        spider.close()
+        _write_metrics(args, spider)
+    return 1 if failed else 0
+
+
+def cmd_backfill(args):
+    """补爬日期范围内的数据, 边爬取边写入输出目标"""
+    sinks = _make_sinks(args)
+    if not sinks:
+        print("❌ 请至少指定一个输出目标: --csv/--parquet/--sqlite/--excel/--amounts-csv")
+        return 2
+    checkpoint = None
+    if args.checkpoint:
+        from cffex_checkpoint import CrawlCheckpoint
+        checkpoint = CrawlCheckpoint(args.checkpoint)
+
+    spider = _make_spider(args)
+    try:
+        written = spider.stream_range_data(args.products, args.start, args.end, sinks, checkpoint=checkpoint,
+                                           max_workers=args.workers, rate=args.rate)
+    finally:
+        spider.close()
+        _write_metrics(args, spider)
+    print(f"✅ 共写入 {written} 条记录")
+    return 0
+
+
+def cmd_export(args):
+    """把历史结果文件 (CSV/Excel/XML/页面) 转换写入输出目标"""
+    from cffex_reader import migrate_archive
+
+    sinks = _make_sinks(args)
+    if not sinks:
+        print("❌ 请至少指定一个输出目标: --csv/--parquet/--sqlite/--excel")
+        return 2
+    written = migrate_archive(args.paths, sinks)
+    print(f"✅ 共写入 {written} 条记录")
+    return 0
+
+
+def cmd_query(args):
+    """查询SQLite数据仓库中的排名明细"""
+    from cffex_warehouse import RankingWarehouse
+
+    if not os.path.exists(args.db):
+        print(f"❌ 数据仓库不存在: {args.db}")
+        return 1
+    warehouse = RankingWarehouse(args.db)
+    try:
+        df = warehouse.query_rankings(product_id=args.product, start_date=args.start, end_date=args.end,
+                                      member_name=args.member, ranking_type=args.ranking_type,
+                                      instrument_id=args.instrument)
+    finally:
+        warehouse.close()
+    if args.limit:
+        df = df.head(args.limit)
+    if args.format == "csv":
+        df.to_csv(sys.stdout, index=False)
+    else:
+        print(df.to_string(index=False) if len(df) else "没有符合条件的记录")
+    return 0
+
+
+def cmd_cache(args):
+    """显示响应缓存的统计信息"""
+    from cffex_cache import ResponseCache
+
+    if not os.path.exists(args.cache):
+        print(f"❌ 缓存文件不存在: {args.cache}")
+        return 1
+    cache = ResponseCache(args.cache)
+    try:
+        stats = cache.stats()
+    finally:
+        cache.close()
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+    return 0
+
+
+def cmd_daemon(args):
+    """常驻运行, 每个交易日收盘后轮询并在数据发布后立即爬取"""
+    from cffex_scheduler import DailyScheduler
+
+    spider = _make_spider(args, fetch_mode="xml")
+    scheduler = DailyScheduler(spider, product_ids=args.products, poll_start=args.poll_start,
+                               deadline=args.deadline, poll_interval=args.poll_interval,
+                               output_dir=args.output_dir)
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        print("\n⚠️ 用户中断程序")
+    finally:
+        scheduler.close()
+        spider.close()
+        _write_metrics(args, spider)
+    return 0
+
+
+def build_parser():
+    """
+    构造命令行参数解析器
+    Returns:
+        ArgumentParser: 各子命令的处理函数保存在func参数中
+    """
+    parser = argparse.ArgumentParser(description="中金所持仓数据爬虫")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    fetch = argparse.ArgumentParser(add_help=False)
+    fetch.add_argument('--mode', choices=["xml", "selenium", "auto"], default="xml",
+                       help="获取方式, 默认只直接下载XML (不启动浏览器)")
+    fetch.add_argument('--cache', default="cffex_cache.db", help="响应缓存文件")
+    fetch.add_argument('--no-cache', action='store_true', help="不使用本地响应缓存")
+    fetch.add_argument('--offline', action='store_true', help="离线模式, 只使用本地缓存的数据")
+    fetch.add_argument('--metrics-json', help="结束后保存指标摘要 (JSON) 的路径")
+    fetch.add_argument('--metrics-prom', help="结束后保存Prometheus文本文件的路径")
+
+    sinks = argparse.ArgumentParser(add_help=False)
+    sinks.add_argument('--csv', help="追加写入的CSV文件")
+    sinks.add_argument('--parquet', help="Parquet数据集目录")
+    sinks.add_argument('--sqlite', help="SQLite数据仓库文件")
+    sinks.add_argument('--excel', help="Excel文件 (每个产品一个工作表, 流式写入)")
+
+    crawl = subparsers.add_parser("crawl", parents=[fetch], help="爬取单日数据")
+    crawl.add_argument('products', nargs='+', help="产品代码, 如 IF IM")
+    crawl.add_argument('--date', help="日期 (YYYY-MM-DD), 默认为最近的交易日")
+    crawl.add_argument('--output-dir', default=".", help="CSV文件保存目录")
+    crawl.add_argument('--excel', action='store_true', help="同时保存Excel文件")
+    crawl.set_defaults(func=cmd_crawl)
+
+    backfill = subparsers.add_parser("backfill", parents=[fetch, sinks], help="补爬日期范围内的数据")
+    backfill.add_argument('products', nargs='+', help="产品代码, 如 IF IM")
+    backfill.add_argument('start', help="开始日期 (YYYY-MM-DD)")
+    backfill.add_argument('end', help="结束日期 (YYYY-MM-DD)")
+    backfill.add_argument('--workers', type=int, default=4, help="并发线程数")
+    backfill.add_argument('--rate', type=float, default=2.0, help="每个主机的初始每秒请求数")
+    backfill.add_argument('--checkpoint', help="断点记录文件, 中断后可以继续")
+    backfill.add_argument('--amounts-csv', help="追加写入按会员类别汇总数据 (总成交量/持买/持卖) 的CSV文件")
+    backfill.set_defaults(func=cmd_backfill)
+
+    export = subparsers.add_parser("export", parents=[sinks], help="历史结果文件转换为CSV/Parquet/SQLite/Excel")
+    export.add_argument('paths', nargs='+', help="文件或目录")
+    export.set_defaults(func=cmd_export)
+
+    query = subparsers.add_parser("query", help="查询数据仓库")
+    query.add_argument('--db', default="cffex_rankings.db", help="SQLite数据仓库文件")
+    query.add_argument('--product', help="产品代码")
+    query.add_argument('--start', help="开始日期 (YYYY-MM-DD)")
+    query.add_argument('--end', help="结束日期 (YYYY-MM-DD)")
+    query.add_argument('--member', help="会员简称或partyid")
+    query.add_argument('--ranking-type', choices=["volume_ranking", "buy_position_ranking", "sell_position_ranking"],
+                       help="排名类型")
+    query.add_argument('--instrument', help="合约代码")
+    query.add_argument('--limit', type=int, help="最多显示的行数")
+    query.add_argument('--format', choices=["table", "csv"], default="table", help="输出格式")
+    query.set_defaults(func=cmd_query)
+
+    cache = subparsers.add_parser("cache", help="响应缓存")
+    cache.add_argument('action', choices=["stats"], help="stats=显示统计信息")
+    cache.add_argument('--cache', default="cffex_cache.db", help="响应缓存文件")
+    cache.set_defaults(func=cmd_cache)
+
+    daemon = subparsers.add_parser("daemon", parents=[fetch], help="常驻运行, 数据发布后立即爬取")
+    daemon.add_argument('products', nargs='*', default=["IM", "IF", "IC", "IH"], help="产品代码")
+    daemon.add_argument('--poll-start', default="15:30", help="开始轮询的时间 (HH:MM)")
+    daemon.add_argument('--deadline', default="19:00", help="停止轮询的时间 (HH:MM)")
+    daemon.add_argument('--poll-interval', type=float, default=30, help="轮询间隔秒数")
+    daemon.add_argument('--output-dir', default=".", help="CSV文件保存目录")
+    daemon.set_defaults(func=cmd_daemon)
+    return parser
+
+
+def main(argv=None):
+    """
+    命令行入口
+    Returns:
+        int: 退出码
+    """
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中金所多产品、多日期并发爬取程序
+功能: 把 (产品, 日期) 任务分发到有界线程池, 统一限速并按顺序汇总结果
+"""
+
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+from cffex_calendar import TradingCalendar
+from cffex_spider import CFFEXSpider
+from cffex_throttle import AdaptiveRateLimiter, HostLimiter
+
+
+def iter_dates(start_date, end_date):
+    """
+    生成日期范围内的所有日期
+    Args:
+        start_date: 开始日期字符串 (格式: YYYY-MM-DD)
+        end_date: 结束日期字符串 (格式: YYYY-MM-DD)
+    Returns:
+        generator: YYYY-MM-DD格式的日期字符串
+    """
+    current_date = datetime.strptime(start_date, '%Y-%m-%d')
+    end_dt = datetime.strptime(end_date, '%Y-%m-%d')
+    while current_date <= end_dt:
+        yield current_date.strftime('%Y-%m-%d')
+        current_date += timedelta(days=1)
+
+
+class RangeCrawler:
+    def __init__(self, max_workers=4, rate=2.0, per_host_limit=2, spider_factory=None, calendar=None,
+                 checkpoint=None):
+        """
+        初始化并发爬取器
+        Args:
+            max_workers: 线程池大小
+            rate: 每个主机的初始每秒请求数, 之后按延迟和错误率自适应调整; <=0 表示不限速
+            per_host_limit: 每个主机的最大并发请求数
+            spider_factory: 创建爬虫实例的函数, 默认创建XML模式的CFFEXSpider
+            calendar: 交易日历, 用于跳过非交易日
+            checkpoint: 断点记录 (CrawlCheckpoint), 指定时跳过已完成的任务并重试失败的任务
+        """
+        self.max_workers = max_workers
+        self.calendar = calendar or TradingCalendar()
+        self.checkpoint = checkpoint
+        self.rate_limiter = AdaptiveRateLimiter(initial_rate=rate) if rate and rate > 0 else None
+        self.host_limiter = HostLimiter(per_host_limit)
+        self.spider_factory = spider_factory or (lambda: CFFEXSpider(fetch_mode="xml", calendar=self.calendar))
+        self._spiders = []
+        self._idle_spiders = []
+        self._spiders_lock = threading.Lock()
+
+    def _get_spider(self):
+        """
+        借出一个空闲的爬虫实例, 同一时间只有一个线程使用 (requests.Session不跨线程共享);
+        爬虫用完后归还, 多次爬取之间保持连接, 不会每次都重新建立
+        """
+        with self._spiders_lock:
+            if self._idle_spiders:
+                return self._idle_spiders.pop()
+        spider = self.spider_factory()
+        # 所有工作线程共用本爬取器的限速器
+        spider.rate_limiter = self.rate_limiter
+        with self._spiders_lock:
+            self._spiders.append(spider)
+        return spider
+
+    def _return_spider(self, spider):
+        with self._spiders_lock:
+            self._idle_spiders.append(spider)
+
+    def _fetch_unit(self, product_id, date_str, record=True, defer_success=False):
+        """
+        获取单个 (产品, 日期) 的数据
+        Args:
+            record: 是否写入断点记录, 重试时由CrawlCheckpoint.retry_failures负责记录
+            defer_success: 为True时不记录成功的任务, 由调用方在数据保存后记录
+        Returns:
+            dict: get_product_data格式的结果, 发生异常时为失败结果 (同样写入断点记录, 之后按退避时间重试)
+        """
+        spider = self._get_spider()
+        host = urlparse(spider.xml_base_url).netloc
+        # 速率由爬虫在实际发出请求时通过限速器控制, 命中缓存的任务不需要等待
+        try:
+            with self.host_limiter.slot(host):
+                try:
+                    result = spider.get_product_data(product_id, date_str)
+                finally:
+                    # 回退到浏览器时借用的浏览器立即归还, 供其他线程使用
+                    spider.release_driver()
+            if result.get('success'):
+                spider.annotate_records(result, date_str, product_id)
+            elif result.get('no_data'):
+                self.calendar.mark_no_data(date_str, product_id)
+        except Exception as e:
+            logging.error(f"爬取 {product_id} {date_str} 时发生错误: {e}")
+            result = {'success': False, 'product_id': product_id, 'date': date_str, 'error': str(e)}
+        finally:
+            self._return_spider(spider)
+        if self.checkpoint and record and not (defer_success and result.get('success')):
+            self.checkpoint.record_result(product_id, date_str, result)
+        return result
+
+    def crawl(self, product_ids, start_date, end_date):
+        """
+        并发获取多个产品在日期范围内的数据
+        Args:
+            product_ids: 产品代码列表
+            start_date: 开始日期字符串 (格式: YYYY-MM-DD)
+            end_date: 结束日期字符串 (格式: YYYY-MM-DD)
+        Returns:
+            list: 成功获取的结果, 按日期、产品列表顺序排列
+        """
+        order = {unit: index for index, unit in enumerate(
+            (date_str, product_id) for date_str in iter_dates(start_date, end_date) for product_id in product_ids)}
+        all_data = sorted(
+            self.iter_crawl(product_ids, start_date, end_date),
+            key=lambda r: order.get((r.get('date'), r.get('product_id')), len(order))
+        )
+        logging.info(f"并发爬取完成，共获取 {len(all_data)} 个产品交易日的数据")
+        if self.rate_limiter:
+            logging.info(f"请求速率统计: {self.rate_limiter.stats()}")
+        return all_data
+
+    def iter_crawl(self, product_ids, start_date, end_date, defer_success=False):
+        """
+        并发获取数据, 每完成一个任务就立即返回结果, 不在内存中累积
+        Args:
+            product_ids: 产品代码列表
+            start_date: 开始日期字符串 (格式: YYYY-MM-DD)
+            end_date: 结束日期字符串 (格式: YYYY-MM-DD)
+            defer_success: 为True时不记录成功的任务, 由调用方在数据保存后记录 (见ExportPipeline)
+        Yields:
+            dict: 成功获取的结果, 按完成顺序, 重试成功的任务在最后;
+                  同时进行的任务最多为max_workers * 2个, 内存占用与日期范围长度无关
+        """
+        units = [(date_str, product_id)
+                 for date_str in iter_dates(start_date, end_date)
+                 for product_id in product_ids
+                 if self.calendar.is_trading_day(date_str, product_id)]
+        if self.checkpoint:
+            pending = set(self.checkpoint.pending([(p, d) for d, p in units]))
+            logging.info(f"断点记录中已完成 {len(units) - len(pending)} 个任务")
+            planned_units = units
+            units = [(d, p) for d, p in units if (p, d) in pending]
+        logging.info(f"开始并发爬取: {len(units)} 个任务, 线程数: {self.max_workers}")
+
+        remaining = iter(units)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {}
+
+            def submit_next():
+                for date_str, product_id in remaining:
+                    future = executor.submit(self._fetch_unit, product_id, date_str, defer_success=defer_success)
+                    futures[future] = (date_str, product_id)
+                    return
+
+            # 最多保留max_workers * 2个未取出的任务, 消费方较慢时已完成的结果不会随日期范围增多
+            for _ in range(self.max_workers * 2):
+                submit_next()
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    # 取出后不再保留对结果的引用, 同时补充一个新任务
+                    date_str, product_id = futures.pop(future)
+                    submit_next()
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logging.error(f"爬取 {product_id} {date_str} 时发生错误: {e}")
+                        continue
+                    if result.get('success'):
+                        logging.info(f"成功获取 {product_id} {date_str} 的数据")
+                        yield result
+                    else:
+                        logging.warning(f"获取 {product_id} {date_str} 的数据失败: "
+                                        f"{result.get('error', '未知错误')}")
+
+        if self.checkpoint:
+            # 并发阶段结束后按退避时间重试本次范围内失败的任务
+            yield from self.checkpoint.iter_retries(
+                lambda p, d: self._fetch_unit(p, d, record=False),
+                [(p, d) for d, p in planned_units],
+                record_success=not defer_success)
+
+    def close(self):
+        """关闭所有工作线程创建的爬虫"""
+        with self._spiders_lock:
+            for spider in self._spiders:
+                spider.close()
+            self._spiders = []
+            self._idle_spiders = []
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Selenium WebDriver连接池
+功能: 在同一进程内复用浏览器实例, 健康检查, 按页面数或崩溃回收,
+      浏览器启动开销每个进程只需支付一次, 并支持多个浏览器并行爬取
+"""
+
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+
+
+def create_chrome_driver(headless=True):
+    """创建Chrome WebDriver"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument('--headless')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--window-size=1920,1080')
+    chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
+    return webdriver.Chrome(options=chrome_options)
+
+
+class WebDriverPool:
+    def __init__(self, size=2, headless=True, max_pages=50, driver_factory=None):
+        """
+        初始化连接池
+        Args:
+            size: 最多同时存在的浏览器数量
+            headless: 是否使用无头模式
+            max_pages: 每个浏览器加载多少个页面后回收重建, <=0 表示不回收
+            driver_factory: 创建浏览器的函数, 默认创建Chrome
+        """
+        self.size = size
+        self.headless = headless
+        self.max_pages = max_pages
+        self.driver_factory = driver_factory or (lambda: create_chrome_driver(headless))
+        self._idle = []
+        self._pages = {}
+        self._created = 0
+        self._condition = threading.Condition()
+
+    def is_healthy(self, driver):
+        """通过执行一段脚本检查浏览器是否仍然可用"""
+        try:
+            return driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def _quit(self, driver):
+        try:
+            driver.quit()
+        except Exception as e:
+            logging.debug(f"关闭浏览器时发生错误: {e}")
+
+    def acquire(self, timeout=None):
+        """
+        借出一个浏览器, 池满时阻塞等待
+        Args:
+            timeout: 最长等待秒数, None表示一直等待
+        Returns:
+            WebDriver: 浏览器实例
+        """
+        with self._condition:
+            while True:
+                if self._idle:
+                    driver = self._idle.pop()
+                    break
+                if self._created < self.size:
+                    self._created += 1
+                    driver = None
+                    break
+                if not self._condition.wait(timeout):
+                    raise TimeoutError(f"等待浏览器超时 ({timeout}秒)")
+
+        if driver is not None and not self.is_healthy(driver):
+            logging.warning("浏览器健康检查失败，重新创建")
+            self._quit(driver)
+            with self._condition:
+                self._pages.pop(id(driver), None)
+            driver = None
+
+        if driver is None:
+            try:
+                driver = self.driver_factory()
+            except Exception:
+                with self._condition:
+                    self._created -= 1
+                    self._condition.notify()
+                raise
+            with self._condition:
+                self._pages[id(driver)] = 0
+            logging.info("WebDriver初始化成功")
+        return driver
+
+    def release(self, driver, broken=False):
+        """
+        归还浏览器; 崩溃或已达到页面数上限的浏览器会被关闭
+        Args:
+            driver: 浏览器实例
+            broken: 调用方是否发现浏览器已不可用
+        """
+        with self._condition:
+            pages = self._pages.get(id(driver), 0)
+            recycle = broken or (self.max_pages > 0 and pages >= self.max_pages)
+            if recycle:
+                self._pages.pop(id(driver), None)
+                self._created -= 1
+            else:
+                self._idle.append(driver)
+            self._condition.notify()
+        if recycle:
+            logging.info(f"回收浏览器 (已加载 {pages} 个页面{', 已崩溃' if broken else ''})")
+            self._quit(driver)
+
+    def mark_page(self, driver):
+        """记录浏览器加载了一个页面"""
+        with self._condition:
+            self._pages[id(driver)] = self._pages.get(id(driver), 0) + 1
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """借出浏览器并在使用后自动归还"""
+        driver = self.acquire(timeout)
+        broken = False
+        try:
+            yield driver
+        except Exception:
+            broken = not self.is_healthy(driver)
+            raise
+        finally:
+            self.release(driver, broken)
+
+    def close_all(self):
+        """关闭所有空闲浏览器"""
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+            for driver in idle:
+                self._pages.pop(id(driver), None)
+        for driver in idle:
+            self._quit(driver)
+
+
+_shared_pools = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_pool(headless=True, size=2, max_pages=50):
+    """
+    获取进程内共享的连接池, 同一进程中的所有爬虫共用浏览器
+    Args:
+        headless: 是否使用无头模式, 有头和无头模式分别使用不同的池
+        size: 首次创建时的池大小
+        max_pages: 首次创建时的页面数回收上限
+    Returns:
+        WebDriverPool: 共享连接池
+    """
+    with _shared_lock:
+        pool = _shared_pools.get(headless)
+        if pool is None:
+            pool = WebDriverPool(size=size, headless=headless, max_pages=max_pages)
+            _shared_pools[headless] = pool
+        return pool
+
+
+@atexit.register
+def _close_shared_pools():
+    for pool in list(_shared_pools.values()):
+        pool.close_all()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中金所会员登记表
+功能: 用XML中稳定的partyid识别会员, 为每个会员分配小整数编号, 会员简称统一驻留,
+      同一partyid在不同时期使用的简称 (更名) 记录为别名, 按任一简称都能找到同一会员
+"""
+
+import sys
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS members (
+    member_id INTEGER PRIMARY KEY,
+    party_id TEXT,
+    member_name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS member_aliases (
+    member_name TEXT PRIMARY KEY,
+    member_id INTEGER NOT NULL REFERENCES members (member_id),
+    first_seen TEXT,
+    last_seen TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_members_party_id ON members (party_id);
+"""
+
+
+class MemberRegistry:
+    def __init__(self, conn=None):
+        """
+        初始化会员登记表
+        Args:
+            conn: SQLite连接, 指定时从members/member_aliases表加载并把变化写回; 为None时只在内存中使用
+        """
+        self.conn = conn
+        self._lock = threading.RLock()
+        self.by_party = {}      # partyid -> 会员编号
+        self.party_of = {}      # 会员编号 -> partyid
+        self.by_name = {}       # 简称 (含历史简称) -> 会员编号
+        self.names = {}         # 会员编号 -> 当前简称
+        self.seen = {}          # 简称 -> (首次出现日期, 最后出现日期)
+        self._next_id = 1
+        # 尚未写入数据库的会员编号和简称, 每批记录结束时一次写入
+        self._dirty_members = set()
+        self._dirty_aliases = set()
+        if conn is not None:
+            self._load()
+
+    def _load(self):
+        """创建表结构 (兼容只有member_id/member_name的旧表) 并加载已有会员"""
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(members)")]
+        if columns and 'party_id' not in columns:
+            self.conn.execute("ALTER TABLE members ADD COLUMN party_id TEXT")
+        self.conn.executescript(SCHEMA)
+        # 旧表中的简称作为别名
+        self.conn.execute("""
+            INSERT OR IGNORE INTO member_aliases (member_name, member_id)
+            SELECT member_name, member_id FROM members
+        """)
+        self.conn.commit()
+
+        for member_id, party_id, member_name in self.conn.execute(
+                "SELECT member_id, party_id, member_name FROM members"):
+            self.names[member_id] = sys.intern(member_name)
+            if party_id:
+                self.by_party[party_id] = member_id
+                self.party_of[member_id] = party_id
+            self._next_id = max(self._next_id, member_id + 1)
+        for member_name, member_id, first_seen, last_seen in self.conn.execute(
+                "SELECT member_name, member_id, first_seen, last_seen FROM member_aliases"):
+            member_name = sys.intern(member_name)
+            self.by_name[member_name] = member_id
+            self.seen[member_name] = (first_seen or '', last_seen or '')
+
+    def resolve(self, member_name, party_id="", date=""):
+        """
+        查找或登记会员
+        Args:
+            member_name: 会员简称
+            party_id: XML中的partyid, 页面数据没有时为空
+            date: 数据日期 (YYYY-MM-DD), 用于判断更名先后
+        Returns:
+            int: 会员编号
+        """
+        with self._lock:
+            member_id = self._resolve(member_name, party_id, date)
+            self._flush()
+            return member_id
+
+    def resolve_records(self, records):
+        """
+        批量查找记录对应的会员编号, 新会员和别名在内存中登记后每个表只执行一次executemany
+        Args:
+            records: RankingRecord序列
+        Returns:
+            list: 与records一一对应的会员编号
+        """
+        with self._lock:
+            member_ids = [self._resolve(r.member_name, r.party_id, r.date) for r in records]
+            self._flush()
+            return member_ids
+
+    def _resolve(self, member_name, party_id, date):
+        """在内存中查找或登记会员, 变化留待_flush写入"""
+        member_name = sys.intern(member_name or '')
+        member_id = self.by_party.get(party_id) if party_id else None
+        if member_id is None:
+            member_id = self.by_name.get(member_name)
+            if member_id is not None and party_id:
+                if self.party_of.get(member_id, party_id) != party_id:
+                    # 简称已属于另一个partyid (被新会员沿用), 登记为新会员
+                    member_id = None
+                else:
+                    self._set_party(member_id, party_id)
+        if member_id is None:
+            member_id = self._create(member_name, party_id)
+        self._record_alias(member_id, member_name, date)
+        return member_id
+
+    def member_id(self, member_name_or_party_id):
+        """按partyid或任一 (历史) 简称查找会员编号, 未登记时返回None"""
+        with self._lock:
+            return self.by_party.get(member_name_or_party_id, self.by_name.get(member_name_or_party_id))
+
+    def aliases(self, member_id):
+        """
+        会员使用过的全部简称
+        Returns:
+            list: 按首次出现日期排序的简称列表
+        """
+        with self._lock:
+            names = [name for name, mid in self.by_name.items() if mid == member_id]
+            return sorted(names, key=lambda name: self.seen.get(name, ('', ''))[0])
+
+    def _create(self, member_name, party_id):
+        member_id = self._next_id
+        self._next_id += 1
+        self.names[member_id] = member_name
+        if party_id:
+            self.by_party[party_id] = member_id
+            self.party_of[member_id] = party_id
+        self._dirty_members.add(member_id)
+        return member_id
+
+    def _set_party(self, member_id, party_id):
+        self.by_party[party_id] = member_id
+        self.party_of[member_id] = party_id
+        self._dirty_members.add(member_id)
+
+    def _record_alias(self, member_id, member_name, date):
+        """记录简称的出现日期; 最近出现的简称作为会员的当前简称"""
+        first, last = self.seen.get(member_name, ('', ''))
+        if date:
+            first, last = min(first or date, date), max(last, date)
+        changed = (self.by_name.get(member_name) != member_id
+                   or (first, last) != self.seen.get(member_name))
+        if not changed:
+            return
+        self.by_name[member_name] = member_id
+        self.seen[member_name] = (first, last)
+
+        current = self.names.get(member_id)
+        if current != member_name and last >= self.seen.get(current, ('', ''))[1]:
+            self.names[member_id] = member_name
+            self._dirty_members.add(member_id)
+        self._dirty_aliases.add(member_name)
+
+    def _flush(self):
+        """把新登记或有变化的会员和别名写入数据库, 每个表一次executemany, 由调用方提交"""
+        if self.conn is not None and self._dirty_members:
+            self.conn.executemany(
+                "INSERT INTO members (member_id, party_id, member_name) VALUES (?, ?, ?) "
+                "ON CONFLICT (member_id) DO UPDATE SET party_id = excluded.party_id, member_name = excluded.member_name",
+                [(member_id, self.party_of.get(member_id), self.names[member_id])
+                 for member_id in sorted(self._dirty_members)])
+        if self.conn is not None and self._dirty_aliases:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO member_aliases (member_name, member_id, first_seen, last_seen) "
+                "VALUES (?, ?, ?, ?)",
+                [(name, self.by_name[name], self.seen[name][0] or None, self.seen[name][1] or None)
+                 for name in self._dirty_aliases])
+        self._dirty_members = set()
+        self._dirty_aliases = set()
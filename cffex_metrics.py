@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中金所爬虫运行指标
+功能: 记录各阶段耗时 (浏览器启动、页面访问、设置日期、点击查询、等待、解析、导出、下载)
+      和计数 (重试、回退方案、匹配到的表格选择器、日期设置分支、下载字节数),
+      输出为JSON摘要或Prometheus文本文件 (node_exporter textfile格式)
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class CrawlMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.phases = {}      # 阶段名 -> [次数, 总耗时, 最长耗时]
+        self.counters = {}    # (计数名, ((标签, 值), ...)) -> 数值
+        self.started_at = time.time()
+
+    @contextmanager
+    def phase(self, name):
+        """记录代码块的耗时, 出错时也记录"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def observe(self, name, seconds):
+        """记录一次阶段耗时 (秒)"""
+        with self._lock:
+            stats = self.phases.setdefault(name, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+    def count(self, name, amount=1, **labels):
+        """
+        增加计数
+        Args:
+            name: 计数名, 如"retries"、"fallbacks"
+            amount: 增加的数量
+            **labels: 标签, 如 kind="selenium"
+        """
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def reset(self):
+        """清空全部指标"""
+        with self._lock:
+            self.phases.clear()
+            self.counters.clear()
+            self.started_at = time.time()
+
+    def summary(self):
+        """
+        指标摘要
+        Returns:
+            dict: {"phases": {阶段: {count, total_seconds, mean_seconds, max_seconds}},
+                   "counters": {计数名: 数值, 或带标签时为 {"标签=值,...": 数值}}}
+        """
+        with self._lock:
+            phases = {
+                name: {
+                    'count': count,
+                    'total_seconds': round(total, 6),
+                    'mean_seconds': round(total / count, 6) if count else 0.0,
+                    'max_seconds': round(maximum, 6),
+                }
+                for name, (count, total, maximum) in sorted(self.phases.items())
+            }
+            counters = {}
+            for (name, labels), value in sorted(self.counters.items()):
+                if labels:
+                    counters.setdefault(name, {})[','.join(f"{k}={v}" for k, v in labels)] = value
+                else:
+                    counters[name] = value
+        return {
+            'started_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started_at)),
+            'elapsed_seconds': round(time.time() - self.started_at, 3),
+            'phases': phases,
+            'counters': counters,
+        }
+
+    def write_json(self, path):
+        """
+        保存JSON摘要
+        Returns:
+            str: 文件路径
+        """
+        _write_atomic(path, json.dumps(self.summary(), ensure_ascii=False, indent=2))
+        return path
+
+    def prometheus_text(self, prefix="cffex"):
+        """
+        Prometheus文本格式的指标
+        Returns:
+            str: 阶段耗时为summary (_sum/_count), 计数为counter (_total)
+        """
+        with self._lock:
+            phases = sorted(self.phases.items())
+            counters = sorted(self.counters.items())
+        lines = [
+            f"# HELP {prefix}_phase_seconds Time spent in each crawl phase.",
+            f"# TYPE {prefix}_phase_seconds summary",
+        ]
+        for name, (count, total, _) in phases:
+            lines.append(f'{prefix}_phase_seconds_sum{{phase="{_escape(name)}"}} {total:.6f}')
+            lines.append(f'{prefix}_phase_seconds_count{{phase="{_escape(name)}"}} {count}')
+        declared = set()
+        for (name, labels), value in counters:
+            metric = f"{prefix}_{name}_total"
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            label_text = ','.join(f'{k}="{_escape(v)}"' for k, v in labels)
+            lines.append(f"{metric}{{{label_text}}} {value}" if label_text else f"{metric} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path, prefix="cffex"):
+        """
+        保存Prometheus文本文件, 先写临时文件再替换, 采集时不会读到写了一半的文件
+        Returns:
+            str: 文件路径
+        """
+        _write_atomic(path, self.prometheus_text(prefix))
+        return path
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _write_atomic(path, text):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def timed(phase_name):
+    """方法装饰器: 用实例的metrics属性记录方法耗时"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            metrics = getattr(self, 'metrics', None)
+            if metrics is None:
+                return func(self, *args, **kwargs)
+            with metrics.phase(phase_name):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+_shared_metrics = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_metrics():
+    """
+    获取进程内共享的指标, 同一进程中的爬虫、断点记录和导出共用
+    Returns:
+        CrawlMetrics: 共享指标
+    """
+    global _shared_metrics
+    with _shared_lock:
+        if _shared_metrics is None:
+            _shared_metrics = CrawlMetrics()
+        return _shared_metrics
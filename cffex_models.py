@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中金所持仓排名记录模型
+功能: 解析器和各导出方式共用的带类型记录, 名次/成交量/增减量在解析时转换为整数,
+      排名类型使用枚举, 会员简称等重复字符串共享同一对象以减少内存;
+      同一XML中按会员类别汇总的成交量和持仓量 (positionamt节点) 保存为PositionAmount
+"""
+
+import sys
+from dataclasses import dataclass
+from enum import Enum
+from typing import Optional
+
+TOTAL_LABEL = "合计"
+# positionamt节点的futurecompany取值
+MEMBER_CATEGORY_LABELS = {
+    0: "期货公司结算会员",
+    1: "非期货公司结算会员",
+}
+
+
+class RankingType(str, Enum):
+    VOLUME = "volume_ranking"
+    BUY = "buy_position_ranking"
+    SELL = "sell_position_ranking"
+
+    @property
+    def label(self):
+        """中文名称, 用于CSV/Excel导出"""
+        return {
+            RankingType.VOLUME: "成交量排名",
+            RankingType.BUY: "持买单量排名",
+            RankingType.SELL: "持卖单量排名",
+        }[self]
+
+    @property
+    def code(self):
+        """数字代码, 与XML中的datatypeid一致 (0=成交量, 1=持买, 2=持卖)"""
+        return list(RankingType).index(self)
+
+
+def to_int(value):
+    """
+    将页面/XML中的数字文本转换为整数
+    Args:
+        value: 如 "28,247"、"+50"、"-42", 空值或"-"返回None
+    Returns:
+        int: 转换后的整数, 无法转换时返回None
+    """
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value
+    text = str(value).strip().replace(',', '')
+    if text in ('', '-', '--'):
+        return None
+    try:
+        return int(float(text))
+    except ValueError:
+        return None
+
+
+@dataclass(slots=True)
+class RankingRecord:
+    ranking_type: RankingType
+    rank: Optional[int]         # 合计行为None
+    member_name: str
+    volume: Optional[int]
+    change: Optional[int]
+    date: str = ""
+    product_id: str = ""
+    instrument_id: str = ""     # 合约代码, 如IF2509
+    party_id: str = ""          # 会员的partyid (只有XML中有)
+
+    @classmethod
+    def from_fields(cls, ranking_type, rank, member_name, volume, change, date="", product_id="", instrument_id="",
+                    party_id=""):
+        """
+        由页面/XML中的文本字段创建记录
+        Args:
+            ranking_type: 排名类型 (RankingType或其取值)
+            rank: 名次文本, "合计"表示合计行
+        Returns:
+            RankingRecord: 名次无法识别时返回None
+        """
+        rank_text = str(rank).strip()
+        rank_value = None if rank_text == TOTAL_LABEL else to_int(rank_text)
+        if rank_value is None and rank_text != TOTAL_LABEL:
+            return None
+        return cls(
+            RankingType(ranking_type),
+            rank_value,
+            sys.intern(str(member_name or '').strip()),
+            to_int(volume),
+            to_int(change),
+            sys.intern(date or ''),
+            sys.intern(product_id or ''),
+            sys.intern(instrument_id or ''),
+            sys.intern(party_id or '')
+        )
+
+    @classmethod
+    def from_dict(cls, record, ranking_type, date="", product_id="", instrument_id=""):
+        """由旧格式的字典 (rank/member_name/volume/change) 创建记录"""
+        return cls.from_fields(
+            ranking_type,
+            record.get('rank', ''),
+            record.get('member_name', ''),
+            record.get('volume'),
+            record.get('change'),
+            record.get('date', date),
+            record.get('product_id', product_id),
+            record.get('instrument_id', instrument_id),
+            record.get('party_id', '')
+        )
+
+    @property
+    def is_total(self):
+        return self.rank is None
+
+    @property
+    def rank_label(self):
+        """导出时显示的名次, 合计行显示"合计" """
+        return TOTAL_LABEL if self.rank is None else self.rank
+
+    def sort_key(self):
+        """同一排名内按名次排序, 合计行在最后"""
+        return (self.date, self.product_id, self.instrument_id, self.ranking_type.code,
+                self.rank is None, self.rank or 0)
+
+    def to_dict(self):
+        """转换为可JSON序列化的字典"""
+        return {
+            "date": self.date,
+            "product_id": self.product_id,
+            "instrument_id": self.instrument_id,
+            "ranking_type": self.ranking_type.value,
+            "rank": self.rank,
+            "member_name": self.member_name,
+            "party_id": self.party_id,
+            "volume": self.volume,
+            "change": self.change,
+        }
+
+
+@dataclass(slots=True)
+class PositionAmount:
+    instrument_id: str
+    member_category: int        # 0=期货公司结算会员, 1=非期货公司结算会员 (XML中的futurecompany)
+    volume: Optional[int]       # 总成交量
+    volume_change: Optional[int]
+    buy_volume: Optional[int]   # 总持买单量
+    buy_change: Optional[int]
+    sell_volume: Optional[int]  # 总持卖单量
+    sell_change: Optional[int]
+    date: str = ""
+    product_id: str = ""
+
+    @classmethod
+    def from_fields(cls, fields, date="", product_id=""):
+        """
+        由positionamt节点的字段创建记录
+        Args:
+            fields: {小写标签名: 文本}, 如futurecompany/volumeamt/varvolumeamt/buyvolumeamt等
+        Returns:
+            PositionAmount: 合约代码或会员类别无法识别时返回None
+        """
+        instrument_id = str(fields.get('instrumentid') or '').strip()
+        member_category = to_int(fields.get('futurecompany'))
+        if not instrument_id or member_category not in MEMBER_CATEGORY_LABELS:
+            return None
+        return cls(
+            sys.intern(instrument_id),
+            member_category,
+            to_int(fields.get('volumeamt')),
+            to_int(fields.get('varvolumeamt')),
+            to_int(fields.get('buyvolumeamt')),
+            to_int(fields.get('buyvarvolumeamt')),
+            to_int(fields.get('sellvolumeamt')),
+            to_int(fields.get('sellvarvolumeamt')),
+            sys.intern(date or ''),
+            sys.intern(product_id or '')
+        )
+
+    @property
+    def member_category_label(self):
+        """会员类别的中文名称, 与页面一致"""
+        return MEMBER_CATEGORY_LABELS[self.member_category]
+
+    def to_dict(self):
+        """转换为可JSON序列化的字典"""
+        return {
+            "date": self.date,
+            "product_id": self.product_id,
+            "instrument_id": self.instrument_id,
+            "member_category": self.member_category,
+            "volume": self.volume,
+            "volume_change": self.volume_change,
+            "buy_volume": self.buy_volume,
+            "buy_change": self.buy_change,
+            "sell_volume": self.sell_volume,
+            "sell_change": self.sell_change,
+        }
+
+
+def empty_rankings():
+    """解析结果的空结构: 每种排名类型一个记录列表"""
+    return {ranking_type.value: [] for ranking_type in RankingType}
+
+
+def total_record(records, ranking_type):
+    """
+    由明细记录计算合计行
+    Returns:
+        RankingRecord: 成交量/增减量为各名次之和
+    """
+    return RankingRecord(
+        RankingType(ranking_type),
+        None,
+        "",
+        sum(r.volume or 0 for r in records),
+        sum(r.change or 0 for r in records),
+        instrument_id=records[0].instrument_id if records else ""
+    )
+
+
+def normalize_rankings(data, date="", product_id="", instrument_id=""):
+    """
+    将解析结果中的记录统一为RankingRecord并补充缺少的日期、产品和合约
+    Args:
+        data: {排名类型: 记录列表}, 记录可以是RankingRecord或旧格式字典
+    Returns:
+        dict: 原字典, 记录列表已替换为RankingRecord列表
+    """
+    for ranking_type in RankingType:
+        records = []
+        for record in data.get(ranking_type.value, []):
+            if not isinstance(record, RankingRecord):
+                record = RankingRecord.from_dict(record, ranking_type, instrument_id=instrument_id or '')
+                if record is None:
+                    continue
+            if date and not record.date:
+                record.date = sys.intern(date)
+            if product_id and not record.product_id:
+                record.product_id = sys.intern(product_id)
+            if instrument_id and not record.instrument_id:
+                record.instrument_id = sys.intern(instrument_id)
+            records.append(record)
+        if ranking_type.value in data:
+            data[ranking_type.value] = records
+    return data
+
+
+def iter_records(all_data, all_contracts=False):
+    """
+    遍历多个爬取结果中的全部记录
+    Args:
+        all_data: get_date_range_data/get_products_range_data返回的结果列表
+        all_contracts: 为True时遍历结果中的全部合约 (contracts), 否则只遍历所选合约 (data)
+    Yields:
+        RankingRecord: 带日期、产品和合约的记录
+    """
+    for daily_data in all_data:
+        if not daily_data.get('success'):
+            continue
+        date = daily_data.get('date', '')
+        product_id = daily_data.get('product_id', '')
+        if all_contracts and daily_data.get('contracts'):
+            contracts = daily_data['contracts']
+        else:
+            contracts = {daily_data.get('instrument_id') or '': daily_data.get('data') or {}}
+        for instrument_id, data in contracts.items():
+            data = normalize_rankings(data, date, product_id, instrument_id)
+            for ranking_type in RankingType:
+                yield from data.get(ranking_type.value, [])
+
+
+def iter_position_amounts(all_data):
+    """
+    遍历多个爬取结果中按会员类别汇总的成交量和持仓量
+    Args:
+        all_data: get_date_range_data/get_products_range_data返回的结果列表
+    Yields:
+        PositionAmount: 带日期和产品的记录 (没有positionamt节点的结果不返回记录)
+    """
+    for daily_data in all_data:
+        if not daily_data.get('success'):
+            continue
+        for amount in daily_data.get('position_amounts') or []:
+            if not amount.date:
+                amount.date = sys.intern(daily_data.get('date', ''))
+            if not amount.product_id:
+                amount.product_id = sys.intern(daily_data.get('product_id', ''))
+            yield amount
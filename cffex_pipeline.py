@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中金所持仓排名流式导出
+功能: 获取 → 解析 → 统一为RankingRecord → 写入输出目标, 记录在有限大小的缓冲区中
+      定期写入CSV/Parquet/SQLite/Excel, 内存占用与日期范围长度无关, 中断时已写入的数据不会丢失
+      (Excel文件在结束时才生成, 断点在文件生成后才记录); 提供write_amounts(amounts)的输出目标同时写入按会员类别汇总的数据
+"""
+
+import csv
+import logging
+import os
+import re
+import time
+
+from cffex_metrics import get_shared_metrics
+from cffex_models import MEMBER_CATEGORY_LABELS, PositionAmount, iter_position_amounts, iter_records
+from cffex_storage import ParquetStore
+from cffex_warehouse import RankingWarehouse
+
+CSV_HEADER = ['date', 'product_id', 'instrument_id', 'ranking_type', 'rank', 'member_name', 'volume', 'change']
+EXCEL_HEADER = ['date', 'product_id', 'instrument_id', 'ranking_type', 'rank', 'member_name', 'party_id',
+                'volume', 'change']
+AMOUNT_CSV_HEADER = ['date', 'product_id', 'instrument_id', 'member_category', 'volume', 'volume_change',
+                     'buy_volume', 'buy_change', 'sell_volume', 'sell_change']
+# Excel工作表的最大行数
+EXCEL_MAX_ROWS = 1048576
+
+
+class CsvSink:
+    def __init__(self, path):
+        """
+        追加写入CSV文件, 列与save_range_data_to_csv相同, 另有合约代码列 (instrument_id) 区分同一天的各合约
+        Args:
+            path: CSV文件路径, 文件已存在时在末尾追加
+        """
+        self.path = path
+
+    def write(self, records):
+        """写入一批记录并同步到磁盘"""
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, 'a', newline='', encoding='utf-8-sig' if new_file else 'utf-8') as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(CSV_HEADER)
+            writer.writerows([
+                record.date,
+                record.product_id,
+                record.instrument_id,
+                record.ranking_type.label,
+                record.rank_label,
+                record.member_name,
+                record.volume,
+                record.change
+            ] for record in records)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def close(self):
+        pass
+
+
+class AmountCsvSink:
+    def __init__(self, path):
+        """
+        追加写入按会员类别汇总的成交量和持仓量 (positionamt), 列与save_position_amounts_to_csv相同
+        Args:
+            path: CSV文件路径, 文件已存在时在末尾追加, 关闭时相同 (日期, 产品, 合约, 会员类别) 的行只保留最后写入的
+        """
+        self.path = path
+
+    def write(self, records):
+        """排名记录不写入该文件"""
+
+    def write_amounts(self, amounts):
+        """写入一批汇总数据并同步到磁盘"""
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, 'a', newline='', encoding='utf-8-sig' if new_file else 'utf-8') as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(AMOUNT_CSV_HEADER)
+            writer.writerows([
+                amount.date,
+                amount.product_id,
+                amount.instrument_id,
+                MEMBER_CATEGORY_LABELS[amount.member_category],
+                amount.volume,
+                amount.volume_change,
+                amount.buy_volume,
+                amount.buy_change,
+                amount.sell_volume,
+                amount.sell_change
+            ] for amount in amounts)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def close(self):
+        """去掉重复写入的行 (保留最后一次), 有重复时先写入临时文件再替换原文件"""
+        if not os.path.exists(self.path):
+            return
+        rows = {}
+        with open(self.path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            total = 0
+            for row in reader:
+                rows[tuple(row[:4])] = row
+                total += 1
+        if len(rows) == total:
+            return
+        base, ext = os.path.splitext(self.path)
+        temp_path = f"{base}.tmp{ext}"
+        with open(temp_path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows.values())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        logging.info(f"汇总数据文件 {self.path} 去掉 {total - len(rows)} 条重复记录")
+
+
+class ParquetSink:
+    def __init__(self, root="cffex_parquet"):
+        """
+        追加写入按 产品/年/月 分区的Parquet数据集
+        Args:
+            root: 数据集根目录
+        """
+        self.store = ParquetStore(root)
+
+    def write(self, records):
+        """每批记录在各分区中写入一个新文件, 缓冲区越大文件越少"""
+        self.store.append_records(records)
+
+    def close(self):
+        pass
+
+
+class SQLiteSink:
+    def __init__(self, path="cffex_rankings.db"):
+        """
+        写入SQLite数据仓库 (RankingWarehouse), 重复爬取的数据覆盖更新
+        Args:
+            path: 数据库文件路径
+        """
+        self.warehouse = RankingWarehouse(path)
+
+    def write(self, records):
+        """在一个事务中写入一批记录, 合计行不保存"""
+        self.warehouse.upsert_records(records)
+
+    def write_amounts(self, amounts):
+        """写入一批按会员类别汇总的数据 (position_amounts表)"""
+        self.warehouse.upsert_position_amounts(amounts)
+
+    def close(self):
+        self.warehouse.close()
+
+
+class ExcelSink:
+    # 文件在close()时才生成, 导出流程在关闭后才记录断点
+    deferred = True
+
+    def __init__(self, path, sheet_by="ranking_type", max_rows=EXCEL_MAX_ROWS, metadata=None, append=True):
+        """
+        用openpyxl只写模式写入Excel, 每行写入时即序列化到临时文件, 内存占用与行数无关;
+        文件在close()时生成, 单个工作表超过行数上限时续写到"名称_2"等工作表
+        Args:
+            path: Excel文件路径
+            sheet_by: "ranking_type"=每种排名一个工作表, "product"=每个产品一个工作表
+            max_rows: 每个工作表的最大行数 (含表头)
+            metadata: 写入Metadata工作表的 {名称: 值}
+            append: 文件已存在时保留其中的记录, 新记录追加在后面 (断点续爬不会覆盖之前的数据);
+                    为False时覆盖
+        """
+        from openpyxl import Workbook
+
+        if sheet_by not in ("ranking_type", "product"):
+            raise ValueError(f"不支持的工作表划分方式: {sheet_by}")
+        self.path = path
+        self.sheet_by = sheet_by
+        self.max_rows = max_rows
+        self.metadata = metadata
+        self.workbook = Workbook(write_only=True)
+        self._sheets = {}   # 名称 -> [工作表, 行数, 序号]
+        if append and os.path.exists(path):
+            self._copy_existing()
+
+    def _copy_existing(self):
+        """逐行复制已有文件中的记录 (同样不把整个文件读入内存)"""
+        from openpyxl import load_workbook
+
+        existing = load_workbook(self.path, read_only=True)
+        copied = 0
+        try:
+            for sheet in existing.worksheets:
+                rows = sheet.iter_rows(values_only=True)
+                if list(next(rows, ())) != EXCEL_HEADER:
+                    continue
+                # 续写的工作表 ("IF_2") 合并回原名称
+                name = re.sub(r'_\d+$', '', sheet.title)
+                for row in rows:
+                    self._sheet(name).append(list(row))
+                    copied += 1
+        finally:
+            existing.close()
+        logging.info(f"Excel文件已存在, 保留其中的 {copied} 条记录: {self.path}")
+
+    def _sheet(self, name):
+        entry = self._sheets.get(name)
+        if entry is None or entry[1] >= self.max_rows:
+            part = entry[2] + 1 if entry else 1
+            sheet = self.workbook.create_sheet(name if part == 1 else f"{name}_{part}")
+            sheet.append(EXCEL_HEADER)
+            entry = self._sheets[name] = [sheet, 1, part]
+        entry[1] += 1
+        return entry[0]
+
+    def write(self, records):
+        """逐行追加到对应的工作表"""
+        by_product = self.sheet_by == "product"
+        for record in records:
+            name = (record.product_id or "数据") if by_product else record.ranking_type.label
+            self._sheet(name).append([
+                record.date,
+                record.product_id,
+                record.instrument_id,
+                record.ranking_type.label,
+                record.rank_label,
+                record.member_name,
+                record.party_id,
+                record.volume,
+                record.change
+            ])
+
+    def close(self):
+        """生成Excel文件, 重复调用时不再写入"""
+        if self.workbook is None:
+            return
+        if not self._sheets:
+            self.workbook.create_sheet("数据").append(EXCEL_HEADER)
+        if self.metadata:
+            sheet = self.workbook.create_sheet("Metadata")
+            sheet.append(list(self.metadata))
+            sheet.append(list(self.metadata.values()))
+        # 先写入临时文件再替换, 保存中途出错时不会损坏已有文件
+        base, ext = os.path.splitext(self.path)
+        temp_path = f"{base}.tmp{ext}"
+        self.workbook.save(temp_path)
+        os.replace(temp_path, self.path)
+        self.workbook = None
+
+
+class ExportPipeline:
+    def __init__(self, sinks, checkpoint=None, buffer_size=5000, flush_interval=60, metrics=None):
+        """
+        初始化流式导出
+        Args:
+            sinks: 输出目标列表, 每个目标提供write(records)和close(), 可选提供write_amounts(amounts);
+                   deferred为True的目标 (ExcelSink) 在close()时才生成文件
+            checkpoint: 断点记录 (CrawlCheckpoint), 成功的日期在写入所有输出目标后才记录为完成,
+                        有deferred目标时在所有目标关闭后才记录
+            buffer_size: 缓冲的最大记录数, 达到后写入输出目标
+            flush_interval: 距上次写入超过该秒数时写入输出目标
+            metrics: 运行指标 (CrawlMetrics), 默认使用进程内共享的指标
+        """
+        self.sinks = list(sinks)
+        self.checkpoint = checkpoint
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.metrics = metrics or get_shared_metrics()
+        self._buffer = []
+        self._amounts = []
+        self._pending_units = []
+        # 等待deferred目标关闭后才记录完成的 (产品, 日期)
+        self._deferred_units = []
+        self._deferred = any(getattr(sink, 'deferred', False) for sink in self.sinks)
+        self._last_flush = time.monotonic()
+        self.written = 0
+
+    def add(self, result):
+        """
+        加入一个成功的单日结果, 缓冲区满或超过写入间隔时写入输出目标
+        Args:
+            result: get_product_data格式的结果, 结果中的全部合约 (contracts) 都写入输出目标
+        """
+        self._buffer.extend(iter_records([result], all_contracts=True))
+        self._amounts.extend(iter_position_amounts([result]))
+        self._pending_units.append((result.get('product_id'), result.get('date')))
+        if (len(self._buffer) >= self.buffer_size
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """将缓冲区写入所有输出目标, 然后记录断点"""
+        if self._buffer:
+            with self.metrics.phase("export"):
+                for sink in self.sinks:
+                    sink.write(self._buffer)
+            self.written += len(self._buffer)
+            logging.info(f"已写入 {len(self._buffer)} 条记录，累计 {self.written} 条")
+        if self._amounts:
+            with self.metrics.phase("export"):
+                for sink in self.sinks:
+                    if hasattr(sink, 'write_amounts'):
+                        sink.write_amounts(self._amounts)
+        if self.checkpoint and self._deferred:
+            self._deferred_units.extend(self._pending_units)
+        elif self.checkpoint:
+            for product_id, date in self._pending_units:
+                self.checkpoint.mark_completed(product_id, date)
+        self._buffer = []
+        self._amounts = []
+        self._pending_units = []
+        self._last_flush = time.monotonic()
+
+    def run(self, results):
+        """
+        消费结果生成器直到结束
+        Args:
+            results: 逐个返回单日结果的可迭代对象 (如iter_date_range_data)
+        Returns:
+            int: 写入的记录数
+        """
+        try:
+            for result in results:
+                if result.get('success'):
+                    self.add(result)
+        finally:
+            # 中途出错时也写入已获取的数据, 重新运行时从断点继续
+            self._finish()
+        return self.written
+
+    def run_records(self, records):
+        """
+        消费记录流直到结束, 每满buffer_size条写入一次
+        Args:
+            records: 逐条返回RankingRecord的可迭代对象 (如cffex_reader.iter_archive),
+                     其中的PositionAmount写入提供write_amounts的输出目标
+        Returns:
+            int: 写入的排名记录数
+        """
+        try:
+            for record in records:
+                if isinstance(record, PositionAmount):
+                    self._amounts.append(record)
+                    continue
+                self._buffer.append(record)
+                if len(self._buffer) >= self.buffer_size:
+                    self.flush()
+        finally:
+            self._finish()
+        return self.written
+
+    def _finish(self):
+        """写入缓冲区剩余的记录并关闭输出目标, 全部关闭成功后记录deferred目标的断点"""
+        try:
+            self.flush()
+        finally:
+            for sink in self.sinks:
+                sink.close()
+        for product_id, date in self._deferred_units:
+            self.checkpoint.mark_completed(product_id, date)
+        self._deferred_units = []
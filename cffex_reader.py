@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中金所历史结果读取
+功能: 把爬虫写过的各种文件统一读取为RankingRecord流:
+      save_to_csv的分段CSV (#元数据行 + 各排名小节)、save_range_data_to_csv/CsvSink的平铺CSV、
+      save_to_excel/ExcelSink的Excel (按排名类型或产品分工作表的平铺记录, 旧版为每个表格一个Table_N工作表)、
+      原始XML和debug_page_*.html,
+      历史文件可以一次性迁移到Parquet/SQLite (XML中按会员类别汇总的数据同时迁移)
+"""
+
+import csv
+import functools
+import logging
+import os
+import re
+
+from cffex_models import RankingRecord, RankingType, TOTAL_LABEL
+from cffex_validator import known_stub
+
+SUPPORTED_EXTENSIONS = ('.csv', '.xlsx', '.xml', '.html', '.htm')
+
+# 中文名称和取值都映射到排名类型
+RANKING_TYPE_NAMES = {name: ranking_type for ranking_type in RankingType
+                      for name in (ranking_type.value, ranking_type.label)}
+# 表头中的数量列名称
+VOLUME_HEADERS = {"成交量": RankingType.VOLUME, "持买单量": RankingType.BUY, "持卖单量": RankingType.SELL}
+
+_FILENAME_PRODUCT = re.compile(r"(?:debug_page_|ccpm_)?([A-Z]{1,2})(?:_|\.)")
+_FILENAME_DATE = re.compile(r"(20\d{2})-?(\d{2})-?(\d{2})")
+
+_parser = None
+
+
+def _get_parser():
+    """XML和页面解析复用CFFEXSpider的解析方法 (不发出网络请求)"""
+    global _parser
+    if _parser is None:
+        from cffex_spider import CFFEXSpider
+        _parser = CFFEXSpider(fetch_mode="xml", cache=None)
+    return _parser
+
+
+def detect_format(path):
+    """
+    按文件内容 (而不是只看扩展名) 判断格式
+    Args:
+        path: 文件路径
+    Returns:
+        str: "xml"/"html"/"csv_sections"/"csv_flat"/"excel", 已知错误页面为"stub", 无法识别时为None
+    """
+    with open(path, 'rb') as f:
+        head = f.read(4096)
+    if not head:
+        return None
+    if len(head) < 4096 and known_stub(head):
+        return "stub"
+    if head.startswith(b'PK'):
+        return "excel"
+    text = head.lstrip(b'\xef\xbb\xbf \t\r\n')
+    lower = text[:1024].lower()
+    if b'<positionrank' in lower:
+        return "xml"
+    if lower.startswith((b'<!doctype html', b'<html')) or b'<html' in lower:
+        return "html"
+    if text.startswith(b'#'):
+        return "csv_sections"
+    if text.startswith(b'date,'):
+        return "csv_flat"
+    return None
+
+
+def guess_product_date(path):
+    """
+    从文件名推断产品和日期, 如 debug_page_IF.html、IF_20250912.xml、IF_range_2025-09-08_to_2025-09-12.csv
+    Returns:
+        tuple: (产品代码, YYYY-MM-DD), 无法推断的部分为空字符串
+    """
+    name = os.path.basename(path)
+    product = _FILENAME_PRODUCT.search(name)
+    date = _FILENAME_DATE.search(name)
+    return (product.group(1) if product else '',
+            '-'.join(date.groups()) if date else '')
+
+
+def read_records(path, product_id=None, date=None, position_amounts=False):
+    """
+    读取单个文件中的全部记录
+    Args:
+        path: 文件路径
+        product_id: 产品代码, 文件中没有时使用 (如debug_page_*.html), 默认从文件名推断
+        date: 日期 (YYYY-MM-DD), 文件中没有时使用, 默认从文件名推断
+        position_amounts: 为True时XML文件在排名记录之后返回按会员类别汇总的数据 (PositionAmount)
+    Yields:
+        RankingRecord: 带日期、产品 (和合约) 的记录, 包括合计行
+    """
+    fmt = detect_format(path)
+    guessed_product, guessed_date = guess_product_date(path)
+    product_id = product_id or guessed_product
+    date = date or guessed_date
+
+    if fmt == "stub":
+        logging.warning(f"跳过错误页面文件: {path}")
+        return
+    readers = {
+        "xml": _read_xml,
+        "html": _read_html,
+        "csv_sections": _read_section_csv,
+        "csv_flat": _read_flat_csv,
+        "excel": _read_excel,
+    }
+    if position_amounts:
+        readers["xml"] = functools.partial(_read_xml, position_amounts=True)
+    if fmt not in readers:
+        logging.warning(f"无法识别的文件格式: {path}")
+        return
+    logging.info(f"读取{fmt}文件: {path}")
+    yield from readers[fmt](path, product_id, date)
+
+
+def iter_archive(paths, product_id=None, date=None, position_amounts=False):
+    """
+    依次读取多个文件或目录中的全部记录
+    Args:
+        paths: 文件或目录路径 (或其列表), 目录中只读取支持的扩展名
+        product_id: 同read_records
+        date: 同read_records
+        position_amounts: 同read_records
+    Yields:
+        RankingRecord: 各文件中的记录
+    """
+    if isinstance(paths, (str, os.PathLike)):
+        paths = [paths]
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(os.path.join(root, name)
+                           for root, _, names in os.walk(path)
+                           for name in names if name.lower().endswith(SUPPORTED_EXTENSIONS))
+        else:
+            files = [path]
+        for file_path in files:
+            try:
+                yield from read_records(file_path, product_id, date, position_amounts)
+            except Exception as e:
+                logging.error(f"读取文件 {file_path} 时发生错误: {e}")
+
+
+def migrate_archive(paths, sinks, buffer_size=5000):
+    """
+    把历史文件一次性写入输出目标 (ParquetSink/SQLiteSink/CsvSink),
+    XML中按会员类别汇总的数据写入提供write_amounts的输出目标 (SQLiteSink/AmountCsvSink)
+    Args:
+        paths: 文件或目录路径 (或其列表)
+        sinks: 输出目标列表
+        buffer_size: 每批写入的记录数
+    Returns:
+        int: 写入的排名记录数
+    """
+    from cffex_pipeline import ExportPipeline
+
+    pipeline = ExportPipeline(sinks, buffer_size=buffer_size, flush_interval=float('inf'))
+    return pipeline.run_records(iter_archive(paths, position_amounts=True))
+
+
+def _annotate(contracts, product_id, date):
+    for instrument_id, data in contracts.items():
+        for ranking_type in RankingType:
+            for record in data.get(ranking_type.value, []):
+                record.date = record.date or date
+                record.product_id = record.product_id or product_id
+                record.instrument_id = record.instrument_id or instrument_id
+                yield record
+
+
+def _read_xml(path, product_id, date, position_amounts=False):
+    with open(path, 'rb') as f:
+        content = f.read()
+    # XML中带有交易日和产品代码, 优先于文件名
+    day = re.search(rb"<tradingday>(\d{4})(\d{2})(\d{2})</tradingday>", content, re.I)
+    product = re.search(rb"<productid>(\w+)</productid>", content, re.I)
+    if day:
+        date = '-'.join(part.decode() for part in day.groups())
+    if product:
+        product_id = product.group(1).decode()
+    document = _get_parser().parse_xml_document(content)
+    if not document:
+        return
+    yield from _annotate(document["contracts"], product_id, date)
+    if position_amounts:
+        for amount in document["position_amounts"]:
+            amount.date = amount.date or date
+            amount.product_id = amount.product_id or product_id
+            yield amount
+
+
+def _read_html(path, product_id, date):
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        page_source = f.read()
+    contracts = _get_parser().parse_page_instruments(page_source) or {}
+    yield from _annotate(contracts, product_id, date)
+
+
+def _row_record(ranking_type, row, date, product_id, instrument_id=''):
+    """由 [名次, 会员简称, 数量, 增减] 创建记录, 空行和表头行返回None"""
+    if len(row) < 4 or not str(row[0] or '').strip():
+        return None
+    return RankingRecord.from_fields(ranking_type, row[0], row[1], row[2], row[3], date, product_id, instrument_id)
+
+
+def _read_section_csv(path, product_id, date):
+    ranking_type = None
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for row in csv.reader(f):
+            first = row[0].strip() if row else ''
+            if first.startswith('#'):
+                key, _, value = first.lstrip('# ').partition(':')
+                if key.strip() == '产品代码' and value.strip() not in ('', 'N/A'):
+                    product_id = value.strip()
+                elif key.strip() == '查询日期' and value.strip() not in ('', 'N/A'):
+                    date = value.strip()
+            elif first in RANKING_TYPE_NAMES:
+                ranking_type = RANKING_TYPE_NAMES[first]
+            elif ranking_type and first and first != '名次':
+                record = _row_record(ranking_type, row, date, product_id)
+                if record:
+                    yield record
+
+
+def _flat_record(row, product_id, date):
+    """由平铺格式 (CsvSink/ExcelSink的列) 的一行创建记录, 无法识别时返回None"""
+    ranking_type = RANKING_TYPE_NAMES.get(str(row.get('ranking_type') or '').strip())
+    if ranking_type is None:
+        return None
+    return RankingRecord.from_fields(
+        ranking_type,
+        row.get('rank') or '',
+        row.get('member_name') or '',
+        row.get('volume'),
+        row.get('change'),
+        row.get('date') or date,
+        row.get('product_id') or product_id,
+        row.get('instrument_id') or '',
+        row.get('party_id') or ''
+    )
+
+
+def _read_flat_csv(path, product_id, date):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f):
+            record = _flat_record(row, product_id, date)
+            if record:
+                yield record
+
+
+def _sheet_groups(header):
+    """
+    表头中每个"名次"开始一组 [名次, 会员简称, 数量, 增减] 列, 按数量列名称确定排名类型
+    Returns:
+        list: (起始列, 排名类型)
+    """
+    groups = []
+    for index, name in enumerate(header):
+        if str(name or '').strip() != '名次':
+            continue
+        volume_name = str(header[index + 2] if index + 2 < len(header) else '').split('.')[0].strip()
+        ranking_type = VOLUME_HEADERS.get(volume_name)
+        if ranking_type is None:
+            ranking_type = list(RankingType)[len(groups) % len(RankingType)]
+        groups.append((index, ranking_type))
+    return groups
+
+
+def _read_excel(path, product_id, date):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        if 'Metadata' in workbook.sheetnames:
+            rows = list(workbook['Metadata'].iter_rows(values_only=True))
+            if len(rows) >= 2:
+                metadata = dict(zip(rows[0], rows[1]))
+                product_id = metadata.get('Product ID') or product_id
+                date = str(metadata.get('Date') or date)[:10]
+
+        for sheet_name in workbook.sheetnames:
+            if sheet_name == 'Metadata':
+                continue
+            rows = workbook[sheet_name].iter_rows(values_only=True)
+            header = next(rows, None)
+            if not header:
+                continue
+            if 'ranking_type' in header:
+                # ExcelSink的平铺记录
+                for row in rows:
+                    record = _flat_record(dict(zip(header, row)), product_id, date)
+                    if record:
+                        yield record
+                continue
+            groups = _sheet_groups(header)
+            for row in rows:
+                for start, ranking_type in groups:
+                    record = _row_record(ranking_type, list(row[start:start + 4]), date, product_id)
+                    if record and (record.member_name or record.rank_label == TOTAL_LABEL):
+                        yield record
+    finally:
+        workbook.close()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中金所页面就绪检测
+功能: 用具体的页面信号代替固定的time.sleep等待, 并记录每次等待的实际耗时
+信号: ccpm.js中knockout视图模型(main)的tabledata/isShow/isHavResult绑定,
+      持仓排名XML请求(XHR)完成计数, 以及页面上的no_data提示
+"""
+
+import logging
+import time
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+# 给XMLHttpRequest打补丁, 统计已完成的 /sj/ccpm/ 请求数
+# jQuery在load事件中执行success回调, loadend在其之后触发, 此时knockout绑定已更新
+XHR_HOOK_JS = """
+if (!window.__cffexReady) {
+    window.__cffexReady = {xhrDone: 0};
+    var origOpen = XMLHttpRequest.prototype.open;
+    XMLHttpRequest.prototype.open = function(method, url) {
+        if (String(url).indexOf('/sj/ccpm/') >= 0) {
+            this.addEventListener('loadend', function() { window.__cffexReady.xhrDone += 1; });
+        }
+        return origOpen.apply(this, arguments);
+    };
+}
+"""
+
+STATE_JS = """
+var hook = window.__cffexReady || {xhrDone: 0};
+var vm = window.main;
+var hasVm = !!(vm && vm.tabledata);
+var noData = document.querySelector('.no_data');
+var tabledata = hasVm ? (vm.tabledata() || []) : [];
+return {
+    ready: document.readyState === 'complete',
+    xhrDone: hook.xhrDone,
+    hasVm: hasVm,
+    isShow: hasVm ? !!vm.isShow() : null,
+    noResult: hasVm ? !!vm.isHavResult() : null,
+    noDataVisible: !!(noData && noData.offsetParent !== null && noData.textContent.trim()),
+    tables: document.querySelectorAll('table tr td').length > 0 ? document.querySelectorAll('table').length : 0,
+    marker: hasVm ? (vm.tradingdayShow() || '') + '|' + tabledata.map(function(t) { return t.insShow; }).join(',') : ''
+};
+"""
+
+
+class PageReadiness:
+    def __init__(self, driver, timeout=15, poll_frequency=0.1, metrics=None):
+        """
+        初始化就绪检测
+        Args:
+            driver: WebDriver实例
+            timeout: 默认最长等待秒数
+            poll_frequency: 轮询间隔秒数
+            metrics: 运行指标 (CrawlMetrics), 每次等待记录为"wait"阶段耗时和按信号、结果的计数
+        """
+        self.driver = driver
+        self.metrics = metrics
+        self.timeout = timeout
+        self.poll_frequency = poll_frequency
+        # 每次等待的记录: {"signal": 信号名, "elapsed": 耗时秒数, "outcome": 结果}
+        self.timings = []
+        self.last_outcome = None
+
+    def install_hooks(self):
+        """在当前页面安装XHR完成计数钩子, 页面重新加载后需要再次安装"""
+        try:
+            self.driver.execute_script(XHR_HOOK_JS)
+        except Exception as e:
+            logging.debug(f"安装XHR钩子失败: {e}")
+
+    def state(self):
+        """
+        读取当前页面状态
+        Returns:
+            dict: XHR完成数、视图模型状态、no_data提示和表格标记
+        """
+        try:
+            return self.driver.execute_script(STATE_JS) or {}
+        except Exception as e:
+            logging.debug(f"读取页面状态失败: {e}")
+            return {}
+
+    def wait_for(self, signal, condition, timeout=None):
+        """
+        等待条件成立并记录耗时
+        Args:
+            signal: 信号名, 用于日志和耗时记录
+            condition: 参数为WebDriver的函数, 返回真值时结束等待
+            timeout: 最长等待秒数, 默认使用self.timeout
+        Returns:
+            条件函数的返回值, 超时返回None
+        """
+        start = time.perf_counter()
+        try:
+            outcome = WebDriverWait(self.driver, timeout or self.timeout,
+                                    poll_frequency=self.poll_frequency).until(condition)
+        except TimeoutException:
+            outcome = None
+        elapsed = time.perf_counter() - start
+        self.timings.append({"signal": signal, "elapsed": round(elapsed, 3), "outcome": outcome})
+        if self.metrics:
+            self.metrics.observe("wait", elapsed)
+            self.metrics.count("waits", signal=signal, outcome="timeout" if outcome is None else outcome)
+        if outcome is None:
+            logging.warning(f"等待 {signal} 超时 ({elapsed:.2f}秒)")
+        else:
+            logging.info(f"等待 {signal} 用时 {elapsed:.3f}秒，结果: {outcome}")
+        return outcome
+
+    @staticmethod
+    def _outcome(state, before=None):
+        """根据页面状态判断查询结果: "data"、"no_data", 尚未完成时返回None"""
+        if not state or not state.get('ready'):
+            return None
+        if before is not None:
+            changed = (state.get('xhrDone', 0) > before.get('xhrDone', 0)
+                       or state.get('marker') != before.get('marker'))
+            if not changed:
+                return None
+        if state.get('hasVm'):
+            if state.get('isShow') and state.get('tables'):
+                return "data"
+            if state.get('noResult') or state.get('noDataVisible'):
+                return "no_data"
+            return None
+        # 页面结构变化, 没有视图模型时退回到DOM信号
+        if state.get('noDataVisible'):
+            return "no_data"
+        if state.get('tables'):
+            return "data"
+        return None
+
+    def wait_until_loaded(self, timeout=None):
+        """
+        等待页面加载完成并显示首次查询结果
+        Returns:
+            str: "data"、"no_data", 超时返回None
+        """
+        self.last_outcome = self.wait_for("页面加载", lambda d: self._outcome(self.state()), timeout)
+        self.install_hooks()
+        return self.last_outcome
+
+    def wait_for_query_result(self, before, timeout=None):
+        """
+        等待一次查询完成 (XHR完成或表格内容变化)
+        Args:
+            before: 点击查询前通过state()读取的页面状态
+        Returns:
+            str: "data"、"no_data", 超时返回None
+        """
+        self.last_outcome = self.wait_for("查询结果", lambda d: self._outcome(self.state(), before), timeout)
+        return self.last_outcome
+
+    def wait_for_input_value(self, element, value, timeout=None):
+        """
+        等待输入框的值变为指定值
+        Returns:
+            bool: 是否在超时前完成
+        """
+        return bool(self.wait_for(
+            "日期输入",
+            lambda d: element.get_attribute('value') == value,
+            timeout or 2
+        ))
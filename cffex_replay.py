@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中金所离线回放服务
+功能: 在本地HTTP服务上按交易所的地址格式回放仓库中保存的文件:
+      /sj/ccpm/{YYYYMM}/{DD}/{产品}.xml 返回录制的XML (或录制的错误页面),
+      /ccpm/?productid={产品} 返回保存的debug_page_{产品}.html, 其他产品返回无数据页面,
+      状态码200的响应带ETag并支持条件请求 (If-None-Match), 客户端接受时以gzip压缩传输,
+      可以模拟临时性错误 (如503); 测试和性能测试不需要Chrome和网络
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from cffex_reader import detect_format, guess_product_date
+
+_XML_PATH = re.compile(r"^/sj/ccpm/(\d{4})(\d{2})/(\d{2})/(\w+)\.xml$")
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # 支持keep-alive, 与交易所一致
+
+    def do_GET(self):
+        replay = self.server.replay
+        status, body, content_type = replay.respond(self.path)
+        etag = f'"{hashlib.md5(body).hexdigest()}"' if status == 200 else None
+        if etag and self.headers.get("If-None-Match") == etag:
+            status, body = 304, b""
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        if etag:
+            self.send_header("ETag", etag)
+        compressed = status == 200 and "gzip" in self.headers.get("Accept-Encoding", "")
+        if compressed:
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        replay.record_client(self.client_address, compressed)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ReplayServer:
+    def __init__(self, root=".", host="127.0.0.1", port=0):
+        """
+        初始化回放服务, 读取目录中录制的XML、错误页面和调试页面
+        Args:
+            root: 录制文件所在目录, 为None时不读取, 只使用add_xml/add_page添加的内容
+            host: 监听地址
+            port: 监听端口, 0表示自动选择空闲端口
+        """
+        self.host = host
+        self.port = port
+        self.xml = {}           # (产品, 日期) -> 内容
+        self.stubs = {}         # (产品, 日期) -> 错误页面内容, 以状态码200返回
+        self.pages = {}         # 产品 -> 页面内容, ""为无数据页面
+        self.hits = {}          # 请求路径 -> 次数
+        self.failures = {}      # (产品, 日期) -> [状态码, 剩余次数], 模拟临时性错误
+        self.clients = set()    # 客户端地址, 用于检查连接复用
+        self.compressed = 0     # 以gzip压缩传输的响应数
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        if root is not None:
+            self.load_directory(root)
+
+    def load_directory(self, root):
+        """
+        读取目录中的录制文件, 按文件名推断产品和日期
+        Args:
+            root: 目录路径
+        """
+        for name in sorted(os.listdir(root)):
+            path = os.path.join(root, name)
+            if not os.path.isfile(path) or not name.lower().endswith(('.xml', '.html', '.htm')):
+                continue
+            fmt = detect_format(path)
+            product_id, date = guess_product_date(path)
+            if fmt == "xml" and product_id and date:
+                self.add_xml(product_id, date, path)
+            elif fmt == "stub" and product_id and date:
+                with open(path, 'rb') as f:
+                    self.stubs[(product_id, date)] = f.read()
+            elif fmt == "html":
+                self.add_page(product_id, path)
+        logging.info(f"回放服务已加载 {len(self.xml)} 个XML、{len(self.stubs)} 个错误页面、{len(self.pages)} 个页面")
+
+    def add_xml(self, product_id, date, content):
+        """
+        添加 (或替换) 一个交易日的XML
+        Args:
+            product_id: 产品代码
+            date: 日期, 格式YYYY-MM-DD
+            content: XML内容 (bytes) 或文件路径
+        """
+        self.xml[(product_id, date)] = self._read(content)
+
+    def add_failure(self, product_id, date, status=503, times=1):
+        """
+        让一个交易日的XML请求先返回若干次错误状态码, 之后正常返回
+        Args:
+            product_id: 产品代码
+            date: 日期, 格式YYYY-MM-DD
+            status: 错误状态码
+            times: 返回错误的次数
+        """
+        self.failures[(product_id, date)] = [status, times]
+
+    def record_client(self, address, compressed=False):
+        """记录请求的客户端地址, 以及响应是否以gzip压缩传输"""
+        with self._lock:
+            self.clients.add(address)
+            self.compressed += compressed
+
+    def add_page(self, product_id, content):
+        """
+        添加 (或替换) 一个产品的页面
+        Args:
+            product_id: 产品代码, 为空字符串时作为其他产品的默认页面
+            content: 页面内容 (bytes) 或文件路径
+        """
+        self.pages[product_id] = self._read(content)
+
+    @staticmethod
+    def _read(content):
+        if isinstance(content, (str, os.PathLike)):
+            with open(content, 'rb') as f:
+                return f.read()
+        return content
+
+    def respond(self, path):
+        """
+        按请求路径生成响应
+        Args:
+            path: 请求路径 (含查询参数)
+        Returns:
+            tuple: (状态码, 响应内容, Content-Type)
+        """
+        with self._lock:
+            self.hits[path] = self.hits.get(path, 0) + 1
+
+        parsed = urlparse(path)
+        match = _XML_PATH.match(parsed.path)
+        if match:
+            year_month, day, product_id = match.group(1) + match.group(2), match.group(3), match.group(4)
+            key = (product_id, f"{year_month[:4]}-{year_month[4:]}-{day}")
+            with self._lock:
+                failure = self.failures.get(key)
+                if failure and failure[1] > 0:
+                    failure[1] -= 1
+                    return failure[0], b"busy", "text/plain"
+            if key in self.xml:
+                return 200, self.xml[key], "text/xml;charset=UTF-8"
+            if key in self.stubs:
+                return 200, self.stubs[key], "text/html;charset=UTF-8"
+            return 404, next(iter(self.stubs.values()), b""), "text/html;charset=UTF-8"
+
+        if parsed.path.rstrip('/') == "/ccpm":
+            product_id = parse_qs(parsed.query).get("productid", [""])[0]
+            page = self.pages.get(product_id, self.pages.get(""))
+            if page is not None:
+                return 200, page, "text/html;charset=UTF-8"
+        return 404, b"not found", "text/plain"
+
+    @property
+    def url(self):
+        """服务地址, 如 http://127.0.0.1:50123"""
+        return f"http://{self.host}:{self._server.server_address[1]}"
+
+    @property
+    def xml_base_url(self):
+        return f"{self.url}/sj/ccpm/"
+
+    @property
+    def page_base_url(self):
+        return f"{self.url}/ccpm/"
+
+    def start(self):
+        """在后台线程启动服务"""
+        if self._server is None:
+            self._server = ThreadingHTTPServer((self.host, self.port), _ReplayHandler)
+            self._server.daemon_threads = True
+            self._server.replay = self
+            self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+            self._thread.start()
+            logging.info(f"回放服务已启动: {self.url}")
+        return self
+
+    def stop(self):
+        """停止服务"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def configure(self, spider):
+        """
+        让爬虫的XML下载和页面访问都指向回放服务
+        Args:
+            spider: CFFEXSpider实例
+        Returns:
+            CFFEXSpider: 同一个爬虫
+        """
+        spider.xml_base_url = self.xml_base_url
+        spider.base_url = self.page_base_url
+        return spider
+
+    def make_spider(self, **kwargs):
+        """
+        创建指向回放服务的爬虫, 默认只用XML、不使用缓存, 并使用不限速的独立限速器
+        Args:
+            **kwargs: CFFEXSpider的其他参数
+        Returns:
+            CFFEXSpider: 爬虫实例
+        """
+        from cffex_spider import CFFEXSpider
+        from cffex_throttle import AdaptiveRateLimiter
+
+        kwargs.setdefault("fetch_mode", "xml")
+        kwargs.setdefault("cache", None)
+        kwargs.setdefault("rate_limiter", AdaptiveRateLimiter(initial_rate=1000.0, max_rate=1000.0, burst=1000))
+        return self.configure(CFFEXSpider(**kwargs))
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中金所每日定时爬取
+功能: 常驻进程, 每个交易日收盘后用条件请求 (ETag/Last-Modified) 低成本轮询当天的XML,
+      一发布就并发爬取全部产品并保存为CSV; 同一个爬虫和工作线程的爬虫跨交易日复用,
+      保持连接, 不需要每天冷启动进程
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from cffex_spider import CFFEXSpider
+
+
+def _parse_clock(value):
+    """"HH:MM" -> datetime.time"""
+    return datetime.strptime(value, '%H:%M').time()
+
+
+class DailyScheduler:
+    def __init__(self, spider=None, product_ids=None, poll_start="15:30", deadline="19:00", poll_interval=30,
+                 max_workers=4, rate=2.0, output_dir=".", checkpoint=None, clock=None):
+        """
+        初始化定时爬取
+        Args:
+            spider: 用于轮询的爬虫, 默认创建XML模式的爬虫; 并发爬取的工作线程使用相同配置
+            product_ids: 产品代码列表, 默认为主要股指期货
+            poll_start: 开始轮询的时间 (HH:MM), 收盘后数据发布前
+            deadline: 停止轮询的时间 (HH:MM), 之后仍未发布的产品当天不再爬取
+            poll_interval: 两次轮询之间的秒数
+            max_workers: 并发爬取的线程数
+            rate: 并发爬取时每个主机的初始每秒请求数
+            output_dir: CSV文件保存目录
+            checkpoint: 断点记录 (CrawlCheckpoint), 记录每个产品的完成状态
+            clock: 返回当前时间的函数, 默认为datetime.now
+        """
+        self.spider = spider or CFFEXSpider(fetch_mode="xml")
+        self.product_ids = list(product_ids or ["IM", "IF", "IC", "IH"])
+        self.poll_start = _parse_clock(poll_start)
+        self.deadline = _parse_clock(deadline)
+        self.poll_interval = poll_interval
+        self.output_dir = output_dir
+        self.checkpoint = checkpoint
+        self.clock = clock or datetime.now
+        self.calendar = self.spider.calendar
+        # 工作线程的爬虫跨交易日复用, 连接保持打开
+        self.crawler = self.spider._range_crawler(max_workers, rate, None)
+        # {(产品, 日期): 条件请求信息}
+        self._validators = {}
+        self._stop = threading.Event()
+
+    def next_run_date(self):
+        """
+        下一个需要爬取的交易日: 今天是交易日且未过截止时间时为今天, 否则为之后的第一个交易日
+        Returns:
+            str: YYYY-MM-DD
+        """
+        now = self.clock()
+        day = now.date() if now.time() < self.deadline else now.date() + timedelta(days=1)
+        while not any(self.calendar.is_trading_day(day.strftime('%Y-%m-%d'), p) for p in self.product_ids):
+            day += timedelta(days=1)
+        return day.strftime('%Y-%m-%d')
+
+    def poll(self, product_id, date):
+        """
+        对一个产品发送一次条件请求, 检查当天的XML是否已经发布
+        Args:
+            product_id: 产品代码
+            date: 日期, 格式YYYY-MM-DD
+        Returns:
+            dict: 已发布时为get_product_data格式的结果, 未发布 (404、304或错误页面) 时返回None
+        """
+        validators = self._validators.setdefault((product_id, date), {})
+        content = self.spider.fetch_xml(product_id, date, validators)
+        self.spider.metrics.count("polls", outcome="published" if content else "pending")
+        if not content:
+            return None
+        document = self.spider.load_xml_content(product_id, date, content)
+        if not document or not document['contracts']:
+            return None
+        result = self.spider._contracts_result(product_id, date, document['contracts'],
+                                               position_amounts=document['position_amounts'])
+        self.spider.annotate_records(result, date, product_id)
+        return result
+
+    def run_day(self, date):
+        """
+        轮询直到当天的数据发布, 然后并发爬取其余产品并保存
+        Args:
+            date: 日期, 格式YYYY-MM-DD
+        Returns:
+            dict: {"date", "files": {产品: CSV文件}, "range_file": 汇总CSV文件,
+                   "amounts_file": 按会员类别汇总的CSV文件, "missing": 截止时仍未发布的产品}
+        """
+        pending = [p for p in self.product_ids if self.calendar.is_trading_day(date, p)]
+        deadline = datetime.combine(datetime.strptime(date, '%Y-%m-%d').date(), self.deadline)
+        results = {}
+        logging.info(f"开始轮询 {date} 的数据: {', '.join(pending)}")
+
+        while pending and not self._stop.is_set():
+            probe = pending[0]
+            result = self.poll(probe, date)
+            if result:
+                found = {probe: result}
+                # 一个产品发布时其他产品通常也已发布, 剩余产品并发爬取
+                others = [p for p in pending if p != probe]
+                if others:
+                    for other in self.crawler.crawl(others, date, date):
+                        found[other.get('product_id')] = other
+                published_at = self.clock()
+                for product_id, data in found.items():
+                    logging.info(f"{product_id} {date} 的数据已发布, 发现时间: {published_at:%H:%M:%S}")
+                    results[product_id] = self.save_result(data)
+                    if self.checkpoint:
+                        self.checkpoint.record_result(product_id, date, data)
+                pending = [p for p in pending if p not in found]
+                continue
+            if self.clock() + timedelta(seconds=self.poll_interval) > deadline:
+                break
+            self._stop.wait(self.poll_interval)
+
+        if pending:
+            logging.warning(f"截止时间前 {date} 仍未发布的产品: {', '.join(pending)}")
+        range_file = amounts_file = None
+        if results:
+            all_data = [data for data, _ in results.values()]
+            range_file = self.spider.save_range_data_to_csv(
+                all_data, os.path.join(self.output_dir, f"cffex_{date.replace('-', '')}.csv"))
+            amounts_file = self.spider.save_position_amounts_to_csv(
+                all_data, os.path.join(self.output_dir, f"cffex_amounts_{date.replace('-', '')}.csv"))
+        return {
+            "date": date,
+            "files": {product_id: filename for product_id, (_, filename) in results.items()},
+            "range_file": range_file,
+            "amounts_file": amounts_file,
+            "missing": pending,
+        }
+
+    def save_result(self, data):
+        """
+        保存单个产品的结果
+        Returns:
+            tuple: (结果, CSV文件路径)
+        """
+        filename = os.path.join(self.output_dir,
+                                f"cffex_{data['product_id']}_{data['date'].replace('-', '')}.csv")
+        return data, self.spider.save_to_csv(data, filename)
+
+    def run_forever(self):
+        """常驻运行, 每个交易日到轮询时间后开始轮询, 直到调用stop()"""
+        logging.info(f"定时爬取已启动: 产品 {', '.join(self.product_ids)}, "
+                     f"每个交易日 {self.poll_start:%H:%M} 至 {self.deadline:%H:%M} 轮询")
+        while not self._stop.is_set():
+            date = self.next_run_date()
+            start_at = datetime.combine(datetime.strptime(date, '%Y-%m-%d').date(), self.poll_start)
+            wait_seconds = (start_at - self.clock()).total_seconds()
+            if wait_seconds > 0:
+                logging.info(f"下一次轮询: {start_at:%Y-%m-%d %H:%M}, 等待 {wait_seconds / 3600:.1f} 小时")
+                if self._stop.wait(wait_seconds):
+                    break
+            started = time.monotonic()
+            summary = self.run_day(date)
+            logging.info(f"{date} 定时爬取完成, 用时 {time.monotonic() - started:.1f} 秒: {summary}")
+            # 截止时间之前完成时, 等到截止时间再计算下一个交易日
+            remaining = (datetime.combine(datetime.strptime(date, '%Y-%m-%d').date(), self.deadline)
+                         - self.clock()).total_seconds()
+            if remaining > 0 and self._stop.wait(remaining):
+                break
+
+    def stop(self):
+        """停止轮询 (可以在其他线程或信号处理中调用)"""
+        self._stop.set()
+
+    def close(self):
+        """关闭工作线程的爬虫"""
+        self.crawler.close()
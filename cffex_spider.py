@@ -6,20 +6,28 @@
 功能: 爬取期货持仓排名数据
 """
 
+import argparse
 import requests
 import json
-import pandas as pd
 from datetime import datetime, timedelta
 import time
 import re
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from urllib.parse import urlparse
+import xml.etree.ElementTree as ET
+from lxml import etree, html as lxml_html
 import logging
 
+from cffex_cache import ResponseCache
+from cffex_calendar import TradingCalendar
+from cffex_driver_pool import get_shared_pool
+from cffex_metrics import get_shared_metrics, timed
+from cffex_models import (PositionAmount, RankingRecord, RankingType, empty_rankings, iter_position_amounts,
+                          iter_records, normalize_rankings, total_record)
+from cffex_storage import ParquetStore
+from cffex_throttle import get_shared_limiter
+from cffex_validator import validate_response
+from cffex_warehouse import RankingWarehouse
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -31,16 +39,74 @@ logging.basicConfig(
 )
 
 class CFFEXSpider:
-    def __init__(self, headless=True):
+    # 持仓排名XML数据地址, 与ccpm.js中的 /sj/ccpm/{YYYYMM}/{DD}/{product}.xml 一致
+    xml_base_url = "http://www.cffex.com.cn/sj/ccpm/"
+    # XML中datatypeid到排名类型的映射
+    xml_datatype_map = {
+        "0": "volume_ranking",
+        "1": "buy_position_ranking",
+        "2": "sell_position_ranking"
+    }
+    # 页面中可能的数据表格选择器, 按顺序尝试
+    table_selectors = [
+        "//table[contains(@class, 'table')]",
+        "//table",
+        "//div[contains(@class, 'table')]//table",
+        "//div[@id='data']//table",
+        "//div[contains(@class, 'data')]//table"
+    ]
+    ranking_types = [ranking_type.value for ranking_type in RankingType]
+
+    def __init__(self, headless=True, fetch_mode="auto", calendar=None, cache=None, offline=False,
+                 driver_pool=None, rate_limiter=None, metrics=None):
         """
         初始化爬虫
         Args:
             headless: 是否使用无头模式
+            fetch_mode: 获取方式, "xml"=只直接下载XML, "selenium"=只使用浏览器,
+                        "auto"=优先XML, 失败时回退到浏览器
+            calendar: 交易日历, 默认使用cffex_holidays.txt
+            cache: 响应缓存文件路径或ResponseCache实例, 默认不使用缓存 (命令行默认使用cffex_cache.db)
+            offline: 离线模式, 只从缓存读取数据, 不发出任何网络请求
+            driver_pool: 浏览器连接池 (WebDriverPool), 默认使用进程内共享的连接池
+            rate_limiter: 按主机的自适应限速器 (AdaptiveRateLimiter), 默认使用进程内共享的限速器
+            metrics: 运行指标 (CrawlMetrics), 默认使用进程内共享的指标
         """
         self.base_url = "http://www.cffex.com.cn/ccpm/"
+        self.headless = headless
+        self.fetch_mode = fetch_mode
+        self.calendar = calendar or TradingCalendar()
+        self.cache = ResponseCache(cache) if isinstance(cache, str) else cache
+        self.offline = offline
+        self.driver_pool = driver_pool
+        self.rate_limiter = rate_limiter or get_shared_limiter()
+        self.metrics = metrics or get_shared_metrics()
         self.session = requests.Session()
+        self._driver = None
+        self._readiness = None
+        self.wait = None
         self.setup_headers()
-        self.setup_driver(headless)
+        # 浏览器只在页面爬取时才从连接池借出, 爬取完成后立即归还 (见get_product_data_selenium)
+
+    @property
+    def driver(self):
+        """WebDriver实例, 首次访问时才启动浏览器"""
+        if self._driver is None:
+            self.setup_driver(self.headless)
+        return self._driver
+
+    @driver.setter
+    def driver(self, value):
+        self._driver = value
+    
+    @property
+    def readiness(self):
+        """当前浏览器页面的就绪检测, 记录每次等待的实际耗时"""
+        from cffex_readiness import PageReadiness
+        
+        if self._readiness is None or self._readiness.driver is not self._driver:
+            self._readiness = PageReadiness(self.driver, metrics=self.metrics)
+        return self._readiness
         
     def setup_headers(self):
         """设置请求头"""
@@ -53,24 +119,30 @@ class CFFEXSpider:
             'Upgrade-Insecure-Requests': '1',
         })
     
+    @timed("driver_startup")
     def setup_driver(self, headless=True):
-        """设置Selenium WebDriver"""
+        """从浏览器连接池借出Selenium WebDriver"""
+        from selenium.webdriver.support.ui import WebDriverWait
+        
         try:
-            chrome_options = Options()
-            if headless:
-                chrome_options.add_argument('--headless')
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--disable-dev-shm-usage')
-            chrome_options.add_argument('--disable-gpu')
-            chrome_options.add_argument('--window-size=1920,1080')
-            chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
-            
-            self.driver = webdriver.Chrome(options=chrome_options)
-            self.wait = WebDriverWait(self.driver, 10)
-            logging.info("WebDriver初始化成功")
+            if self.driver_pool is None:
+                self.driver_pool = get_shared_pool(headless)
+            self._driver = self.driver_pool.acquire(timeout=120)
+            self.wait = WebDriverWait(self._driver, 10)
         except Exception as e:
             logging.error(f"WebDriver初始化失败: {e}")
-            self.driver = None
+            self._driver = None
+    
+    def release_driver(self, broken=False):
+        """
+        把浏览器归还连接池, 之后再使用时会重新借出
+        Args:
+            broken: 浏览器是否已崩溃, 崩溃的浏览器会被关闭而不是复用
+        """
+        if self._driver:
+            self.driver_pool.release(self._driver, broken)
+            self._driver = None
+            self.wait = None
     
     def get_product_data(self, product_id="IM", date=None, contract_month=None):
         """
@@ -82,148 +154,519 @@ class CFFEXSpider:
         Returns:
             dict: 包含持仓数据的字典
         """
+        if self.fetch_mode == "selenium":
+            return self.get_product_data_selenium(product_id, date, contract_month)
+        
+        result = self.get_product_data_xml(product_id, date, contract_month)
+        # XML明确无数据时不必再打开浏览器确认; 离线模式下回退只读取缓存的页面
+        if result.get('success') or result.get('no_data') or self.fetch_mode == "xml":
+            return result
+        
+        logging.warning(f"XML方式获取失败({result.get('error')})，回退到浏览器方式")
+        self.metrics.count("fallbacks", kind="selenium")
+        return self.get_product_data_selenium(product_id, date, contract_month)
+    
+    def get_contracts_data(self, product_id="IM", date=None, contract_months=None):
+        """
+        一次获取产品的全部合约数据, 查询同一产品的多个合约只需一次请求
+        Args:
+            product_id: 产品ID
+            date: 查询日期, 格式YYYY-MM-DD, 默认为最新交易日
+            contract_months: 合约月份列表, 如["2024-12", "2025-01"], 默认返回全部合约
+        Returns:
+            dict: {合约月份 (未指定时为合约代码): 与get_product_data相同结构的结果}
+        """
+        result = self.get_product_data(product_id, date)
+        if not result.get('success'):
+            return {month: result for month in (contract_months or [product_id])}
+        
+        contracts = result.get('contracts') or {result.get('instrument_id'): result['data']}
+        if not contract_months:
+            return {instrument_id: dict(result, data=data, instrument_id=instrument_id)
+                    for instrument_id, data in contracts.items()}
+        
+        results = {}
+        for month in contract_months:
+            instrument_id = self.match_contract(contracts, month)
+            if instrument_id is None:
+                results[month] = {
+                    "success": False,
+                    "error": f"没有合约月份 {month} 的数据",
+                    "product_id": product_id,
+                    "date": result.get('date')
+                }
+            else:
+                results[month] = dict(result, data=contracts[instrument_id], instrument_id=instrument_id)
+        return results
+    
+    def build_xml_url(self, product_id, date):
+        """
+        构造持仓排名XML地址
+        Args:
+            product_id: 产品代码
+            date: 日期, 格式YYYY-MM-DD
+        Returns:
+            str: XML地址
+        """
+        dt = datetime.strptime(date, '%Y-%m-%d')
+        return f"{self.xml_base_url}{dt.strftime('%Y%m')}/{dt.strftime('%d')}/{product_id}.xml"
+    
+    def fetch_xml(self, product_id, date, validators=None):
+        """
+        直接下载持仓排名XML
+        Args:
+            product_id: 产品代码
+            date: 日期, 格式YYYY-MM-DD
+            validators: 条件请求信息 {"ETag": ..., "Last-Modified": ...}, 传入时发送条件请求,
+                        并用响应头更新, 内容未变化 (304) 时服务器不重复发送内容
+        Returns:
+            bytes: XML原始内容, 请求失败或内容未变化时返回None
+        """
+        url = self.build_xml_url(product_id, date)
+        host = urlparse(url).netloc
+        headers = {'Referer': f"{self.base_url}?productid={product_id}"}
+        if validators:
+            if validators.get('ETag'):
+                headers['If-None-Match'] = validators['ETag']
+            if validators.get('Last-Modified'):
+                headers['If-Modified-Since'] = validators['Last-Modified']
+        if self.rate_limiter:
+            self.rate_limiter.acquire(host)
+        start = time.monotonic()
+        try:
+            with self.metrics.phase("fetch"):
+                response = self.session.get(url, headers=headers, timeout=10)
+        except requests.RequestException as e:
+            self.metrics.count("requests", outcome="error")
+            logging.warning(f"XML请求失败: {url}, {e}")
+            # 超时说明服务器压力大需要减速; 无法建立连接 (如域名解析失败) 与服务器负载无关
+            connect_failed = isinstance(e, requests.ConnectionError) and not isinstance(e, requests.Timeout)
+            self._record_request(host, start, ok=False, slow_down=not connect_failed)
+            return None
+        self.metrics.count("bytes_fetched", len(response.content))
+        if validators is not None:
+            for name in ('ETag', 'Last-Modified'):
+                if response.headers.get(name):
+                    validators[name] = response.headers[name]
+        if response.status_code != 200:
+            self.metrics.count("requests", outcome=str(response.status_code))
+            # 404是正常的无数据, 304是内容未变化; 限流或服务器错误时降低请求速率
+            self._record_request(host, start, ok=response.status_code in (304, 404))
+            logging.info(f"XML请求返回状态码 {response.status_code}: {url}")
+            return None
+        # 返回错误页面也说明服务器不能正常提供数据, 同样降低请求速率
+        ok = self.check_response(response.content, response.headers.get('Content-Type'), url)
+        self.metrics.count("requests", outcome="200" if ok else "rejected")
+        self._record_request(host, start, ok)
+        return response.content if ok else None
+    
+    def check_response(self, content, content_type=None, source=""):
+        """
+        解析前校验XML内容, 错误页面和结构变化的内容不解析也不缓存
+        Args:
+            content: 原始内容
+            content_type: 响应头中的Content-Type
+            source: 内容来源 (地址或说明), 用于日志
+        Returns:
+            bool: 内容是否为可以解析的持仓排名XML
+        """
+        check = validate_response(content, content_type)
+        if check.kind == "drift":
+            logging.error(f"XML结构与预期不一致, 请检查解析规则: {source}, {check.reason}")
+        elif not check.ok:
+            logging.warning(f"拒绝无效的XML内容: {source}, {check.reason}")
+        return check.ok
+    
+    def _record_request(self, host, start, ok, slow_down=True):
+        """把请求耗时和结果反馈给限速器"""
+        if self.rate_limiter:
+            self.rate_limiter.record(host, time.monotonic() - start, ok, slow_down)
+    
+    def parse_xml_data(self, content, contract_month=None):
+        """
+        解析持仓排名XML中指定合约的数据
+        Args:
+            content: XML原始内容
+            contract_month: 合约月份, 如"2024-12", 默认取第一个合约
+        Returns:
+            dict: 与parse_page_data结构相同的数据 (RankingRecord列表), 没有data节点时各排名为空列表, 无法解析时返回None
+        """
+        instruments = self.parse_xml_instruments(content)
+        if instruments is None:
+            return None
+        return self.select_contract(instruments, contract_month)[1]
+    
+    def parse_xml_instruments(self, content):
+        """
+        解析持仓排名XML中的全部合约 (data节点: instrumentid/datatypeid/rank/shortname/volume/varVolume)
+        Args:
+            content: XML原始内容
+        Returns:
+            dict: {合约代码: {排名类型: RankingRecord列表}}, 没有data节点时为空字典, 无法解析时返回None
+        """
+        document = self.parse_xml_document(content)
+        return document['contracts'] if document else None
+    
+    @timed("parse")
+    def parse_xml_document(self, content):
+        """
+        一次遍历解析持仓排名XML中的全部合约排名 (data节点) 和按会员类别汇总的成交量、持仓量
+        (positionamt节点: instrumentid/futurecompany/volumeamt/buyvolumeamt/sellvolumeamt及增减量)
+        Args:
+            content: XML原始内容
+        Returns:
+            dict: {"contracts": 同parse_xml_instruments, "position_amounts": PositionAmount列表},
+                  无法解析时返回None
+        """
+        try:
+            root = ET.fromstring(content)
+        except ET.ParseError as e:
+            logging.warning(f"XML解析失败: {e}")
+            return None
+        
+        # 按合约分组, 标签名统一转小写 (ccpm.js中同时出现dataTypeId和datatypeid)
+        instruments = {}
+        position_amounts = []
+        for node in root.iter():
+            tag = node.tag.lower()
+            if tag == 'positionamt':
+                amount = PositionAmount.from_fields({child.tag.lower(): child.text for child in node})
+                if amount:
+                    position_amounts.append(amount)
+                continue
+            if tag != 'data':
+                continue
+            fields = {child.tag.lower(): (child.text or '').strip() for child in node}
+            ranking_type = self.xml_datatype_map.get(fields.get('datatypeid', ''))
+            if not ranking_type:
+                continue
+            record = RankingRecord.from_fields(
+                ranking_type,
+                fields.get('rank', ''),
+                fields.get('shortname', ''),
+                fields.get('volume'),
+                fields.get('varvolume'),
+                instrument_id=fields.get('instrumentid', ''),
+                party_id=fields.get('partyid', '')
+            )
+            if record:
+                instruments.setdefault(fields.get('instrumentid', ''), empty_rankings())[ranking_type].append(record)
+        
+        for instrument_id, result in instruments.items():
+            for ranking_type, records in result.items():
+                # 与页面一致: 按名次排序并追加合计行
+                records.sort(key=lambda r: r.rank or 0)
+                if records:
+                    records.append(total_record(records, ranking_type))
+        
+        if instruments:
+            logging.info(f"XML解析到 {len(instruments)} 个合约: {', '.join(sorted(instruments))}")
+        position_amounts.sort(key=lambda a: (a.instrument_id, a.member_category))
+        return {
+            "contracts": {instrument_id: instruments[instrument_id] for instrument_id in sorted(instruments)},
+            "position_amounts": position_amounts,
+        }
+    
+    def select_contract(self, contracts, contract_month=None):
+        """
+        从按合约分组的数据中选择一个合约
+        Args:
+            contracts: {合约代码: {排名类型: 记录列表}}
+            contract_month: 合约月份, 如"2024-12", 默认取第一个合约
+        Returns:
+            tuple: (合约代码, 该合约的数据), 没有合约时为 (None, 空数据)
+        """
+        if not contracts:
+            return None, empty_rankings()
+        
+        instrument_id = list(contracts)[0]
+        if contract_month:
+            matched = self.match_contract(contracts, contract_month)
+            if matched is not None:
+                instrument_id = matched
+            else:
+                logging.warning(f"没有合约月份 {contract_month}，使用 {instrument_id or '第一个合约'}")
+        
+        result = contracts[instrument_id]
+        total_records = sum(len(records) for records in result.values())
+        logging.info(f"选择合约 {instrument_id}: {total_records} 条记录")
+        return instrument_id, result
+    
+    def match_contract(self, instrument_ids, contract_month):
+        """
+        查找合约月份对应的合约代码
+        Args:
+            instrument_ids: 合约代码列表 (或以合约代码为键的字典)
+            contract_month: 合约月份, 如"2024-12"
+        Returns:
+            str: 合约代码, 没有对应合约时返回None
+        """
+        # "2024-12" -> 合约代码后缀 "2412"
+        suffix = contract_month.replace('-', '')[-4:]
+        matched = [i for i in instrument_ids if i.endswith(suffix)]
+        return matched[0] if matched else None
+    
+    def _contracts_result(self, product_id, date, contracts, contract_month=None, position_amounts=None):
+        """
+        构造成功的查询结果, 一次获取的全部合约都保存在contracts中
+        Returns:
+            dict: data为所选合约的数据, contracts为 {合约代码: 数据},
+                  position_amounts为按会员类别汇总的成交量和持仓量 (只有XML中有)
+        """
+        instrument_id, parsed_data = self.select_contract(contracts, contract_month)
+        return {
+            "success": True,
+            "data": parsed_data,
+            "instrument_id": instrument_id,
+            "contracts": contracts,
+            "position_amounts": position_amounts or [],
+            "product_id": product_id,
+            "date": date,
+            "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+    
+    def get_product_data_xml(self, product_id="IM", date=None, contract_month=None):
+        """
+        通过直接下载XML获取持仓数据, 不启动浏览器
+        Args:
+            product_id: 产品ID
+            date: 查询日期, 格式YYYY-MM-DD, 默认为最近的交易日
+            contract_month: 合约月份, 如"2024-12"
+        Returns:
+            dict: 与get_product_data相同结构的结果
+        """
+        if date:
+            candidate_dates = [date]
+        else:
+            # 未指定日期时从今天起向前查找最近7天内的交易日
+            today = datetime.now()
+            candidate_dates = [
+                (today - timedelta(days=i)).strftime('%Y-%m-%d')
+                for i in range(7)
+            ]
+            candidate_dates = [d for d in candidate_dates if self.calendar.is_trading_day(d, product_id)]
+        
+        no_data = False
+        for candidate in candidate_dates:
+            content = None
+            if self.cache:
+                content = self.cache.get(product_id, candidate, allow_stale=self.offline)
+            from_cache = content is not None
+            if from_cache:
+                logging.info(f"使用缓存的XML: {product_id}, 日期: {candidate}")
+            elif self.offline:
+                logging.info(f"离线模式缓存未命中: {product_id}, 日期: {candidate}")
+                continue
+            else:
+                logging.info(f"正在下载XML: {product_id}, 日期: {candidate}")
+                content = self.fetch_xml(product_id, candidate)
+            if not content:
+                continue
+            document = self.load_xml_content(product_id, candidate, content, from_cache)
+            contracts = document['contracts'] if document else None
+            if contracts is not None and not contracts:
+                logging.info(f"XML显示无数据: {product_id}, 日期: {candidate}")
+                no_data = True
+                continue
+            if contracts:
+                logging.info(f"成功获取数据: {product_id}, 日期: {candidate}")
+                return self._contracts_result(product_id, candidate, contracts, contract_month,
+                                              document['position_amounts'])
+        
+        return {
+            "success": False,
+            "error": f"该日期({date or 'latest'})无XML数据",
+            "no_data": no_data,
+            "product_id": product_id,
+            "date": date or 'latest'
+        }
+    
+    def load_xml_content(self, product_id, date, content, from_cache=False):
+        """
+        解析下载的XML, 能正常解析的内容写入缓存
+        Args:
+            product_id: 产品代码
+            date: 日期, 格式YYYY-MM-DD
+            content: XML原始内容
+            from_cache: 内容是否来自缓存 (来自缓存时不重复写入)
+        Returns:
+            dict: 同parse_xml_document (合约排名和按会员类别汇总的数据), 错误页面或无法解析时为None
+        """
+        # 缓存中可能有校验加入前保存的错误页面
+        if not self.check_response(content, source=f"{product_id} {date}"):
+            return None
+        document = self.parse_xml_document(content)
+        # 只缓存有合约数据的XML, 错误页面和发布前的空文档不缓存
+        if document and document['contracts'] and self.cache and not from_cache:
+            self.cache.put(product_id, date, content)
+        return document
+    
+    def get_products_range_data_async(self, product_ids, start_date, end_date, max_connections=4,
+                                      checkpoint=None):
+        """
+        通过异步下载并发获取多个产品在日期范围内的XML数据, 只使用少量长连接
+        Args:
+            product_ids: 产品代码或产品代码列表
+            start_date: 开始日期字符串 (格式: YYYY-MM-DD)
+            end_date: 结束日期字符串 (格式: YYYY-MM-DD)
+            max_connections: 连接池大小 (同时进行的请求数)
+            checkpoint: 断点记录 (CrawlCheckpoint), 指定时跳过已完成的任务并记录本次结果
+        Returns:
+            list: 按日期、产品顺序排列的成功结果, 与get_products_range_data相同
+        """
+        from cffex_async import fetch_all
+        
+        if isinstance(product_ids, str):
+            product_ids = [product_ids]
+        units = [(product_id, date_str)
+                 for product_id in product_ids
+                 for date_str in self.calendar.trading_days(start_date, end_date, product_id)]
+        if checkpoint:
+            units = checkpoint.pending(units)
+        
+        contents, requests_to_send = {}, {}
+        for product_id, date_str in units:
+            content = self.cache.get(product_id, date_str, allow_stale=self.offline) if self.cache else None
+            if content is not None:
+                contents[(product_id, date_str)] = (content, True)
+            elif not self.offline:
+                url = self.build_xml_url(product_id, date_str)
+                requests_to_send[(product_id, date_str)] = (url, {'Referer': f"{self.base_url}?productid={product_id}"})
+        
+        logging.info(f"异步下载XML: 共 {len(units)} 个任务, 缓存命中 {len(contents)} 个, "
+                     f"需要下载 {len(requests_to_send)} 个")
+        if requests_to_send:
+            fetched = fetch_all(requests_to_send, headers=dict(self.session.headers),
+                                max_connections=max_connections, rate_limiter=self.rate_limiter,
+                                validate=self.check_response, metrics=self.metrics)
+            contents.update({key: (content, False) for key, content in fetched.items()})
+        
+        all_data = []
+        for product_id, date_str in sorted(units, key=lambda unit: (unit[1], product_ids.index(unit[0]))):
+            content, from_cache = contents.get((product_id, date_str), (None, False))
+            document = self.load_xml_content(product_id, date_str, content, from_cache) if content else None
+            contracts = document['contracts'] if document else None
+            if contracts:
+                result = self._contracts_result(product_id, date_str, contracts,
+                                                position_amounts=document['position_amounts'])
+                self.annotate_records(result, date_str, product_id)
+                all_data.append(result)
+            elif contracts is not None:
+                self.calendar.mark_no_data(date_str, product_id)
+                result = {"success": False, "error": "该日期无XML数据", "no_data": True}
+            else:
+                result = {"success": False, "error": "离线模式缓存未命中" if self.offline else "XML下载失败"}
+            if checkpoint:
+                checkpoint.record_result(product_id, date_str, result)
+        
+        logging.info(f"异步批量爬取完成，共获取 {len(all_data)} 个结果")
+        return all_data
+    
+    def get_product_data_selenium(self, product_id="IM", date=None, contract_month=None):
+        """
+        通过浏览器页面获取持仓数据 (XML方式失败时的回退方案)
+        Args:
+            product_id: 产品ID (IM=中证1000股指期货)
+            date: 查询日期, 格式YYYY-MM-DD, 默认为最新交易日
+            contract_month: 合约月份, 如"2024-12", 默认为主力合约
+        Returns:
+            dict: 包含持仓数据的字典
+        """
+        # 之前用浏览器获取过的页面直接从缓存解析
+        if date and self.cache:
+            page_source = self.cache.get(product_id, date, kind="html", allow_stale=self.offline)
+            if page_source:
+                contracts = self.parse_page_instruments(page_source)
+                if contracts:
+                    logging.info(f"使用缓存的页面: {product_id}, 日期: {date}")
+                    return self._contracts_result(product_id, date, contracts, contract_month)
+        
+        if self.offline:
+            return {
+                "success": False,
+                "error": f"离线模式下缓存中没有该日期({date or 'latest'})的数据",
+                "product_id": product_id,
+                "date": date or 'latest'
+            }
+        
+        try:
+            return self._query_page(product_id, date, contract_month)
+        finally:
+            # 每次页面爬取后立即把浏览器归还连接池, 同时存在的爬虫多于池大小时也不会耗尽
+            self.release_driver()
+    
+    def _query_page(self, product_id, date=None, contract_month=None):
+        """
+        用浏览器打开页面、设置日期并查询, 解析查询结果
+        Returns:
+            dict: 同get_product_data_selenium
+        """
+        from selenium.webdriver.common.by import By
+        
         try:
             # 构造页面URL
-            page_url = f"http://www.cffex.com.cn/ccpm/?productid={product_id}"
+            page_url = f"{self.base_url}?productid={product_id}"
             logging.info(f"正在访问页面: {page_url}")
             
             # 访问页面
-            self.driver.get(page_url)
+            if self.rate_limiter:
+                self.rate_limiter.acquire(urlparse(page_url).netloc)
+            with self.metrics.phase("navigation"):
+                self.driver.get(page_url)
+            self.driver_pool.mark_page(self._driver)
             
-            # 等待页面加载
-            time.sleep(3)
+            # 等待页面加载并显示首次查询结果
+            self.readiness.wait_until_loaded()
             
             # 设置日期
             if date:
-                try:
-                    # 优先使用完整的日期和合约选择器方法
-                    date_success = self.click_date_and_contract_selector(date)
-                    if not date_success:
-                        logging.warning(f"使用click_date_and_contract_selector失败，尝试直接使用click_date_selector方法")
-                        # 备用方案1: 直接使用click_date_selector
-                        date_success = self.click_date_selector(date)
-                        if not date_success:
-                            logging.warning(f"使用click_date_selector失败，尝试直接使用send_keys方法")
-                            # 备用方案2: 尝试多种可能的日期输入框ID
-                            date_input_ids = ["actualDate", "inputdate", "dateInput", "queryDate"]
-                            date_input_found = False
-                            
-                            for input_id in date_input_ids:
-                                try:
-                                    date_input = WebDriverWait(self.driver, 5).until(
-                                        EC.presence_of_element_located((By.ID, input_id))
-                                    )
-                                    # 清空并输入日期
-                                    date_input.clear()
-                                    time.sleep(0.5)
-                                    date_input.send_keys(date)
-                                    
-                                    # 触发事件
-                                    self.driver.execute_script("""
-                                        var element = arguments[0];
-                                        var date = arguments[1];
-                                        element.value = date;
-                                        element.dispatchEvent(new Event('input', {bubbles: true}));
-                                        element.dispatchEvent(new Event('change', {bubbles: true}));
-                                        element.dispatchEvent(new Event('blur', {bubbles: true}));
-                                    """, date_input, date)
-                                    
-                                    time.sleep(1)
-                                    logging.info(f"通过ID {input_id} 已设置日期: {date}")
-                                    date_input_found = True
-                                    break
-                                except:
-                                    continue
-                            
-                            if not date_input_found:
-                                # 备用方案3: 尝试使用XPath
-                                logging.warning(f"通过ID查找日期输入框失败，尝试使用XPath")
-                                try:
-                                    date_input = WebDriverWait(self.driver, 5).until(
-                                        EC.presence_of_element_located((By.XPATH, "//input[contains(@class, 'Wdate')]"))
-                                    )
-                                    date_input.clear()
-                                    time.sleep(0.5)
-                                    date_input.send_keys(date)
-                                    time.sleep(1)
-                                    logging.info(f"通过XPath已设置日期: {date}")
-                                except Exception as e:
-                                    logging.warning(f"所有日期设置方法都失败: {e}")
-                except Exception as e:
-                    logging.warning(f"设置日期失败: {e}")
-            
-            # 点击查询按钮
+                self.set_query_date(date)
+            
+            # 点击查询按钮, 等待查询请求完成或表格内容变化
+            outcome = self.readiness.last_outcome
             try:
                 query_button = self.driver.find_element(By.XPATH, "//button[contains(text(), '查询')]")
-                query_button.click()
+                before = self.readiness.state()
+                with self.metrics.phase("query_click"):
+                    query_button.click()
                 logging.info("已点击查询按钮")
-                
-                # 等待数据加载
-                time.sleep(5)
+                outcome = self.readiness.wait_for_query_result(before)
             except Exception as e:
                 logging.warning(f"点击查询按钮失败: {e}")
             
             # 检查是否有"无数据"提示
-            try:
-                no_data_element = self.driver.find_element(By.CLASS_NAME, "no_data")
-                if no_data_element.is_displayed() and no_data_element.text.strip():
-                    logging.info("页面显示无数据")
-                    return {
-                        "success": False,
-                        "error": f"该日期({date or 'latest'})无数据",
-                        "product_id": product_id,
-                        "date": date or 'latest'
-                    }
-            except:
-                pass  # 没有找到无数据提示，继续处理
+            no_data = outcome == "no_data"
+            if not no_data:
+                try:
+                    no_data_element = self.driver.find_element(By.CLASS_NAME, "no_data")
+                    no_data = no_data_element.is_displayed() and bool(no_data_element.text.strip())
+                except:
+                    pass  # 没有找到无数据提示，继续处理
+            if no_data:
+                logging.info("页面显示无数据")
+                return {
+                    "success": False,
+                    "error": f"该日期({date or 'latest'})无数据",
+                    "no_data": True,
+                    "product_id": product_id,
+                    "date": date or 'latest'
+                }
             
-            # 等待数据表格加载
-            try:
-                # 先等待页面完全加载
-                time.sleep(3)
-                
-                # 尝试多种可能的表格选择器
-                table_selectors = [
-                    "//table[contains(@class, 'table')]",
-                    "//table",
-                    "//div[contains(@class, 'table')]//table",
-                    "//div[@id='data']//table",
-                    "//div[contains(@class, 'data')]//table"
-                ]
-                
-                table_found = False
-                for selector in table_selectors:
-                    try:
-                        WebDriverWait(self.driver, 5).until(
-                            EC.presence_of_element_located((By.XPATH, selector))
-                        )
-                        logging.info(f"数据表格已加载，使用选择器: {selector}")
-                        table_found = True
-                        break
-                    except:
-                        continue
-                
-                if not table_found:
-                    # 如果找不到表格，打印页面源码用于调试
-                    logging.warning("未找到数据表格，打印页面内容用于调试")
-                    page_source = self.driver.page_source
-                    logging.debug(f"页面源码: {page_source[:2000]}...")  # 只打印前2000字符
-                    
-            except Exception as e:
-                logging.warning(f"等待数据表格超时: {e}")
+            if outcome != "data":
+                # 没有等到数据就绪信号，打印页面源码用于调试
+                logging.warning("未检测到数据表格，打印页面内容用于调试")
+                page_source = self.driver.page_source
+                logging.debug(f"页面源码: {page_source[:2000]}...")  # 只打印前2000字符
             
-            # 解析页面数据
-            parsed_data = self.parse_page_data()
+            # 解析页面数据: 一次取回页面源码, 在本地解析
+            page_source = self.driver.page_source
+            contracts = self.parse_page_instruments(page_source)
             
-            if parsed_data and any(parsed_data.values()):
+            if contracts:
+                if date and self.cache:
+                    self.cache.put(product_id, date, page_source, kind="html")
                 logging.info(f"成功获取数据: {product_id}, 日期: {date or 'latest'}")
-                return {
-                    "success": True,
-                    "data": parsed_data,
-                    "product_id": product_id,
-                    "date": date or 'latest',
-                    "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                }
+                return self._contracts_result(product_id, date or 'latest', contracts, contract_month)
             else:
                 logging.error("未能获取到有效数据")
                 return {
@@ -235,6 +678,9 @@ class CFFEXSpider:
                 
         except Exception as e:
             logging.error(f"获取数据时发生错误: {e}")
+            if self._driver and not self.driver_pool.is_healthy(self._driver):
+                # 浏览器已崩溃, 归还连接池回收, 下次使用时重新创建
+                self.release_driver(broken=True)
             return {
                 "success": False,
                 "error": f"获取数据时发生错误: {e}",
@@ -242,183 +688,302 @@ class CFFEXSpider:
                 "date": date or 'latest'
             }
     
-    def parse_page_data(self):
+    def parse_page_data(self, contract_month=None):
         """
         解析页面中的成交持仓排名数据
+        只通过一次WebDriver请求取回page_source, 之后用lxml在本地解析
+        Args:
+            contract_month: 合约月份, 如"2024-12", 默认取第一个合约
         Returns:
             dict: 解析后的数据
         """
         try:
-            result = {
-                "volume_ranking": [],      # 成交量排名
-                "buy_position_ranking": [], # 持买单量排名  
-                "sell_position_ranking": [] # 持卖单量排名
-            }
-            
-            # 尝试多种可能的表格选择器
-            table_selectors = [
-                "//table[contains(@class, 'table')]",
-                "//table",
-                "//div[contains(@class, 'table')]//table",
-                "//div[@id='data']//table",
-                "//div[contains(@class, 'data')]//table"
-            ]
-            
-            tables = []
-            for selector in table_selectors:
-                try:
-                    found_tables = self.driver.find_elements(By.XPATH, selector)
-                    if found_tables:
-                        tables = found_tables
-                        logging.info(f"找到 {len(tables)} 个表格，使用选择器: {selector}")
-                        break
-                except:
-                    continue
-            
-            if not tables:
-                logging.warning("未找到任何数据表格")
-                # 尝试查找其他可能的数据容器
-                try:
-                    # 查找可能包含数据的div元素
-                    data_divs = self.driver.find_elements(By.XPATH, "//div[contains(@class, 'data') or contains(@id, 'data')]")
-                    if data_divs:
-                        logging.info(f"找到 {len(data_divs)} 个数据容器")
-                        for div in data_divs:
-                            logging.debug(f"数据容器内容: {div.text[:200]}...")
-                except:
-                    pass
-                return result
-            
+            return self.parse_page_source(self.driver.page_source, contract_month)
+        except Exception as e:
+            logging.error(f"解析页面数据时发生错误: {e}")
+            return None
+    
+    def parse_page_source(self, page_source, contract_month=None):
+        """
+        用lxml解析页面HTML中指定合约的成交持仓排名数据
+        Args:
+            page_source: 页面HTML源码
+            contract_month: 合约月份, 如"2024-12", 默认取第一个合约
+        Returns:
+            dict: {排名类型: RankingRecord列表}, 无法解析时返回None
+        """
+        contracts = self.parse_page_instruments(page_source)
+        if contracts is None:
+            return None
+        return self.select_contract(contracts, contract_month)[1]
+    
+    @timed("parse")
+    def parse_page_instruments(self, page_source):
+        """
+        用lxml解析页面HTML中全部合约的成交持仓排名数据
+        Args:
+            page_source: 页面HTML源码
+        Returns:
+            dict: {合约代码: {排名类型: RankingRecord列表}}, 没有数据时为空字典, 无法解析时返回None
+        """
+        try:
+            tree = lxml_html.fromstring(page_source)
+        except (etree.ParserError, ValueError) as e:
+            logging.error(f"解析页面数据时发生错误: {e}")
+            return None
+        
+        tables = []
+        for selector in self.table_selectors:
+            tables = tree.xpath(selector)
+            if tables:
+                logging.info(f"找到 {len(tables)} 个表格，使用选择器: {selector}")
+                self.metrics.count("table_selector", selector=selector)
+                break
+        
+        if not tables:
+            logging.warning("未找到任何数据表格")
+            self.metrics.count("table_selector", selector="none")
+            return {}
+        
+        # 当前页面: 每个合约一个表格, 每行12列, 依次为成交量、持买单量、持卖单量排名各4列
+        # 无数据时页面仍保留12列的空模板行, 此时不应退回旧版解析
+        wide_layout = False
+        wide_tables = []
+        for table in tables:
+            rows = [[cell.text_content().strip() for cell in row.xpath('./td')] for row in table.iter('tr')]
+            rows = [cells for cells in rows if len(cells) >= 12]
+            wide_layout = wide_layout or bool(rows)
+            rows = [cells for cells in rows if cells[0]]
+            if rows:
+                wide_tables.append(rows)
+        
+        if wide_layout:
+            if not wide_tables:
+                logging.warning("页面表格中没有排名数据")
+                return {}
+            
+            # 表格前的"合约:IF2509"标题与表格一一对应, 对应不上时按表格顺序编号
+            instrument_ids = [a.text_content().strip().split(':')[-1]
+                              for a in tree.xpath("//a[@data-bind='text:insShow']")]
+            labelled = len(instrument_ids) == len(wide_tables)
+            if not labelled:
+                logging.warning(f"合约标题数({len(instrument_ids)})与表格数({len(wide_tables)})不一致")
+                instrument_ids = [str(i) for i in range(len(wide_tables))]
+            
+            contracts = {}
+            for instrument_id, rows in zip(instrument_ids, wide_tables):
+                result = contracts.setdefault(instrument_id, empty_rankings())
+                for cells in rows:
+                    for k, ranking_type in enumerate(self.ranking_types):
+                        record = RankingRecord.from_fields(ranking_type, *cells[k * 4:k * 4 + 4],
+                                                           instrument_id=instrument_id if labelled else '')
+                        if record:
+                            result[ranking_type].append(record)
+        else:
+            # 旧版页面: 三个排名分别在三个表格中, 每行4列, 只有一个合约
+            result = empty_rankings()
+            contracts = {"": result}
             for i, table in enumerate(tables):
-                try:
-                    # 获取表格标题或类型
-                    table_type = None
-                    
-                    # 尝试从表格前的标题获取类型
-                    try:
-                        # 查找表格前面的标题元素
-                        title_elements = self.driver.find_elements(By.XPATH, f"//table[{i+1}]/preceding-sibling::*")
-                        for title_element in title_elements[-3:]:  # 检查前3个兄弟元素
-                            title_text = title_element.text.strip()
-                            if title_text:
-                                logging.info(f"表格 {i} 标题: {title_text}")
-                                if "成交量" in title_text:
-                                    table_type = "volume_ranking"
-                                elif "持买" in title_text or "买单" in title_text:
-                                    table_type = "buy_position_ranking"
-                                elif "持卖" in title_text or "卖单" in title_text:
-                                    table_type = "sell_position_ranking"
-                                break
-                    except Exception as e:
-                        logging.debug(f"获取表格标题失败: {e}")
-                    
-                    # 如果无法从标题判断，根据表格顺序判断
-                    if not table_type:
-                        if i == 0:
+                table_type = None
+                
+                # 尝试从表格前的标题获取类型
+                for title_element in list(table.itersiblings(preceding=True))[:3]:
+                    title_text = title_element.text_content().strip()
+                    if title_text:
+                        logging.info(f"表格 {i} 标题: {title_text}")
+                        if "成交量" in title_text:
                             table_type = "volume_ranking"
-                        elif i == 1:
+                        elif "持买" in title_text or "买单" in title_text:
                             table_type = "buy_position_ranking"
-                        elif i == 2:
+                        elif "持卖" in title_text or "卖单" in title_text:
                             table_type = "sell_position_ranking"
-                        else:
-                            continue
-                    
-                    logging.info(f"解析表格 {i}，类型: {table_type}")
-                    
-                    # 解析表格数据
-                    rows = table.find_elements(By.TAG_NAME, "tr")
-                    logging.info(f"表格 {i} 共有 {len(rows)} 行")
-                    
-                    if len(rows) <= 1:  # 只有表头或没有数据
-                        logging.warning(f"表格 {i} 没有数据行")
+                        break
+                
+                # 如果无法从标题判断，根据表格顺序判断
+                if not table_type:
+                    if i < len(self.ranking_types):
+                        table_type = self.ranking_types[i]
+                    else:
                         continue
-                    
-                    for row_idx, row in enumerate(rows[1:], 1):  # 跳过表头
-                        cells = row.find_elements(By.TAG_NAME, "td")
-                        if len(cells) >= 4:
-                            record = {
-                                "rank": cells[0].text.strip(),
-                                "member_name": cells[1].text.strip(),
-                                "volume": cells[2].text.strip(),
-                                "change": cells[3].text.strip()
-                            }
-                            result[table_type].append(record)
-                            logging.debug(f"表格 {i} 第 {row_idx} 行: {record}")
-                        else:
-                            logging.debug(f"表格 {i} 第 {row_idx} 行列数不足: {len(cells)}")
-                    
-                    logging.info(f"解析表格 {table_type}: {len(result[table_type])} 条记录")
-                    
-                except Exception as e:
-                    logging.warning(f"解析表格 {i} 时发生错误: {e}")
-                    continue
-            
-            # 统计总记录数
-            total_records = sum(len(records) for records in result.values())
-            logging.info(f"总共解析到 {total_records} 条记录")
-            
-            return result
-            
-        except Exception as e:
-            logging.error(f"解析页面数据时发生错误: {e}")
-            return None
+                
+                for row in list(table.iter('tr'))[1:]:  # 跳过表头
+                    cells = [cell.text_content().strip() for cell in row.xpath('./td')]
+                    record = RankingRecord.from_fields(table_type, *cells[:4]) if len(cells) >= 4 else None
+                    if record:
+                        result[table_type].append(record)
+                
+                logging.info(f"解析表格 {table_type}: {len(result[table_type])} 条记录")
+        
+        # 统计总记录数
+        contracts = {instrument_id: result for instrument_id, result in contracts.items() if any(result.values())}
+        total_records = sum(len(records) for result in contracts.values() for records in result.values())
+        logging.info(f"总共解析到 {len(contracts)} 个合约, {total_records} 条记录")
+        
+        return contracts
     
-    def get_date_range_data(self, product_id, start_date, end_date):
+    def get_date_range_data(self, product_id, start_date, end_date, checkpoint=None):
         """
         获取指定日期范围内的成交持仓排名数据
         Args:
             product_id: 产品代码 (如 'IF', 'IC', 'IM' 等)
             start_date: 开始日期字符串 (格式: YYYY-MM-DD)
             end_date: 结束日期字符串 (格式: YYYY-MM-DD)
+            checkpoint: 断点记录 (CrawlCheckpoint), 指定时跳过已完成的日期并重试失败的日期
         Returns:
-            list: 包含所有日期数据的列表
+            list: 包含所有日期数据的列表 (断点续爬时只包含本次新获取的日期)
         """
-        from datetime import datetime, timedelta
-        
         try:
-            # 解析日期
-            start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-            end_dt = datetime.strptime(end_date, '%Y-%m-%d')
-            
-            all_data = []
-            current_date = start_dt
-            
-            logging.info(f"开始批量爬取数据: {product_id}, 日期范围: {start_date} 到 {end_date}")
-            
-            while current_date <= end_dt:
-                date_str = current_date.strftime('%Y-%m-%d')
-                logging.info(f"正在爬取日期: {date_str}")
-                
-                # 获取单日数据
-                result = self.get_product_data(product_id, date_str)
-                
-                if result.get('success'):
-                    # 为每条记录添加日期信息
-                    data = result.get('data', {})
-                    for ranking_type in ['volume_ranking', 'buy_position_ranking', 'sell_position_ranking']:
-                        for record in data.get(ranking_type, []):
-                            record['date'] = date_str
-                            record['product_id'] = product_id
-                            record['ranking_type'] = ranking_type
-                    
-                    all_data.append(result)
-                    logging.info(f"成功获取 {date_str} 的数据")
-                else:
-                    logging.warning(f"获取 {date_str} 的数据失败: {result.get('error', '未知错误')}")
-                
-                # 移动到下一个日期
-                current_date += timedelta(days=1)
-                
-                # 添加延迟避免请求过快
-                time.sleep(2)
+            all_data = list(self.iter_date_range_data(product_id, start_date, end_date, checkpoint))
+            if checkpoint:
+                # 重试成功的日期排在最后, 重新按日期排序
+                all_data.sort(key=lambda r: r.get('date', ''))
             
             logging.info(f"批量爬取完成，共获取 {len(all_data)} 个交易日的数据")
+            if self.rate_limiter:
+                logging.info(f"请求速率统计: {self.rate_limiter.stats()}")
             return all_data
             
         except Exception as e:
             logging.error(f"批量获取数据时发生错误: {e}")
             return []
+    
+    def iter_date_range_data(self, product_id, start_date, end_date, checkpoint=None, defer_success=False):
+        """
+        逐日获取日期范围内的数据, 每获取到一天就立即返回, 不在内存中累积
+        Args:
+            product_id: 产品代码
+            start_date: 开始日期字符串 (格式: YYYY-MM-DD)
+            end_date: 结束日期字符串 (格式: YYYY-MM-DD)
+            checkpoint: 断点记录 (CrawlCheckpoint)
+            defer_success: 为True时不记录成功的日期, 由调用方在数据保存后记录 (见ExportPipeline)
+        Yields:
+            dict: 成功获取的单日结果, 按日期顺序, 重试成功的日期在最后
+        """
+        # 只爬取交易日, 跳过周末、休市日和已知无数据的日期
+        trading_days = self.calendar.trading_days(start_date, end_date, product_id)
+        
+        logging.info(f"开始批量爬取数据: {product_id}, 日期范围: {start_date} 到 {end_date}, "
+                     f"共 {len(trading_days)} 个交易日")
+        
+        units = [(product_id, date_str) for date_str in trading_days]
+        if checkpoint:
+            watermark = checkpoint.watermark(product_id, trading_days)
+            units = checkpoint.pending(units)
+            logging.info(f"断点水位: {watermark or '无'}，剩余 {len(units)} 个交易日")
+        
+        for _, date_str in units:
+            logging.info(f"正在爬取日期: {date_str}")
+            
+            # 获取单日数据
+            result = self.get_product_data(product_id, date_str)
+            
+            if checkpoint and not (defer_success and result.get('success')):
+                checkpoint.record_result(product_id, date_str, result)
+            
+            if result.get('success'):
+                # 为每条记录添加日期信息
+                self.annotate_records(result, date_str, product_id)
+                logging.info(f"成功获取 {date_str} 的数据")
+                yield result
+            else:
+                if result.get('no_data'):
+                    self.calendar.mark_no_data(date_str, product_id)
+                logging.warning(f"获取 {date_str} 的数据失败: {result.get('error', '未知错误')}")
+            
+        
+        if checkpoint:
+            # 只重试本次范围内失败的日期
+            yield from checkpoint.iter_retries(self._fetch_annotated, units, record_success=not defer_success)
+    
+    def stream_range_data(self, product_ids, start_date, end_date, sinks, checkpoint=None,
+                          max_workers=4, rate=2.0, buffer_size=5000, flush_interval=60):
+        """
+        边爬取边保存日期范围内的数据, 内存占用与日期范围长度无关
+        Args:
+            product_ids: 产品代码, 传入列表时并发爬取多个产品
+            start_date: 开始日期字符串 (格式: YYYY-MM-DD)
+            end_date: 结束日期字符串 (格式: YYYY-MM-DD)
+            sinks: 输出目标列表 (CsvSink/ParquetSink/SQLiteSink)
+            checkpoint: 断点记录, 成功的日期在数据写入输出目标后才记录为完成
+            max_workers: 并发爬取多个产品时的线程池大小
+            rate: 并发爬取时每个主机的初始每秒请求数, 之后按延迟和错误率自适应调整; <=0 表示不限速
+            buffer_size: 缓冲的最大记录数, 达到后写入输出目标
+            flush_interval: 距上次写入超过该秒数时写入输出目标
+        Returns:
+            int: 写入的记录数
+        """
+        from cffex_pipeline import ExportPipeline
+        
+        pipeline = ExportPipeline(sinks, checkpoint, buffer_size, flush_interval)
+        if isinstance(product_ids, str):
+            return pipeline.run(self.iter_date_range_data(product_ids, start_date, end_date, checkpoint,
+                                                          defer_success=checkpoint is not None))
+        
+        crawler = self._range_crawler(max_workers, rate, checkpoint)
+        try:
+            return pipeline.run(crawler.iter_crawl(product_ids, start_date, end_date,
+                                                   defer_success=checkpoint is not None))
+        finally:
+            crawler.close()
 
+    def get_products_range_data(self, product_ids, start_date, end_date, max_workers=4, rate=2.0, checkpoint=None):
+        """
+        并发获取多个产品在日期范围内的数据
+        Args:
+            product_ids: 产品代码列表
+            start_date: 开始日期字符串 (格式: YYYY-MM-DD)
+            end_date: 结束日期字符串 (格式: YYYY-MM-DD)
+            max_workers: 线程池大小
+            rate: 每个主机的初始每秒请求数, 之后按延迟和错误率自适应调整; <=0 表示不限速
+            checkpoint: 断点记录 (CrawlCheckpoint)
+        Returns:
+            list: 按日期、产品顺序排列的结果列表, 可直接传给save_range_data_to_csv
+        """
+        crawler = self._range_crawler(max_workers, rate, checkpoint)
+        try:
+            return crawler.crawl(product_ids, start_date, end_date)
+        finally:
+            crawler.close()
+    
+    def _range_crawler(self, max_workers, rate, checkpoint):
+        """创建并发爬取器, 每个工作线程使用与当前爬虫相同配置的独立爬虫"""
+        from cffex_crawler import RangeCrawler
+        
+        return RangeCrawler(
+            max_workers=max_workers,
+            rate=rate,
+            spider_factory=self._worker_spider,
+            calendar=self.calendar,
+            checkpoint=checkpoint
+        )
+    
+    def _worker_spider(self):
+        """创建与当前爬虫配置相同 (包括数据地址和运行指标) 的爬虫, 供并发爬取的工作线程使用"""
+        spider = CFFEXSpider(self.headless, self.fetch_mode, self.calendar, self.cache, self.offline,
+                             driver_pool=self.driver_pool, metrics=self.metrics)
+        spider.xml_base_url = self.xml_base_url
+        spider.base_url = self.base_url
+        return spider
+    
+    def _fetch_annotated(self, product_id, date_str):
+        """获取单日数据并添加日期信息, 供断点重试使用"""
+        result = self.get_product_data(product_id, date_str)
+        if result.get('success'):
+            self.annotate_records(result, date_str, product_id)
+        elif result.get('no_data'):
+            self.calendar.mark_no_data(date_str, product_id)
+        return result
+    
+    def annotate_records(self, result, date_str, product_id):
+        """将结果中 (包括全部合约) 的记录统一为RankingRecord并补充日期和产品信息, 汇总数据同样补充"""
+        normalize_rankings(result.get('data') or {}, date_str, product_id, result.get('instrument_id') or '')
+        for instrument_id, contract_data in (result.get('contracts') or {}).items():
+            normalize_rankings(contract_data, date_str, product_id, instrument_id)
+        for amount in result.get('position_amounts') or []:
+            amount.date = amount.date or date_str
+            amount.product_id = amount.product_id or product_id
+    
+    @timed("export")
     def save_range_data_to_csv(self, all_data, filename=None):
         """
         将多日数据保存到CSV文件
@@ -438,52 +1003,17 @@ class CFFEXSpider:
                 timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
                 filename = f"cffex_range_data_{timestamp}.csv"
             
-            # 收集所有记录
-            all_records = []
-            
-            for daily_data in all_data:
-                if not daily_data.get('success'):
-                    continue
-                    
-                data = daily_data.get('data', {})
-                date_str = daily_data.get('date', '')
-                product_id = daily_data.get('product_id', '')
-                
-                # 处理成交量排名
-                for record in data.get('volume_ranking', []):
-                    all_records.append({
-                        'date': date_str,
-                        'product_id': product_id,
-                        'ranking_type': '成交量排名',
-                        'rank': record.get('rank', ''),
-                        'member_name': record.get('member_name', ''),
-                        'volume': record.get('volume', ''),
-                        'change': record.get('change', '')
-                    })
-                
-                # 处理持买单量排名
-                for record in data.get('buy_position_ranking', []):
-                    all_records.append({
-                        'date': date_str,
-                        'product_id': product_id,
-                        'ranking_type': '持买单量排名',
-                        'rank': record.get('rank', ''),
-                        'member_name': record.get('member_name', ''),
-                        'volume': record.get('volume', ''),
-                        'change': record.get('change', '')
-                    })
-                
-                # 处理持卖单量排名
-                for record in data.get('sell_position_ranking', []):
-                    all_records.append({
-                        'date': date_str,
-                        'product_id': product_id,
-                        'ranking_type': '持卖单量排名',
-                        'rank': record.get('rank', ''),
-                        'member_name': record.get('member_name', ''),
-                        'volume': record.get('volume', ''),
-                        'change': record.get('change', '')
-                    })
+            # 收集所有记录, 按日期、排名类型和名次排序 (合计行在最后)
+            records = sorted(iter_records(all_data), key=lambda r: r.sort_key())
+            all_records = [{
+                'date': record.date,
+                'product_id': record.product_id,
+                'ranking_type': record.ranking_type.label,
+                'rank': record.rank_label,
+                'member_name': record.member_name,
+                'volume': record.volume,
+                'change': record.change
+            } for record in records]
             
             if not all_records:
                 logging.warning("没有有效的记录需要保存")
@@ -493,9 +1023,6 @@ class CFFEXSpider:
             import pandas as pd
             df = pd.DataFrame(all_records)
             
-            # 按日期和排名类型排序
-            df = df.sort_values(['date', 'ranking_type', 'rank'])
-            
             df.to_csv(filename, index=False, encoding='utf-8-sig')
             
             logging.info(f"数据已保存到CSV文件: {filename}")
@@ -507,6 +1034,176 @@ class CFFEXSpider:
             logging.error(f"保存CSV文件时发生错误: {e}")
             return None
 
+    @timed("export")
+    def save_position_amounts_to_csv(self, all_data, filename=None):
+        """
+        将按会员类别汇总的成交量和持仓量 (positionamt) 保存到CSV文件, 与排名数据来自同一次解析
+        Args:
+            all_data: 多日数据列表
+            filename: 输出文件名, 默认自动生成
+        Returns:
+            str: 保存的文件路径, 没有汇总数据时返回None
+        """
+        try:
+            amounts = sorted(iter_position_amounts(all_data),
+                             key=lambda a: (a.date, a.product_id, a.instrument_id, a.member_category))
+            if not amounts:
+                logging.warning("没有按会员类别汇总的数据需要保存")
+                return None
+            
+            if not filename:
+                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                filename = f"cffex_position_amounts_{timestamp}.csv"
+            
+            import pandas as pd
+            df = pd.DataFrame([{
+                **amount.to_dict(),
+                'member_category': amount.member_category_label
+            } for amount in amounts])
+            df.to_csv(filename, index=False, encoding='utf-8-sig')
+            
+            logging.info(f"汇总数据已保存到CSV文件: {filename}, 共 {len(amounts)} 条记录")
+            return filename
+            
+        except Exception as e:
+            logging.error(f"保存汇总数据CSV文件时发生错误: {e}")
+            return None
+
+    @timed("export")
+    def save_range_data_to_parquet(self, all_data, root="cffex_parquet"):
+        """
+        将多日数据追加到按 产品/年/月 分区的Parquet数据集
+        Args:
+            all_data: 多日数据列表
+            root: 数据集根目录
+        Returns:
+            int: 保存的记录数, 失败时返回0
+        """
+        try:
+            return ParquetStore(root).append(all_data)
+        except Exception as e:
+            logging.error(f"保存Parquet文件时发生错误: {e}")
+            return 0
+
+    @timed("export")
+    def save_range_data_to_sqlite(self, all_data, path="cffex_rankings.db"):
+        """
+        将多日数据 (包括每天的全部合约) 写入SQLite数据仓库, 重复写入时覆盖更新
+        Args:
+            all_data: 多日数据列表
+            path: 数据库文件路径
+        Returns:
+            int: 保存的记录数, 失败时返回0
+        """
+        warehouse = RankingWarehouse(path)
+        try:
+            return warehouse.upsert_results(all_data)
+        except Exception as e:
+            logging.error(f"保存到数据仓库时发生错误: {e}")
+            return 0
+        finally:
+            warehouse.close()
+
+    @timed("export")
+    def save_range_data_to_excel(self, all_data, filename=None, sheet_by="product"):
+        """
+        将多日数据流式保存到Excel文件, 内存占用与数据量无关
+        Args:
+            all_data: 多日数据列表 (或逐个返回结果的生成器)
+            filename: 输出文件名, 默认自动生成
+            sheet_by: "product"=每个产品一个工作表, "ranking_type"=每种排名一个工作表
+        Returns:
+            str: 保存的文件路径
+        """
+        from cffex_pipeline import ExcelSink
+        
+        if not filename:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = f"cffex_range_data_{timestamp}.xlsx"
+        
+        try:
+            sink = ExcelSink(filename, sheet_by, append=False)
+            sink.write(iter_records(all_data))
+            sink.close()
+            logging.info(f"数据已保存到Excel文件: {filename}")
+            return filename
+        except Exception as e:
+            logging.error(f"保存Excel文件时发生错误: {e}")
+            return None
+    
+    @timed("date_selection")
+    def set_query_date(self, date):
+        """
+        在页面上设置查询日期, 依次尝试各种方法
+        Args:
+            date: 日期, 格式YYYY-MM-DD
+        Returns:
+            str: 成功的方法 ("date_and_contract_selector"/"date_selector"/"input_id"/"xpath"), 全部失败时为"failed"
+        """
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        
+        branch = "failed"
+        try:
+            # 优先使用完整的日期和合约选择器方法
+            if self.click_date_and_contract_selector(date):
+                branch = "date_and_contract_selector"
+            else:
+                logging.warning(f"使用click_date_and_contract_selector失败，尝试直接使用click_date_selector方法")
+                # 备用方案1: 直接使用click_date_selector
+                if self.click_date_selector(date):
+                    branch = "date_selector"
+                else:
+                    logging.warning(f"使用click_date_selector失败，尝试直接使用send_keys方法")
+                    # 备用方案2: 尝试多种可能的日期输入框ID
+                    date_input_ids = ["actualDate", "inputdate", "dateInput", "queryDate"]
+                    
+                    for input_id in date_input_ids:
+                        try:
+                            date_input = WebDriverWait(self.driver, 5).until(
+                                EC.presence_of_element_located((By.ID, input_id))
+                            )
+                            # 清空并输入日期
+                            date_input.clear()
+                            date_input.send_keys(date)
+                            
+                            # 触发事件
+                            self.driver.execute_script("""
+                                var element = arguments[0];
+                                var date = arguments[1];
+                                element.value = date;
+                                element.dispatchEvent(new Event('input', {bubbles: true}));
+                                element.dispatchEvent(new Event('change', {bubbles: true}));
+                                element.dispatchEvent(new Event('blur', {bubbles: true}));
+                            """, date_input, date)
+                            
+                            self.readiness.wait_for_input_value(date_input, date)
+                            logging.info(f"通过ID {input_id} 已设置日期: {date}")
+                            branch = "input_id"
+                            break
+                        except:
+                            continue
+                    
+                    if branch == "failed":
+                        # 备用方案3: 尝试使用XPath
+                        logging.warning(f"通过ID查找日期输入框失败，尝试使用XPath")
+                        try:
+                            date_input = WebDriverWait(self.driver, 5).until(
+                                EC.presence_of_element_located((By.XPATH, "//input[contains(@class, 'Wdate')]"))
+                            )
+                            date_input.clear()
+                            date_input.send_keys(date)
+                            self.readiness.wait_for_input_value(date_input, date)
+                            logging.info(f"通过XPath已设置日期: {date}")
+                            branch = "xpath"
+                        except Exception as e:
+                            logging.warning(f"所有日期设置方法都失败: {e}")
+        except Exception as e:
+            logging.warning(f"设置日期失败: {e}")
+        self.metrics.count("date_setting", branch=branch)
+        return branch
+
     def click_date_and_contract_selector(self, target_date=None, contract_month=None):
         """
         点击日期和合约选择器
@@ -554,6 +1251,10 @@ class CFFEXSpider:
     
     def click_date_selector(self, target_date):
         """点击日期选择器"""
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import TimeoutException, NoSuchElementException
+        
         try:
             # 专门针对CFFEX网站的My97DatePicker日期选择器
             try:
@@ -562,7 +1263,6 @@ class CFFEXSpider:
                 
                 # 清空并输入日期
                 date_element.clear()
-                time.sleep(0.5)
                 
                 # 转换日期格式为YYYY-MM-DD
                 formatted_date = target_date
@@ -578,8 +1278,9 @@ class CFFEXSpider:
                     element.dispatchEvent(new Event('blur', {bubbles: true}));
                 """, date_element, formatted_date)
                 
-                time.sleep(1)
+                self.readiness.wait_for_input_value(date_element, formatted_date)
                 logging.info(f"成功设置日期为: {formatted_date}")
+                self.metrics.count("date_selector", selector="actualDate")
                 return True
                 
             except (TimeoutException, NoSuchElementException):
@@ -602,7 +1303,6 @@ class CFFEXSpider:
                     
                     # 清空并输入日期
                     date_element.clear()
-                    time.sleep(0.5)
                     date_element.send_keys(target_date)
                     
                     # 触发事件
@@ -615,8 +1315,9 @@ class CFFEXSpider:
                         element.dispatchEvent(new Event('blur', {bubbles: true}));
                     """, date_element, target_date)
                     
-                    time.sleep(1)
+                    self.readiness.wait_for_input_value(date_element, target_date)
                     logging.info(f"通过选择器 {selector} 成功设置日期为: {target_date}")
+                    self.metrics.count("date_selector", selector=selector)
                     return True
                     
                 except (TimeoutException, NoSuchElementException):
@@ -631,6 +1332,10 @@ class CFFEXSpider:
     
     def click_contract_selector(self, contract_month):
         """点击合约选择器"""
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import TimeoutException, NoSuchElementException
+        
         try:
             # 常见的合约选择器元素定位方式
             contract_selectors = [
@@ -685,7 +1390,6 @@ class CFFEXSpider:
                 try:
                     contract_link = self.wait.until(EC.element_to_be_clickable((By.XPATH, link_selector)))
                     contract_link.click()
-                    time.sleep(1)
                     return True
                 except (TimeoutException, NoSuchElementException):
                     continue
@@ -698,14 +1402,21 @@ class CFFEXSpider:
     
     def click_query_button(self):
         """点击查询按钮"""
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import TimeoutException, NoSuchElementException
+        
         try:
             # 专门针对CFFEX网站的查询按钮
             try:
                 # 首先尝试找到具有data-bind="click:getDatas"的按钮
                 query_button = self.wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "button.btn-query[data-bind*='getDatas']")))
-                query_button.click()
-                time.sleep(3)  # 等待查询结果加载
+                before = self.readiness.state()
+                with self.metrics.phase("query_click"):
+                    query_button.click()
+                self.readiness.wait_for_query_result(before)  # 等待查询结果加载
                 logging.info("成功点击查询按钮")
+                self.metrics.count("query_button", selector="btn-query")
                 return True
                 
             except (TimeoutException, NoSuchElementException):
@@ -727,10 +1438,13 @@ class CFFEXSpider:
                     query_button = self.wait.until(EC.element_to_be_clickable((By.XPATH, selector)))
                     
                     # 使用JavaScript点击，避免元素被遮挡的问题
-                    self.driver.execute_script("arguments[0].click();", query_button)
-                    time.sleep(3)  # 等待查询结果加载
+                    before = self.readiness.state()
+                    with self.metrics.phase("query_click"):
+                        self.driver.execute_script("arguments[0].click();", query_button)
+                    self.readiness.wait_for_query_result(before)  # 等待查询结果加载
                     
                     logging.info(f"通过选择器 {selector} 成功点击查询按钮")
+                    self.metrics.count("query_button", selector=selector)
                     return True
                     
                 except (TimeoutException, NoSuchElementException):
@@ -740,9 +1454,12 @@ class CFFEXSpider:
             try:
                 from selenium.webdriver.common.keys import Keys
                 body = self.driver.find_element(By.TAG_NAME, "body")
-                body.send_keys(Keys.ENTER)
-                time.sleep(3)
+                before = self.readiness.state()
+                with self.metrics.phase("query_click"):
+                    body.send_keys(Keys.ENTER)
+                self.readiness.wait_for_query_result(before)
                 logging.info("通过回车键触发查询")
+                self.metrics.count("query_button", selector="enter")
                 return True
             except:
                 pass
@@ -755,21 +1472,30 @@ class CFFEXSpider:
             return False
     
     def parse_table(self, table_element):
-        """解析HTML表格"""
+        """解析HTML表格 (一次取回outerHTML后在本地解析)"""
         try:
-            rows = table_element.find_elements(By.TAG_NAME, "tr")
+            return self.parse_table_html(table_element.get_attribute('outerHTML'))
+        except Exception as e:
+            logging.error(f"解析表格时发生错误: {e}")
+            return None
+    
+    def parse_table_html(self, table_html):
+        """
+        用lxml解析单个HTML表格
+        Args:
+            table_html: 表格的HTML源码
+        Returns:
+            dict: 表头、数据行和行数, 无法解析时返回None
+        """
+        try:
+            table = lxml_html.fragment_fromstring(table_html)
+            rows = list(table.iter('tr'))
             if len(rows) < 2:  # 至少需要表头和一行数据
                 return None
             
             # 获取表头
-            headers = []
-            header_row = rows[0]
-            header_cells = header_row.find_elements(By.TAG_NAME, "th")
-            if not header_cells:
-                header_cells = header_row.find_elements(By.TAG_NAME, "td")
-            
-            for cell in header_cells:
-                headers.append(cell.text.strip())
+            header_cells = rows[0].xpath('./th') or rows[0].xpath('./td')
+            headers = [cell.text_content().strip() for cell in header_cells]
             
             if not headers:
                 return None
@@ -777,12 +1503,9 @@ class CFFEXSpider:
             # 获取数据行
             data_rows = []
             for row in rows[1:]:
-                cells = row.find_elements(By.TAG_NAME, "td")
+                cells = row.xpath('./td')
                 if len(cells) == len(headers):
-                    row_data = {}
-                    for i, cell in enumerate(cells):
-                        row_data[headers[i]] = cell.text.strip()
-                    data_rows.append(row_data)
+                    data_rows.append({headers[i]: cell.text_content().strip() for i, cell in enumerate(cells)})
             
             return {
                 "headers": headers,
@@ -790,7 +1513,7 @@ class CFFEXSpider:
                 "total_rows": len(data_rows)
             }
             
-        except Exception as e:
+        except (etree.ParserError, ValueError) as e:
             logging.error(f"解析表格时发生错误: {e}")
             return None
     
@@ -865,30 +1588,37 @@ class CFFEXSpider:
         }
         return products
     
-    def save_to_excel(self, data, filename=None):
-        """保存数据到Excel文件"""
+    @timed("export")
+    def save_to_excel(self, data, filename=None, sheet_by="ranking_type"):
+        """
+        保存单日结果到Excel文件, 按排名类型 (或产品) 分工作表流式写入结果中全部合约的记录, 另有Metadata工作表
+        Args:
+            data: get_product_data格式的结果, data为 {排名类型: 记录列表};
+                  旧格式 (data为带rows的表格列表) 按Table_N工作表保存
+            filename: 文件名, 如果为None则自动生成
+            sheet_by: "ranking_type"=每种排名一个工作表, "product"=每个产品一个工作表
+        Returns:
+            str: 保存的文件路径
+        """
+        from cffex_pipeline import ExcelSink
+        
         if not filename:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"cffex_data_{timestamp}.xlsx"
         
         try:
-            with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-                if isinstance(data, dict) and 'data' in data:
-                    for i, table_data in enumerate(data['data']):
-                        if 'rows' in table_data:
-                            df = pd.DataFrame(table_data['rows'])
-                            sheet_name = f"Table_{i+1}"
-                            df.to_excel(writer, sheet_name=sheet_name, index=False)
-                
-                # 添加元数据sheet
-                metadata = {
-                    'Product ID': [data.get('product_id', '')],
-                    'Date': [data.get('date', '')],
-                    'Timestamp': [data.get('timestamp', '')],
-                    'Success': [data.get('success', False)]
-                }
-                meta_df = pd.DataFrame(metadata)
-                meta_df.to_excel(writer, sheet_name='Metadata', index=False)
+            metadata = {
+                'Product ID': data.get('product_id', ''),
+                'Date': data.get('date', ''),
+                'Timestamp': data.get('timestamp', ''),
+                'Success': data.get('success', False)
+            }
+            if isinstance(data.get('data'), list):
+                self._save_tables_to_excel(data['data'], filename, metadata)
+            else:
+                sink = ExcelSink(filename, sheet_by, metadata=metadata, append=False)
+                sink.write(iter_records([data], all_contracts=True))
+                sink.close()
             
             logging.info(f"数据已保存到: {filename}")
             return filename
@@ -897,6 +1627,26 @@ class CFFEXSpider:
             logging.error(f"保存Excel文件时发生错误: {e}")
             return None
     
+    def _save_tables_to_excel(self, tables, filename, metadata):
+        """旧格式: 每个表格一个Table_N工作表, 列为各行中出现的全部字段"""
+        from openpyxl import Workbook
+        
+        workbook = Workbook(write_only=True)
+        for i, table_data in enumerate(tables):
+            if 'rows' not in table_data:
+                continue
+            rows = table_data['rows']
+            columns = list(dict.fromkeys(key for row in rows for key in row))
+            sheet = workbook.create_sheet(f"Table_{i+1}")
+            sheet.append(columns)
+            for row in rows:
+                sheet.append([row.get(column) for column in columns])
+        sheet = workbook.create_sheet('Metadata')
+        sheet.append(list(metadata))
+        sheet.append(list(metadata.values()))
+        workbook.save(filename)
+    
+    @timed("export")
     def save_to_csv(self, data, filename=None):
         """
         将数据保存为CSV格式
@@ -906,6 +1656,8 @@ class CFFEXSpider:
         Returns:
             str: 保存的文件路径
         """
+        import pandas as pd
+        
         try:
             if not filename:
                 timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -931,42 +1683,46 @@ class CFFEXSpider:
                 csv_data.append([f"# 错误信息: {data['error']}"])
                 csv_data.append([])
             else:
+                # 旧格式字典记录统一为RankingRecord (与save_range_data_to_csv一致)
+                rankings = normalize_rankings(dict(data["data"]), data.get('date', ''), data.get('product_id', ''),
+                                              data.get('instrument_id') or '')
+                
                 # 添加成交量排名数据
-                if data["data"]["volume_ranking"]:
+                if rankings["volume_ranking"]:
                     csv_data.append(["成交量排名"])
                     csv_data.append(["名次", "会员简称", "成交量", "比上交易日增减"])
-                    for record in data["data"]["volume_ranking"]:
+                    for record in rankings["volume_ranking"]:
                         csv_data.append([
-                            record["rank"],
-                            record["member_name"],
-                            record["volume"],
-                            record["change"]
+                            record.rank_label,
+                            record.member_name,
+                            record.volume,
+                            record.change
                         ])
                     csv_data.append([])  # 空行分隔
                 
                 # 添加持买单量排名数据
-                if data["data"]["buy_position_ranking"]:
+                if rankings["buy_position_ranking"]:
                     csv_data.append(["持买单量排名"])
                     csv_data.append(["名次", "会员简称", "持买单量", "比上交易日增减"])
-                    for record in data["data"]["buy_position_ranking"]:
+                    for record in rankings["buy_position_ranking"]:
                         csv_data.append([
-                            record["rank"],
-                            record["member_name"],
-                            record["volume"],
-                            record["change"]
+                            record.rank_label,
+                            record.member_name,
+                            record.volume,
+                            record.change
                         ])
                     csv_data.append([])  # 空行分隔
                 
                 # 添加持卖单量排名数据
-                if data["data"]["sell_position_ranking"]:
+                if rankings["sell_position_ranking"]:
                     csv_data.append(["持卖单量排名"])
                     csv_data.append(["名次", "会员简称", "持卖单量", "比上交易日增减"])
-                    for record in data["data"]["sell_position_ranking"]:
+                    for record in rankings["sell_position_ranking"]:
                         csv_data.append([
-                            record["rank"],
-                            record["member_name"],
-                            record["volume"],
-                            record["change"]
+                            record.rank_label,
+                            record.member_name,
+                            record.volume,
+                            record.change
                         ])
             
             # 保存到CSV文件
@@ -980,45 +1736,104 @@ class CFFEXSpider:
             logging.error(f"保存CSV文件时发生错误: {e}")
             return None
     
-    def run_daily_crawl(self, product_ids=None, save_excel=True):
-        """执行日常爬取任务"""
+    def run_daily_crawl(self, product_ids=None, save_excel=True, checkpoint=None, date=None):
+        """
+        执行日常爬取任务
+        Args:
+            product_ids: 产品代码列表
+            save_excel: 是否保存Excel文件
+            checkpoint: 断点记录 (CrawlCheckpoint), 跳过已完成的产品, 失败的产品按退避时间重试
+            date: 日期, 格式YYYY-MM-DD, 默认为最近的交易日; 使用断点记录时默认为今天或之前最近的交易日
+        Returns:
+            dict: {产品代码: 结果}, 断点记录中已完成的产品不包含在内
+        """
         if not product_ids:
             product_ids = ["IM", "IF", "IC", "IH"]  # 默认爬取主要股指期货
         
+        if checkpoint and not date:
+            # 断点按 (产品, 日期) 记录, 需要确定日期
+            day = datetime.now()
+            while not any(self.calendar.is_trading_day(day.strftime('%Y-%m-%d'), p) for p in product_ids):
+                day -= timedelta(days=1)
+            date = day.strftime('%Y-%m-%d')
+        
+        units = [(product_id, date) for product_id in product_ids]
+        if checkpoint:
+            units = checkpoint.pending(units)
+            skipped = [product_id for product_id in product_ids if (product_id, date) not in units]
+            if skipped:
+                logging.info(f"断点记录中 {date} 已完成的产品: {', '.join(skipped)}")
+        
         results = {}
         
-        for product_id in product_ids:
+        def save(product_id, data):
+            if save_excel and data and data.get('success'):
+                filename = f"cffex_{product_id}_{datetime.now().strftime('%Y%m%d')}.xlsx"
+                self.save_to_excel(data, filename)
+        
+        # 请求间隔由限速器控制 (fetch_xml和页面请求都经过self.rate_limiter), 命中缓存时不等待
+        for product_id, _ in units:
             logging.info(f"开始爬取产品: {product_id}")
             try:
-                data = self.get_product_data(product_id)
+                data = self.get_product_data(product_id, date)
                 results[product_id] = data
                 
-                if save_excel and data and data.get('success'):
-                    filename = f"cffex_{product_id}_{datetime.now().strftime('%Y%m%d')}.xlsx"
-                    self.save_to_excel(data, filename)
+                if checkpoint and data:
+                    checkpoint.record_result(product_id, date, data)
                 
-                # 避免请求过于频繁
-                time.sleep(2)
+                save(product_id, data)
                 
             except Exception as e:
                 logging.error(f"爬取产品{product_id}时发生错误: {e}")
                 results[product_id] = {"error": str(e)}
+                if checkpoint:
+                    checkpoint.record_result(product_id, date, results[product_id])
+        
+        if checkpoint:
+            # 只重试本次失败的产品
+            for data in checkpoint.iter_retries(self.get_product_data, units):
+                results[data.get('product_id')] = data
+                save(data.get('product_id'), data)
         
         return results
     
     def close(self):
         """关闭爬虫，释放资源"""
-        if self.driver:
-            self.driver.quit()
+        # 浏览器归还连接池供后续爬虫复用, 进程退出时统一关闭
+        self.release_driver()
         self.session.close()
+        if self.cache:
+            self.cache.close()
         logging.info("爬虫已关闭")
 
-def main():
+def main(argv=None):
     """主函数"""
+    parser = argparse.ArgumentParser(description="中金所持仓数据爬虫")
+    parser.add_argument('--offline', action='store_true', help="离线模式, 只使用本地缓存的数据")
+    parser.add_argument('--no-cache', action='store_true', help="不使用本地响应缓存")
+    parser.add_argument('--daemon', action='store_true', help="常驻运行, 每个交易日收盘后轮询并在数据发布后立即爬取")
+    parser.add_argument('--products', default="IM,IF,IC,IH", help="常驻运行时爬取的产品, 用逗号分隔")
+    parser.add_argument('--output-dir', default=".", help="常驻运行时CSV文件的保存目录")
+    parser.add_argument('--metrics-json', help="运行结束后保存指标摘要 (JSON) 的路径")
+    parser.add_argument('--metrics-prom', help="运行结束后保存Prometheus文本文件的路径")
+    args = parser.parse_args(argv)
+    
     spider = None
     try:
         # 创建爬虫实例
-        spider = CFFEXSpider()
+        spider = CFFEXSpider(fetch_mode="xml" if args.daemon else "auto",
+                             cache=None if args.no_cache else "cffex_cache.db", offline=args.offline)
+        
+        if args.daemon:
+            from cffex_scheduler import DailyScheduler
+            
+            scheduler = DailyScheduler(spider, product_ids=args.products.split(','), output_dir=args.output_dir)
+            print("⏰ 定时爬取已启动, 按 Ctrl+C 停止")
+            try:
+                scheduler.run_forever()
+            finally:
+                scheduler.close()
+            return
         
         # 批量爬取2025-09-08到2025-09-12的IF数据
         print("🚀 开始批量爬取中金所IF品种数据...")
@@ -1060,6 +1875,13 @@ def main():
         if spider:
             spider.close()
             print("🔒 爬虫已关闭")
+            try:
+                if args.metrics_json:
+                    print(f"📈 运行指标已保存到: {spider.metrics.write_json(args.metrics_json)}")
+                if args.metrics_prom:
+                    print(f"📈 Prometheus指标已保存到: {spider.metrics.write_prometheus(args.metrics_prom)}")
+            except Exception as e:
+                logging.error(f"保存运行指标失败: {e}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
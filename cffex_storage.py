@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中金所持仓排名列式存储
+功能: 按 产品/年/月 分区保存为Parquet文件, 排名、成交量、增减量为整数列,
+      会员简称使用字典编码; 每次爬取追加新文件, 不重写已有数据
+依赖: pyarrow (可选, 只在使用列式存储时需要)
+"""
+
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+
+from cffex_models import iter_records
+
+KEY_COLUMNS = ["date", "product_id", "instrument_id", "ranking_type", "rank"]
+
+
+def _import_pyarrow():
+    """按需导入pyarrow, 未安装时给出安装提示"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("列式存储需要pyarrow, 请先安装: pip install pyarrow")
+    return pa, pq
+
+
+def ranking_rows(all_data):
+    """
+    将爬取结果展开为带类型的行, 合计行可由明细汇总得到, 不单独保存
+    Args:
+        all_data: get_date_range_data/get_products_range_data返回的结果列表
+    Returns:
+        list: 每行包含date/product_id/ranking_type/rank/member_name/volume/change
+    """
+    return [record.to_dict() for record in iter_records(all_data) if not record.is_total]
+
+
+class ParquetStore:
+    def __init__(self, root="cffex_parquet"):
+        """
+        初始化列式存储
+        Args:
+            root: 数据集根目录, 其下为 product_id=IF/year=2025/month=9/ 分区目录
+        """
+        self.root = root
+
+    def schema(self):
+        """数据文件的列类型 (分区列product_id/year/month保存在目录名中)"""
+        pa, _ = _import_pyarrow()
+        return pa.schema([
+            ('date', pa.date32()),
+            ('product_id', pa.string()),
+            ('year', pa.int16()),
+            ('month', pa.int8()),
+            ('instrument_id', pa.dictionary(pa.int16(), pa.string())),
+            ('ranking_type', pa.dictionary(pa.int8(), pa.string())),
+            ('rank', pa.int16()),
+            ('member_name', pa.dictionary(pa.int32(), pa.string())),
+            ('party_id', pa.dictionary(pa.int32(), pa.string())),
+            ('volume', pa.int64()),
+            ('change', pa.int64()),
+            ('written_at', pa.int64()),  # 写入时间(纳秒), 重复数据按此保留最后一次
+        ])
+
+    def append(self, all_data):
+        """
+        追加一次爬取的结果, 每个分区写入一个新文件
+        Args:
+            all_data: 爬取结果列表
+        Returns:
+            int: 写入的行数
+        """
+        return self.append_records(iter_records(all_data))
+
+    def append_records(self, records):
+        """
+        追加一批记录, 每个分区写入一个新文件
+        Args:
+            records: RankingRecord序列, 合计行不保存
+        Returns:
+            int: 写入的行数
+        """
+        rows = [record.to_dict() for record in records if not record.is_total]
+        if not rows:
+            logging.warning("没有数据需要保存")
+            return 0
+
+        pa, pq = _import_pyarrow()
+        columns = {name: [] for name in self.schema().names}
+        written_at = time.time_ns()
+        for row in rows:
+            date = datetime.strptime(row['date'], '%Y-%m-%d').date()
+            columns['date'].append(date)
+            columns['year'].append(date.year)
+            columns['month'].append(date.month)
+            for name in ('product_id', 'instrument_id', 'ranking_type', 'rank', 'member_name', 'party_id',
+                         'volume', 'change'):
+                columns[name].append(row[name])
+            columns['written_at'].append(written_at)
+        table = pa.Table.from_pydict(columns, schema=self.schema())
+
+        # 文件名包含时间戳和随机串, 重复追加不会覆盖已有文件
+        basename = f"part-{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}-{{i}}.parquet"
+        os.makedirs(self.root, exist_ok=True)
+        pq.write_to_dataset(
+            table,
+            root_path=self.root,
+            partition_cols=['product_id', 'year', 'month'],
+            basename_template=basename,
+            existing_data_behavior='overwrite_or_ignore'
+        )
+        logging.info(f"已追加 {len(rows)} 条记录到列式存储: {self.root}")
+        return len(rows)
+
+    def read(self, product_id=None, start_date=None, end_date=None, columns=None):
+        """
+        读取数据, 产品和年月条件只扫描对应的分区
+        Args:
+            product_id: 产品代码, 默认全部
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD)
+            columns: 需要读取的列, 默认全部
+        Returns:
+            DataFrame: 同一 (日期, 产品, 合约, 排名类型, 名次) 重复写入时保留最后一次
+        """
+        import pandas as pd
+        if not os.path.isdir(self.root):
+            return pd.DataFrame(columns=columns or ['date', 'product_id', 'instrument_id', 'ranking_type', 'rank',
+                                                    'member_name', 'party_id', 'volume', 'change'])
+
+        pa, pq = _import_pyarrow()
+        filters = []
+        if product_id:
+            filters.append(('product_id', '=', product_id))
+        if start_date:
+            start = datetime.strptime(start_date, '%Y-%m-%d').date()
+            filters.append(('year', '>=', start.year))
+            filters.append(('date', '>=', start))
+        if end_date:
+            end = datetime.strptime(end_date, '%Y-%m-%d').date()
+            filters.append(('year', '<=', end.year))
+            filters.append(('date', '<=', end))
+
+        read_columns = None
+        if columns:
+            read_columns = list(dict.fromkeys(list(columns) + KEY_COLUMNS + ['written_at']))
+        table = pq.read_table(self.root, columns=read_columns, filters=filters or None)
+        df = table.to_pandas()
+        if 'written_at' in df.columns:
+            df = df.sort_values('written_at', kind='stable').drop(columns='written_at')
+        df = df.drop_duplicates(KEY_COLUMNS, keep='last')
+        df = df.sort_values(KEY_COLUMNS).reset_index(drop=True)
+        return df[list(columns)] if columns else df
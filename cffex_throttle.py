@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中金所爬虫限速工具
+功能: 按主机的令牌桶自适应限速 (AIMD) 和并发上限, 供多线程爬取共享
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+
+class HostLimiter:
+    """按主机限制同时进行的请求数"""
+
+    def __init__(self, per_host_limit=2):
+        """
+        Args:
+            per_host_limit: 每个主机允许的最大并发请求数
+        """
+        self.per_host_limit = per_host_limit
+        self._lock = threading.Lock()
+        self._semaphores = {}
+
+    def _semaphore(self, host):
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._semaphores[host]
+
+    @contextmanager
+    def slot(self, host):
+        """占用一个主机并发名额"""
+        semaphore = self._semaphore(host)
+        semaphore.acquire()
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+
+class TokenBucket:
+    """令牌桶: 按rate每秒补充令牌, 最多积累capacity个, 允许短时突发"""
+
+    def __init__(self, rate, capacity=None):
+        """
+        Args:
+            rate: 每秒补充的令牌数 (即平均每秒请求数)
+            capacity: 桶容量 (最大突发请求数), 默认为 max(1, rate)
+        """
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, now=None):
+        """
+        预订一个令牌 (调用方需要自行加锁)
+        Returns:
+            float: 需要等待的秒数, 令牌不足时预订未来的令牌
+        """
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+    def set_rate(self, rate, now=None):
+        """调整补充速率, 之前积累的令牌按原速率结算"""
+        self._refill(time.monotonic() if now is None else now)
+        self.rate = rate
+
+
+class AdaptiveRateLimiter:
+    """
+    按主机的自适应限速器 (AIMD): 每个主机一个令牌桶,
+    请求成功且延迟正常时速率线性增加, 出错、返回错误页面或延迟过高时速率减半
+    """
+
+    def __init__(self, initial_rate=2.0, min_rate=0.2, max_rate=10.0, increase=0.1, decrease=0.5,
+                 latency_target=2.0, burst=2):
+        """
+        Args:
+            initial_rate: 每个主机的初始每秒请求数
+            min_rate: 速率下限
+            max_rate: 速率上限
+            increase: 每次正常请求后增加的速率 (加性增)
+            decrease: 出错时速率乘以的系数 (乘性减)
+            latency_target: 延迟超过该秒数视为服务器压力过大
+            burst: 令牌桶容量 (最大突发请求数)
+        """
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, initial_rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_target = latency_target
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._stats = {}
+
+    def _bucket(self, host):
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(self.initial_rate, self.burst)
+            self._stats[host] = {'requests': 0, 'errors': 0, 'latency': 0.0, 'slowdowns': 0, 'last_decrease': 0.0}
+        return bucket
+
+    def reserve(self, host):
+        """
+        预订一次请求, 不阻塞 (异步代码中用asyncio.sleep等待返回的秒数)
+        Returns:
+            float: 发出请求前需要等待的秒数
+        """
+        with self._lock:
+            return self._bucket(host).reserve()
+
+    def acquire(self, host):
+        """阻塞直到允许向该主机发出下一次请求, 返回实际等待的秒数"""
+        wait_time = self.reserve(host)
+        if wait_time:
+            time.sleep(wait_time)
+        return wait_time
+
+    def record(self, host, latency, ok=True, slow_down=True):
+        """
+        记录一次请求的结果并调整该主机的速率
+        Args:
+            host: 主机名
+            latency: 请求耗时 (秒)
+            ok: 请求是否正常 (超时、429/5xx、错误页面为False)
+            slow_down: 请求失败时是否降低速率; 域名解析失败等与服务器负载无关的错误只计入统计
+        """
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._bucket(host)
+            stats = self._stats[host]
+            stats['requests'] += 1
+            stats['latency'] += latency
+            if ok and latency <= self.latency_target:
+                bucket.set_rate(min(self.max_rate, bucket.rate + self.increase), now)
+                return
+            if not ok:
+                stats['errors'] += 1
+                if not slow_down:
+                    return
+            # 同一批并发请求的连续失败只减速一次
+            if now - stats['last_decrease'] >= 1.0 / bucket.rate:
+                stats['last_decrease'] = now
+                stats['slowdowns'] += 1
+                bucket.set_rate(max(self.min_rate, bucket.rate * self.decrease), now)
+                bucket.tokens = min(bucket.tokens, 0.0)
+
+    def rate(self, host):
+        """该主机当前的每秒请求数"""
+        with self._lock:
+            return self._bucket(host).rate
+
+    def stats(self):
+        """
+        各主机的请求统计
+        Returns:
+            dict: {主机: {rate, requests, errors, error_rate, avg_latency, slowdowns}}
+        """
+        with self._lock:
+            return {
+                host: {
+                    'rate': round(self._buckets[host].rate, 3),
+                    'requests': stats['requests'],
+                    'errors': stats['errors'],
+                    'error_rate': stats['errors'] / stats['requests'] if stats['requests'] else 0.0,
+                    'avg_latency': stats['latency'] / stats['requests'] if stats['requests'] else 0.0,
+                    'slowdowns': stats['slowdowns'],
+                }
+                for host, stats in self._stats.items()
+            }
+
+
+_shared_limiter = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_limiter():
+    """
+    获取进程内共享的自适应限速器, 同一进程中的所有爬虫按主机共用速率
+    Returns:
+        AdaptiveRateLimiter: 共享限速器
+    """
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = AdaptiveRateLimiter()
+        return _shared_limiter
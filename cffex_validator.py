@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中金所响应内容校验
+功能: 按特征 (Content-Type、大小、哈希、根元素) 识别下载内容, 交易所的错误页面
+      (以.xml/.csv保存的2132字节HTML页面) 在解析前即被拒绝, 不会写入缓存或数据;
+      XML根元素或data节点字段变化时报告结构变化, 避免按旧格式解析出错误数据
+"""
+
+import hashlib
+import re
+from dataclasses import dataclass
+
+# 已知错误页面: {(大小, md5): 说明}, 先比较大小, 大小相同才计算哈希
+KNOWN_STUBS = {
+    (2132, "dc23e9a85a3c0e721dd845abb44fcd10"): "中金所404错误页面",
+}
+
+# 持仓排名XML的根元素和data节点必须包含的字段 (小写)
+EXPECTED_ROOT = "positionrank"
+REQUIRED_FIELDS = {"instrumentid", "datatypeid", "rank", "shortname", "volume", "varvolume"}
+
+_ROOT_PATTERN = re.compile(rb"<(?![?!])([A-Za-z_][\w.:-]*)")
+_DATA_PATTERN = re.compile(rb"<data\b.*?</data>", re.S | re.I)
+_FIELD_PATTERN = re.compile(rb"<([A-Za-z_][\w]*)\s*/?>")
+
+
+@dataclass(slots=True)
+class ResponseCheck:
+    kind: str           # "xml"=持仓排名XML, "stub"=已知错误页面, "html"=其他HTML页面, "empty"=空内容, "drift"=结构变化
+    reason: str = ""
+
+    @property
+    def ok(self):
+        return self.kind == "xml"
+
+
+def register_stub(content, description="错误页面"):
+    """
+    登记新发现的错误页面, 之后内容完全相同的响应会被直接拒绝
+    Args:
+        content: 错误页面的原始内容
+        description: 说明
+    """
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    KNOWN_STUBS[(len(content), hashlib.md5(content).hexdigest())] = description
+
+
+def known_stub(content):
+    """
+    判断内容是否为已知错误页面
+    Returns:
+        str: 错误页面的说明, 不是已知错误页面时返回None
+    """
+    size = len(content)
+    if not any(size == stub_size for stub_size, _ in KNOWN_STUBS):
+        return None
+    return KNOWN_STUBS.get((size, hashlib.md5(content).hexdigest()))
+
+
+def validate_response(content, content_type=None):
+    """
+    校验下载的持仓排名XML
+    Args:
+        content: 原始内容 (bytes或str)
+        content_type: 响应头中的Content-Type, 本地文件为None
+    Returns:
+        ResponseCheck: kind为"xml"时可以解析, 其他情况附带原因
+    """
+    if not content:
+        return ResponseCheck("empty", "内容为空")
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+
+    stub = known_stub(content)
+    if stub:
+        return ResponseCheck("stub", f"{stub} ({len(content)}字节)")
+
+    if content_type and "html" in content_type.lower():
+        return ResponseCheck("html", f"Content-Type为 {content_type}")
+
+    head = content[:1024]
+    match = _ROOT_PATTERN.search(head)
+    if match is None:
+        if head.lstrip(b"\xef\xbb\xbf \t\r\n").lower().startswith(b"<!doctype html"):
+            return ResponseCheck("html", "HTML页面")
+        return ResponseCheck("drift", "无法识别根元素")
+    root = match.group(1).decode('ascii', 'replace').lower()
+    if root == "html":
+        return ResponseCheck("html", "HTML页面")
+    if root != EXPECTED_ROOT:
+        return ResponseCheck("drift", f"根元素为 <{match.group(1).decode('ascii', 'replace')}>")
+
+    # 只检查第一个data节点, 没有data节点表示当天无数据
+    data = _DATA_PATTERN.search(content, 0, 8192)
+    if data:
+        fields = {tag.decode('ascii', 'replace').lower() for tag in _FIELD_PATTERN.findall(data.group(0))}
+        missing = REQUIRED_FIELDS - fields
+        if missing:
+            return ResponseCheck("drift", f"data节点缺少字段: {', '.join(sorted(missing))}")
+    return ResponseCheck("xml")
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中金所持仓排名本地数据仓库
+功能: 按规范化结构 (产品、合约、会员、每日排名) 保存到SQLite, 重复爬取时覆盖更新,
+      按 (产品, 日期) 和 (会员, 日期) 建立覆盖索引, 历史查询不必再读取导出文件;
+      按会员类别汇总的成交量和持仓量保存在单独的position_amounts表
+"""
+
+import logging
+import sqlite3
+import threading
+
+from cffex_members import MemberRegistry
+from cffex_models import RankingType, iter_position_amounts, iter_records
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    product_id TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS instruments (
+    instrument_id TEXT PRIMARY KEY,
+    product_id TEXT NOT NULL REFERENCES products (product_id)
+);
+CREATE TABLE IF NOT EXISTS daily_rankings (
+    date TEXT NOT NULL,
+    product_id TEXT NOT NULL REFERENCES products (product_id),
+    instrument_id TEXT NOT NULL,
+    ranking_type INTEGER NOT NULL,  -- 0=成交量, 1=持买单量, 2=持卖单量 (与XML的datatypeid一致)
+    rank INTEGER NOT NULL,
+    member_id INTEGER NOT NULL REFERENCES members (member_id),
+    volume INTEGER,
+    change INTEGER,
+    PRIMARY KEY (date, product_id, instrument_id, ranking_type, rank)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_rankings_product_date
+    ON daily_rankings (product_id, date, ranking_type, member_id, volume, change);
+CREATE INDEX IF NOT EXISTS idx_rankings_member_date
+    ON daily_rankings (member_id, date, product_id, ranking_type, volume, change);
+CREATE TABLE IF NOT EXISTS position_amounts (
+    date TEXT NOT NULL,
+    product_id TEXT NOT NULL REFERENCES products (product_id),
+    instrument_id TEXT NOT NULL,
+    member_category INTEGER NOT NULL,  -- 0=期货公司结算会员, 1=非期货公司结算会员 (XML的futurecompany)
+    volume INTEGER,
+    volume_change INTEGER,
+    buy_volume INTEGER,
+    buy_change INTEGER,
+    sell_volume INTEGER,
+    sell_change INTEGER,
+    PRIMARY KEY (product_id, date, instrument_id, member_category)
+) WITHOUT ROWID;
+"""
+
+UPSERT_SQL = """
+INSERT INTO daily_rankings (date, product_id, instrument_id, ranking_type, rank, member_id, volume, change)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (date, product_id, instrument_id, ranking_type, rank) DO UPDATE SET
+    member_id = excluded.member_id,
+    volume = excluded.volume,
+    change = excluded.change
+"""
+
+AMOUNT_COLUMNS = ['date', 'product_id', 'instrument_id', 'member_category', 'volume', 'volume_change',
+                  'buy_volume', 'buy_change', 'sell_volume', 'sell_change']
+
+UPSERT_AMOUNT_SQL = f"""
+INSERT OR REPLACE INTO position_amounts ({', '.join(AMOUNT_COLUMNS)})
+VALUES ({', '.join('?' * len(AMOUNT_COLUMNS))})
+"""
+
+
+class RankingWarehouse:
+    def __init__(self, path="cffex_rankings.db"):
+        """
+        初始化数据仓库
+        Args:
+            path: SQLite数据库文件路径
+        """
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+        self._members = None
+
+    @property
+    def conn(self):
+        """首次使用时才创建数据库文件, 使用WAL模式以便写入时可以同时查询"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            self._members = MemberRegistry(self._conn)
+        return self._conn
+
+    @property
+    def members(self):
+        """会员登记表 (MemberRegistry), 会员编号与members表一致"""
+        if self._members is None:
+            self.conn
+        return self._members
+
+    def upsert_records(self, records):
+        """
+        批量写入记录, 同一 (日期, 产品, 合约, 排名类型, 名次) 已存在时覆盖, 合计行不保存
+        Args:
+            records: RankingRecord序列
+        Returns:
+            int: 写入的记录数
+        """
+        records = [record for record in records if not record.is_total]
+        if not records:
+            return 0
+
+        with self._lock, self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO products (product_id) VALUES (?)",
+                                  [(p,) for p in {r.product_id for r in records}])
+            self.conn.executemany("INSERT OR IGNORE INTO instruments (instrument_id, product_id) VALUES (?, ?)",
+                                  list({(r.instrument_id, r.product_id) for r in records if r.instrument_id}))
+            member_ids = self.members.resolve_records(records)
+            self.conn.executemany(UPSERT_SQL, [
+                (r.date, r.product_id, r.instrument_id, r.ranking_type.code, r.rank,
+                 member_id, r.volume, r.change)
+                for r, member_id in zip(records, member_ids)
+            ])
+        logging.info(f"已写入 {len(records)} 条记录到数据仓库: {self.path}")
+        return len(records)
+
+    def upsert_position_amounts(self, amounts):
+        """
+        批量写入按会员类别汇总的成交量和持仓量, 同一 (产品, 日期, 合约, 会员类别) 已存在时覆盖
+        Args:
+            amounts: PositionAmount序列
+        Returns:
+            int: 写入的记录数
+        """
+        amounts = list(amounts)
+        if not amounts:
+            return 0
+
+        with self._lock, self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO products (product_id) VALUES (?)",
+                                  [(p,) for p in {a.product_id for a in amounts}])
+            self.conn.executemany(UPSERT_AMOUNT_SQL, [
+                tuple(getattr(a, column) for column in AMOUNT_COLUMNS) for a in amounts
+            ])
+        logging.info(f"已写入 {len(amounts)} 条汇总数据到数据仓库: {self.path}")
+        return len(amounts)
+
+    def upsert_results(self, all_data):
+        """
+        写入爬取结果中全部合约的记录, 以及按会员类别汇总的数据
+        Args:
+            all_data: get_date_range_data/get_products_range_data返回的结果列表
+        Returns:
+            int: 写入的排名记录数
+        """
+        all_data = list(all_data)
+        self.upsert_position_amounts(iter_position_amounts(all_data))
+        return self.upsert_records(iter_records(all_data, all_contracts=True))
+
+    def query_rankings(self, product_id=None, start_date=None, end_date=None,
+                       member_name=None, ranking_type=None, instrument_id=None):
+        """
+        查询排名明细
+        Args:
+            product_id: 产品代码
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD)
+            member_name: 会员简称 (包括更名前的简称) 或partyid
+            ranking_type: 排名类型 (RankingType或其取值)
+            instrument_id: 合约代码
+        Returns:
+            DataFrame: date/product_id/instrument_id/ranking_type/rank/member_id/member_name/volume/change,
+                       member_name为会员当前的简称
+        """
+        import pandas as pd
+
+        conditions, params = [], []
+        if product_id:
+            conditions.append("r.product_id = ?")
+            params.append(product_id)
+        if start_date:
+            conditions.append("r.date >= ?")
+            params.append(start_date)
+        if end_date:
+            conditions.append("r.date <= ?")
+            params.append(end_date)
+        if member_name:
+            conditions.append("r.member_id = ?")
+            params.append(self.members.member_id(member_name))
+        if ranking_type is not None:
+            conditions.append("r.ranking_type = ?")
+            params.append(RankingType(ranking_type).code)
+        if instrument_id:
+            conditions.append("r.instrument_id = ?")
+            params.append(instrument_id)
+
+        sql = """
+            SELECT r.date, r.product_id, r.instrument_id, r.ranking_type, r.rank, r.member_id, m.member_name,
+                   r.volume, r.change
+            FROM daily_rankings r JOIN members m ON m.member_id = r.member_id
+        """
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY r.date, r.product_id, r.instrument_id, r.ranking_type, r.rank"
+
+        with self._lock:
+            df = pd.read_sql_query(sql, self.conn, params=params)
+        types = list(RankingType)
+        df['ranking_type'] = df['ranking_type'].map(lambda code: types[code].value)
+        return df
+
+    def query_position_amounts(self, product_id=None, start_date=None, end_date=None, instrument_id=None):
+        """
+        查询按会员类别汇总的成交量和持仓量
+        Args:
+            product_id: 产品代码
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD)
+            instrument_id: 合约代码
+        Returns:
+            DataFrame: date/product_id/instrument_id/member_category/volume/volume_change/
+                       buy_volume/buy_change/sell_volume/sell_change
+        """
+        import pandas as pd
+
+        conditions, params = [], []
+        if product_id:
+            conditions.append("product_id = ?")
+            params.append(product_id)
+        if start_date:
+            conditions.append("date >= ?")
+            params.append(start_date)
+        if end_date:
+            conditions.append("date <= ?")
+            params.append(end_date)
+        if instrument_id:
+            conditions.append("instrument_id = ?")
+            params.append(instrument_id)
+
+        sql = f"SELECT {', '.join(AMOUNT_COLUMNS)} FROM position_amounts"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY date, product_id, instrument_id, member_category"
+
+        with self._lock:
+            return pd.read_sql_query(sql, self.conn, params=params)
+
+    def member_net_position(self, member_name, product_id, start_date=None, end_date=None):
+        """
+        查询会员在某产品上每日的持买、持卖和净持仓 (各合约合计)
+        Args:
+            member_name: 会员简称 (包括更名前的简称) 或partyid
+            product_id: 产品代码
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD)
+        Returns:
+            DataFrame: date/long/short/net, 未进入排名的一方按0计算
+        """
+        import pandas as pd
+
+        sql = """
+            SELECT r.date,
+                   SUM(CASE WHEN r.ranking_type = ? THEN r.volume ELSE 0 END) AS long,
+                   SUM(CASE WHEN r.ranking_type = ? THEN r.volume ELSE 0 END) AS short
+            FROM daily_rankings r
+            WHERE r.member_id = ?
+              AND r.date >= ? AND r.date <= ? AND r.product_id = ?
+            GROUP BY r.date
+            ORDER BY r.date
+        """
+        params = [RankingType.BUY.code, RankingType.SELL.code, self.members.member_id(member_name),
+                  start_date or '0000-00-00', end_date or '9999-99-99', product_id]
+        with self._lock:
+            df = pd.read_sql_query(sql, self.conn, params=params)
+        df['net'] = df['long'] - df['short']
+        return df
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
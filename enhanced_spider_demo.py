@@ -6,6 +6,8 @@
 """
 
 from cffex_spider import CFFEXSpider
+from datetime import datetime, timedelta
+import json
 import time
 
 def demo_auto_click():
@@ -128,20 +130,26 @@ def demo_batch_query():
         
         results = {}
         
+        # 同一产品的全部合约在一次请求中返回, 按产品分组查询
+        products = {}
         for contract in contracts:
-            print(f"正在查询 {contract['product']} {contract['month']}...")
+            products.setdefault(contract['product'], []).append(contract['month'])
+        
+        for product_id, months in products.items():
+            print(f"正在查询 {product_id} {', '.join(months)}...")
             
-            result = spider.get_product_data(
-                product_id=contract['product'],
-                contract_month=contract['month']
+            product_results = spider.get_contracts_data(
+                product_id=product_id,
+                contract_months=months
             )
             
-            results[f"{contract['product']}_{contract['month']}"] = result
-            
-            if result and result.get('success'):
-                print(f"✓ {contract['product']} {contract['month']} 查询成功")
-            else:
-                print(f"✗ {contract['product']} {contract['month']} 查询失败")
+            for month, result in product_results.items():
+                results[f"{product_id}_{month}"] = result
+                
+                if result and result.get('success'):
+                    print(f"✓ {product_id} {month} ({result.get('instrument_id')}) 查询成功")
+                else:
+                    print(f"✗ {product_id} {month} 查询失败")
         
         print(f"\n批量查询完成，共查询 {len(contracts)} 个合约")
         
@@ -189,7 +197,7 @@ def interactive_demo():
         
         if result:
             print("\n查询结果:")
-            print(json.dumps(result, ensure_ascii=False, indent=2))
+            print(json.dumps(result, ensure_ascii=False, indent=2, default=lambda record: record.to_dict()))
             
             if result.get('success'):
                 save_choice = input("\n是否保存到Excel文件? (y/n): ").lower().strip()
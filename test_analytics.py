@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+排名分析功能测试脚本
+使用仓库中保存的XML样本和构造的多日数据, 验证净持仓、集中度、增减量核对和斜率计算
+"""
+
+import numpy as np
+import pandas as pd
+
+from cffex_analytics import (check_changes, concentration, net_position_matrix, net_positions,
+                             position_slopes, records_frame)
+from cffex_spider import CFFEXSpider
+
+
+def sample_frame():
+    spider = CFFEXSpider(cache=None)
+    with open("ccpm_IF_20250912_sample.xml", "rb") as f:
+        contracts = spider.parse_xml_instruments(f.read())
+    result = spider._contracts_result("IF", "2025-09-12", contracts)
+    spider.annotate_records(result, "2025-09-12", "IF")
+    return records_frame([result], all_contracts=True)
+
+
+def history_frame():
+    """两个会员连续三个交易日 (跨周末) 的持买排名, 第三天报告的增减量有误"""
+    return pd.DataFrame({
+        'date': ['2025-09-11', '2025-09-12', '2025-09-15'] * 2,
+        'product_id': 'IF',
+        'instrument_id': 'IF2509',
+        'ranking_type': 'buy_position_ranking',
+        'rank': [1, 1, 1, 2, 2, 2],
+        'member_name': ['甲'] * 3 + ['乙'] * 3,
+        'volume': [100, 130, 190, 50, 40, 40],
+        'change': [None, 30, 50, 5, -10, 0],
+    })
+
+
+def test_net_positions():
+    """测试会员净持仓等于持买减持卖"""
+    df = sample_frame()
+    net = net_positions(df, by_instrument=True)
+    row = net.loc[('2025-09-12', 'IF', 'IF2509', '中信期货(代客)')]
+    detail = df[(df['instrument_id'] == 'IF2509') & (df['member_name'] == '中信期货(代客)')]
+    long = detail.loc[detail['ranking_type'] == 'buy_position_ranking', 'volume'].sum()
+    short = detail.loc[detail['ranking_type'] == 'sell_position_ranking', 'volume'].sum()
+    assert (row['long'], row['short'], row['net']) == (long, short, long - short)
+
+    total = net_positions(df)
+    assert total['long'].sum() == df.loc[df['ranking_type'] == 'buy_position_ranking', 'volume'].sum()
+
+
+def test_concentration():
+    """测试前5/前20名集中度"""
+    result = concentration(sample_frame())
+    row = result.loc[('2025-09-12', 'IF', 'IF2509', 'volume_ranking')]
+    assert row['top20'] == 116676
+    assert 0 < row['top5'] < row['top20']
+    assert abs(row['cr5'] - row['top5'] / row['top20']) < 1e-12
+
+
+def test_check_changes():
+    """测试按相邻交易日核对增减量"""
+    result = check_changes(history_frame()).set_index(['member_name', 'date'])
+    assert np.isnan(result.loc[('甲', '2025-09-11'), 'computed_change'])
+    assert result.loc[('甲', '2025-09-12'), 'computed_change'] == 30
+    assert result.loc[('甲', '2025-09-15'), 'computed_change'] == 60
+    assert result.index[result['mismatch']].tolist() == [('甲', '2025-09-15')]
+
+    # 中间交易日未进入排名时不核对
+    gap = check_changes(history_frame().drop(index=1)).set_index(['member_name', 'date'])
+    assert np.isnan(gap.loc[('甲', '2025-09-15'), 'computed_change'])
+
+
+def test_position_slopes():
+    """测试净持仓斜率按实际天数计算"""
+    matrix = net_position_matrix(history_frame())
+    assert matrix.shape == (3, 2)
+    slopes = position_slopes(matrix)
+    # 甲: 100 -> 130 (1天) -> 190 (3天), 中间点为两侧差商按间隔加权
+    expected = np.gradient(np.array([100.0, 130.0, 190.0]), np.array([0.0, 1.0, 4.0]))
+    assert np.allclose(slopes['甲'].to_numpy(), expected)
+
+
+if __name__ == "__main__":
+    print("排名分析功能测试")
+    print("=" * 50)
+    for test in [test_net_positions, test_concentration, test_check_changes, test_position_slopes]:
+        test()
+        print(f"✅ {test.__doc__}")
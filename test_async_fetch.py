@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步下载功能测试脚本
+在离线回放服务上验证连接复用、压缩传输、重试和批量爬取 (需要aiohttp或httpx)
+"""
+
+import os
+import tempfile
+from datetime import date, timedelta
+
+import pytest
+
+from cffex_calendar import TradingCalendar
+from cffex_replay import ReplayServer
+
+SAMPLE_XML = "ccpm_IF_20250912_sample.xml"
+with open(SAMPLE_XML, "rb") as f:
+    SAMPLE = f.read()
+
+
+def backend_available():
+    try:
+        from cffex_async import _import_backend
+        _import_backend()
+    except ImportError:
+        pytest.skip("需要aiohttp或httpx")
+
+
+def test_fetch_all_reuses_connections():
+    """测试批量下载只使用连接池中的少量长连接, 并以压缩方式传输"""
+    backend_available()
+    from cffex_async import fetch_all
+
+    with ReplayServer(root=None) as server:
+        urls = {}
+        for i in range(40):
+            day = date(2025, 8, 1) + timedelta(days=i)
+            server.add_xml("IF", day.isoformat(), SAMPLE)
+            urls[i] = f"{server.xml_base_url}{day:%Y%m/%d}/IF.xml"
+        results = fetch_all(urls, max_connections=3)
+        assert all(content == SAMPLE for content in results.values()) and len(results) == 40
+        assert len(server.clients) <= 3
+        assert server.compressed == 40
+
+
+def test_retry_and_missing():
+    """测试临时性错误重试成功, 404直接返回None"""
+    backend_available()
+    from cffex_async import fetch_all
+
+    with ReplayServer(root=None) as server:
+        server.add_xml("IF", "2025-09-12", SAMPLE)
+        server.add_failure("IF", "2025-09-12", status=503)
+        flaky, missing = f"{server.xml_base_url}202509/12/IF.xml", f"{server.xml_base_url}202509/12/IC.xml"
+        results = fetch_all({"flaky": flaky, "missing": missing}, backoff=0.01)
+        assert results == {"flaky": SAMPLE, "missing": None}
+        assert server.hits == {"/sj/ccpm/202509/12/IF.xml": 2, "/sj/ccpm/202509/12/IC.xml": 1}
+
+
+def test_products_range_data_async():
+    """测试异步批量爬取的结果与逐日爬取格式相同, 下载的XML写入缓存"""
+    backend_available()
+    with ReplayServer(root=None) as server, tempfile.TemporaryDirectory() as tmpdir:
+        server.add_xml("IF", "2025-09-12", SAMPLE)
+        spider = server.make_spider(calendar=TradingCalendar(no_data_file=None),
+                                    cache=os.path.join(tmpdir, "cache.db"))
+        try:
+            all_data = spider.get_products_range_data_async(["IF"], "2025-09-11", "2025-09-12")
+            assert [(r["product_id"], r["date"]) for r in all_data] == [("IF", "2025-09-12")]
+            assert sorted(all_data[0]["contracts"]) == ["IF2509", "IF2510", "IF2512", "IF2603"]
+            assert all_data[0]["data"]["volume_ranking"][0].date == "2025-09-12"
+            assert spider.cache.get("IF", "2025-09-12") == SAMPLE
+            # 第二次全部命中缓存, 不再发出请求
+            requests_before = sum(server.hits.values())
+            assert len(spider.get_products_range_data_async("IF", "2025-09-12", "2025-09-12")) == 1
+            assert sum(server.hits.values()) == requests_before
+        finally:
+            spider.close()
+
+
+if __name__ == "__main__":
+    print("异步下载功能测试")
+    print("=" * 50)
+    for test in [test_fetch_all_reuses_connections, test_retry_and_missing, test_products_range_data_async]:
+        test()
+        print(f"✅ {test.__doc__}")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+命令行功能测试脚本
+验证命令行和爬虫模块加载时不导入pandas和selenium, 以及各子命令 (使用本地缓存, 不需要网络)
+"""
+
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+
+from cffex_cache import ResponseCache
+from cffex_cli import main
+from cffex_reader import read_records
+
+SAMPLE_XML = "ccpm_IF_20250912_sample.xml"
+
+
+def loaded_modules(statement):
+    """在新进程中执行语句, 返回已加载的重型依赖"""
+    code = f"import sys; {statement}; print(','.join(m for m in ('pandas', 'selenium', 'requests') if m in sys.modules))"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    return set(filter(None, output.strip().split(',')))
+
+
+def run_cli(argv):
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        code = main(argv)
+    return code, output.getvalue()
+
+
+def test_import_light():
+    """测试命令行只导入标准库, 爬虫模块不导入pandas和selenium"""
+    assert loaded_modules("import cffex_cli") == set()
+    assert loaded_modules("import cffex_spider") == {"requests"}
+
+
+def test_crawl_from_cache():
+    """测试离线模式下从缓存爬取并保存CSV, 以及缓存统计"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache_path = os.path.join(tmpdir, "cache.db")
+        cache = ResponseCache(cache_path)
+        with open(SAMPLE_XML, "rb") as f:
+            cache.put("IF", "2025-09-12", f.read())
+        cache.close()
+
+        code, output = run_cli(["crawl", "IF", "--date", "2025-09-12", "--offline", "--cache", cache_path,
+                                "--output-dir", tmpdir])
+        assert code == 0, output
+        assert os.path.exists(os.path.join(tmpdir, "cffex_IF_20250912.csv"))
+
+        code, output = run_cli(["crawl", "IM", "--date", "2025-09-12", "--offline", "--cache", cache_path])
+        assert code == 1 and "IM" in output
+
+        code, output = run_cli(["cache", "stats", "--cache", cache_path])
+        assert code == 0 and '"entries": 1' in output
+
+
+def test_export_and_query():
+    """测试历史文件导出到数据仓库后查询"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, "rankings.db")
+        code, output = run_cli(["export", SAMPLE_XML, "IF_20250912.xml", "--sqlite", db_path])
+        assert code == 0 and "条记录" in output
+
+        code, output = run_cli(["query", "--db", db_path, "--product", "IF", "--instrument", "IF2509",
+                                "--ranking-type", "volume_ranking", "--format", "csv", "--limit", "2"])
+        lines = output.strip().splitlines()
+        assert code == 0 and len(lines) == 3
+        assert "中信期货(代客)" in lines[1] and "28247" in lines[1]
+
+        excel_path = os.path.join(tmpdir, "rankings.xlsx")
+        assert run_cli(["export", SAMPLE_XML, "--excel", excel_path])[0] == 0
+        assert len(list(read_records(excel_path))) == len(list(read_records(SAMPLE_XML)))
+
+        assert run_cli(["export", SAMPLE_XML])[0] == 2
+        assert run_cli(["query", "--db", os.path.join(tmpdir, "missing.db")])[0] == 1
+
+
+if __name__ == "__main__":
+    print("命令行功能测试")
+    print("=" * 50)
+    for test in [test_import_light, test_crawl_from_cache, test_export_and_query]:
+        test()
+        print(f"✅ {test.__doc__}")
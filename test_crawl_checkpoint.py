@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+断点续爬功能测试脚本
+使用假爬虫代替网络请求, 验证完成记录、水位和失败重试
+"""
+
+import os
+import tempfile
+
+from cffex_calendar import TradingCalendar
+from cffex_checkpoint import CrawlCheckpoint
+from cffex_crawler import RangeCrawler
+from cffex_spider import CFFEXSpider
+
+
+class FlakySpider:
+    """模拟CFFEXSpider, 指定日期第一次请求失败 (或抛出异常)"""
+    xml_base_url = CFFEXSpider.xml_base_url
+    annotate_records = CFFEXSpider.annotate_records
+    run_daily_crawl = CFFEXSpider.run_daily_crawl
+
+    def __init__(self, calls, flaky_dates, raising_dates=()):
+        self.calls = calls
+        self.flaky_dates = flaky_dates
+        self.raising_dates = raising_dates
+
+    def get_product_data(self, product_id, date=None, contract_month=None):
+        self.calls.append((product_id, date))
+        if date in self.flaky_dates and self.calls.count((product_id, date)) == 1:
+            return {"success": False, "error": "连接超时", "product_id": product_id, "date": date}
+        if date in self.raising_dates and self.calls.count((product_id, date)) == 1:
+            raise ConnectionError("连接被重置")
+        return {"success": True, "product_id": product_id, "date": date, "data": {}}
+
+    def release_driver(self, broken=False):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_journal_reload_and_watermark():
+    """测试断点日志重放和水位计算"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "checkpoint.jsonl")
+        checkpoint = CrawlCheckpoint(path)
+        checkpoint.mark_completed("IF", "2025-09-08")
+        checkpoint.mark_completed("IF", "2025-09-09", "no_data")
+        checkpoint.mark_failed("IF", "2025-09-10", "连接超时")
+        checkpoint.mark_completed("IF", "2025-09-11")
+
+        reloaded = CrawlCheckpoint(path)
+        planned = ["2025-09-08", "2025-09-09", "2025-09-10", "2025-09-11"]
+        assert reloaded.watermark("IF", planned) == "2025-09-09"
+        assert reloaded.pending([("IF", d) for d in planned]) == [("IF", "2025-09-10")]
+        assert reloaded.failed[("IF", "2025-09-10")]["attempts"] == 1
+
+
+def test_resume_and_retry():
+    """测试中断后只获取未完成的任务, 失败任务退避重试"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "checkpoint.jsonl")
+        calendar = TradingCalendar(no_data_file=None)
+        calls = []
+
+        checkpoint = CrawlCheckpoint(path, base_delay=0.01)
+        checkpoint.mark_completed("IF", "2025-09-08")
+        crawler = RangeCrawler(rate=0, calendar=calendar, checkpoint=checkpoint,
+                               spider_factory=lambda: FlakySpider(calls, {"2025-09-10"}))
+        try:
+            results = crawler.crawl(["IF"], "2025-09-08", "2025-09-12")
+        finally:
+            crawler.close()
+
+        assert ("IF", "2025-09-08") not in calls
+        assert calls.count(("IF", "2025-09-10")) == 2
+        assert [r["date"] for r in results] == ["2025-09-09", "2025-09-10", "2025-09-11", "2025-09-12"]
+
+        # 再次运行时全部已完成, 不再发出请求
+        calls.clear()
+        crawler = RangeCrawler(rate=0, calendar=calendar, checkpoint=CrawlCheckpoint(path),
+                               spider_factory=lambda: FlakySpider(calls, set()))
+        try:
+            assert crawler.crawl(["IF"], "2025-09-08", "2025-09-12") == []
+        finally:
+            crawler.close()
+        assert calls == []
+
+
+def test_exception_recorded_and_retried():
+    """测试获取时抛出异常的任务写入断点记录, 并按退避时间重试"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "checkpoint.jsonl")
+        calls = []
+        checkpoint = CrawlCheckpoint(path, base_delay=0.01)
+        crawler = RangeCrawler(rate=0, calendar=TradingCalendar(no_data_file=None), checkpoint=checkpoint,
+                               spider_factory=lambda: FlakySpider(calls, set(), {"2025-09-11"}))
+        try:
+            results = crawler.crawl(["IF"], "2025-09-10", "2025-09-12")
+        finally:
+            crawler.close()
+
+        assert calls.count(("IF", "2025-09-11")) == 2
+        assert [r["date"] for r in results] == ["2025-09-10", "2025-09-11", "2025-09-12"]
+        with open(path, encoding="utf-8") as f:
+            assert "连接被重置" in f.read()
+        assert CrawlCheckpoint(path).is_completed("IF", "2025-09-11")
+
+
+def test_daily_crawl_resume():
+    """测试日常爬取跳过断点记录中已完成的产品, 失败的产品退避重试"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "checkpoint.jsonl")
+        checkpoint = CrawlCheckpoint(path, base_delay=0.01)
+        checkpoint.mark_completed("IF", "2025-09-12")
+        calls = []
+        spider = FlakySpider(calls, {"2025-09-12"})
+
+        results = spider.run_daily_crawl(["IF", "IM"], save_excel=False, checkpoint=checkpoint, date="2025-09-12")
+        assert calls == [("IM", "2025-09-12"), ("IM", "2025-09-12")]
+        assert list(results) == ["IM"] and results["IM"]["success"]
+
+        # 再次运行时全部已完成, 不再发出请求
+        calls.clear()
+        assert spider.run_daily_crawl(["IF", "IM"], save_excel=False, checkpoint=CrawlCheckpoint(path),
+                                      date="2025-09-12") == {}
+        assert calls == []
+
+
+if __name__ == "__main__":
+    print("断点续爬功能测试")
+    print("=" * 50)
+    for test in [test_journal_reload_and_watermark, test_resume_and_retry, test_exception_recorded_and_retried,
+                 test_daily_crawl_resume]:
+        test()
+        print(f"✅ {test.__doc__}")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行指标功能测试脚本
+验证阶段耗时和计数的记录、JSON/Prometheus输出, 以及爬虫解析和下载时记录的指标
+"""
+
+import json
+import os
+import tempfile
+
+from cffex_metrics import CrawlMetrics
+from cffex_replay import ReplayServer
+from cffex_spider import CFFEXSpider
+
+SAMPLE_XML = "ccpm_IF_20250912_sample.xml"
+
+
+def test_summary_and_outputs():
+    """测试阶段耗时、带标签计数和JSON/Prometheus输出"""
+    metrics = CrawlMetrics()
+    metrics.observe("parse", 0.5)
+    metrics.observe("parse", 1.5)
+    with metrics.phase("export"):
+        pass
+    metrics.count("retries", source="checkpoint")
+    metrics.count("retries", source="checkpoint")
+    metrics.count("bytes_fetched", 2048)
+
+    summary = metrics.summary()
+    assert summary["phases"]["parse"] == {"count": 2, "total_seconds": 2.0, "mean_seconds": 1.0, "max_seconds": 1.5}
+    assert summary["phases"]["export"]["count"] == 1
+    assert summary["counters"] == {"bytes_fetched": 2048, "retries": {"source=checkpoint": 2}}
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        json_path = metrics.write_json(os.path.join(tmpdir, "metrics.json"))
+        with open(json_path, encoding="utf-8") as f:
+            assert json.load(f)["counters"]["bytes_fetched"] == 2048
+
+        prom_path = metrics.write_prometheus(os.path.join(tmpdir, "cffex.prom"))
+        with open(prom_path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        assert 'cffex_phase_seconds_sum{phase="parse"} 2.000000' in lines
+        assert 'cffex_phase_seconds_count{phase="parse"} 2' in lines
+        assert 'cffex_retries_total{source="checkpoint"} 2' in lines
+        assert "cffex_bytes_fetched_total 2048" in lines
+        # 原子写入不留下临时文件
+        assert sorted(os.listdir(tmpdir)) == ["cffex.prom", "metrics.json"]
+
+    metrics.reset()
+    assert metrics.summary()["phases"] == {} and metrics.summary()["counters"] == {}
+
+
+def test_parse_metrics():
+    """测试解析XML和页面时记录解析耗时和匹配到的表格选择器"""
+    metrics = CrawlMetrics()
+    spider = CFFEXSpider(fetch_mode="xml", cache=None, metrics=metrics)
+    try:
+        with open(SAMPLE_XML, "rb") as f:
+            assert spider.parse_xml_instruments(f.read())
+        with open("debug_page_IF.html", encoding="utf-8") as f:
+            assert spider.parse_page_instruments(f.read())
+    finally:
+        spider.close()
+
+    summary = metrics.summary()
+    assert summary["phases"]["parse"]["count"] == 2
+    assert sum(summary["counters"]["table_selector"].values()) == 1
+
+
+def test_fetch_metrics():
+    """测试下载XML时记录下载耗时、字节数和状态码"""
+    metrics = CrawlMetrics()
+    with ReplayServer(root=None) as server:
+        server.add_xml("IF", "2025-09-12", SAMPLE_XML)
+        spider = server.make_spider(metrics=metrics)
+        try:
+            content = spider.fetch_xml("IF", "2025-09-12")
+        finally:
+            spider.close()
+
+    summary = metrics.summary()
+    assert summary["phases"]["fetch"]["count"] == 1
+    assert summary["counters"]["bytes_fetched"] == len(content)
+    assert summary["counters"]["requests"] == {"outcome=200": 1}
+
+
+if __name__ == "__main__":
+    print("运行指标功能测试")
+    print("=" * 50)
+    for test in [test_summary_and_outputs, test_parse_metrics, test_fetch_metrics]:
+        test()
+        print(f"✅ {test.__doc__}")
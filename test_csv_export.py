@@ -34,7 +34,7 @@ def test_csv_export_basic():
         ]
     }
     
-    spider = CFFEXSpider()
+    spider = CFFEXSpider(cache=None)
     
     try:
         # 测试CSV导出
@@ -104,7 +104,7 @@ def test_csv_export_multiple_tables():
         ]
     }
     
-    spider = CFFEXSpider()
+    spider = CFFEXSpider(cache=None)
     
     try:
         csv_filename = spider.save_to_csv(test_data, "test_multiple.csv")
@@ -153,7 +153,7 @@ def test_csv_vs_excel():
         ]
     }
     
-    spider = CFFEXSpider()
+    spider = CFFEXSpider(cache=None)
     
     try:
         # 同时导出CSV和Excel格式
@@ -209,7 +209,7 @@ def test_csv_encoding():
         ]
     }
     
-    spider = CFFEXSpider()
+    spider = CFFEXSpider(cache=None)
     
     try:
         csv_filename = spider.save_to_csv(test_data, "test_encoding.csv")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+定时爬取功能测试脚本
+在离线回放服务上验证条件请求轮询、发布后并发爬取保存, 以及下一个交易日的计算
+"""
+
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from cffex_metrics import CrawlMetrics
+from cffex_reader import read_records
+from cffex_replay import ReplayServer
+from cffex_scheduler import DailyScheduler
+
+SAMPLE_XML = "ccpm_IF_20250912_sample.xml"
+
+
+def make_scheduler(server, tmpdir, **kwargs):
+    spider = server.make_spider(metrics=CrawlMetrics())
+    return DailyScheduler(spider, output_dir=tmpdir, rate=0, **kwargs)
+
+
+def test_conditional_polling():
+    """测试未发布时条件请求返回304, 发布后取回XML"""
+    with ReplayServer(root=None) as server, tempfile.TemporaryDirectory() as tmpdir:
+        with open("IF_20250912.xml", "rb") as f:
+            server.stubs[("IF", "2025-09-12")] = f.read()
+        scheduler = make_scheduler(server, tmpdir, product_ids=["IF"])
+        try:
+            assert scheduler.poll("IF", "2025-09-12") is None
+            assert scheduler.poll("IF", "2025-09-12") is None
+            server.add_xml("IF", "2025-09-12", SAMPLE_XML)
+            result = scheduler.poll("IF", "2025-09-12")
+            assert result["success"] and result["data"]["volume_ranking"][-1].volume == 116676
+            assert result["data"]["volume_ranking"][0].date == "2025-09-12"
+        finally:
+            scheduler.close()
+            scheduler.spider.close()
+        counters = scheduler.spider.metrics.summary()["counters"]
+        assert counters["requests"] == {"outcome=rejected": 1, "outcome=304": 1, "outcome=200": 1}
+
+
+def test_run_day_after_publication():
+    """测试轮询到发布后立即并发爬取全部产品并保存CSV"""
+    with ReplayServer(root=None) as server, tempfile.TemporaryDirectory() as tmpdir:
+        scheduler = make_scheduler(server, tmpdir, product_ids=["IF", "IM"], poll_interval=0.05, deadline="23:59",
+                                   clock=lambda: datetime(2025, 9, 12, 16, 0))
+        # 轮询开始后才发布
+        publish = threading.Timer(0.2, lambda: [server.add_xml(p, "2025-09-12", SAMPLE_XML) for p in ("IM", "IF")])
+        start = time.monotonic()
+        publish.start()
+        try:
+            summary = scheduler.run_day("2025-09-12")
+        finally:
+            publish.cancel()
+            scheduler.close()
+            scheduler.spider.close()
+        assert time.monotonic() - start < 1.0
+        assert summary["missing"] == [] and sorted(summary["files"]) == ["IF", "IM"]
+        assert len(list(read_records(summary["files"]["IF"]))) == 63
+        assert {r.product_id for r in read_records(summary["range_file"])} == {"IF", "IM"}
+        assert os.path.dirname(summary["range_file"]) == tmpdir
+        assert os.path.dirname(summary["amounts_file"]) == tmpdir
+
+
+def test_deadline_and_next_run_date():
+    """测试截止时间前未发布时放弃当天, 以及下一个交易日的计算"""
+    with ReplayServer(root=None) as server, tempfile.TemporaryDirectory() as tmpdir:
+        scheduler = make_scheduler(server, tmpdir, product_ids=["IF"], deadline="19:00",
+                                   clock=lambda: datetime(2025, 9, 12, 18, 59, 50))
+        try:
+            summary = scheduler.run_day("2025-09-12")
+            assert summary == {"date": "2025-09-12", "files": {}, "range_file": None, "amounts_file": None,
+                               "missing": ["IF"]}
+            assert scheduler.next_run_date() == "2025-09-12"
+            # 周五截止时间之后为下周一
+            scheduler.clock = lambda: datetime(2025, 9, 12, 19, 30)
+            assert scheduler.next_run_date() == "2025-09-15"
+        finally:
+            scheduler.close()
+            scheduler.spider.close()
+
+
+if __name__ == "__main__":
+    print("定时爬取功能测试")
+    print("=" * 50)
+    for test in [test_conditional_polling, test_run_day_after_publication, test_deadline_and_next_run_date]:
+        test()
+        print(f"✅ {test.__doc__}")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+浏览器连接池功能测试脚本
+使用假浏览器代替Chrome, 验证复用、回收和并发上限
+"""
+
+import threading
+
+from cffex_driver_pool import WebDriverPool
+from cffex_spider import CFFEXSpider
+
+
+class FakeDriver:
+    """模拟WebDriver"""
+    created = 0
+
+    def __init__(self):
+        FakeDriver.created += 1
+        self.alive = True
+        self.quit_called = False
+
+    def execute_script(self, script):
+        if not self.alive:
+            raise RuntimeError("chrome not reachable")
+        return 1
+
+    def quit(self):
+        self.quit_called = True
+
+
+def test_reuse_and_recycle_after_pages():
+    """测试浏览器被复用, 达到页面数上限后回收"""
+    pool = WebDriverPool(size=1, max_pages=2, driver_factory=FakeDriver)
+    first = pool.acquire()
+    pool.mark_page(first)
+    pool.release(first)
+    assert pool.acquire() is first
+
+    pool.mark_page(first)
+    pool.release(first)
+    second = pool.acquire()
+    assert second is not first and first.quit_called
+    pool.release(second)
+    pool.close_all()
+
+
+def test_replace_crashed_driver():
+    """测试崩溃的浏览器在借出时被替换"""
+    pool = WebDriverPool(size=1, driver_factory=FakeDriver)
+    driver = pool.acquire()
+    pool.release(driver)
+    driver.alive = False
+    replacement = pool.acquire()
+    assert replacement is not driver and driver.quit_called
+    pool.release(replacement)
+    pool.close_all()
+
+
+def test_size_limit():
+    """测试同时借出的浏览器数量不超过池大小"""
+    pool = WebDriverPool(size=1, driver_factory=FakeDriver)
+    driver = pool.acquire()
+    try:
+        pool.acquire(timeout=0.05)
+        assert False, "池已满时应当超时"
+    except TimeoutError:
+        pass
+
+    acquired = []
+    waiter = threading.Thread(target=lambda: acquired.append(pool.acquire(timeout=5)))
+    waiter.start()
+    pool.release(driver)
+    waiter.join()
+    assert acquired == [driver]
+    pool.release(driver)
+    pool.close_all()
+
+
+class PageSpider(CFFEXSpider):
+    """模拟页面爬取: 使用浏览器但不访问网络"""
+
+    def _query_page(self, product_id, date=None, contract_month=None):
+        self.driver_pool.mark_page(self.driver)
+        return {"success": True, "product_id": product_id, "date": date}
+
+
+def test_spiders_share_small_pool():
+    """测试爬虫多于池大小时, 每次页面爬取后归还浏览器, 不会耗尽连接池"""
+    pool = WebDriverPool(size=1, driver_factory=FakeDriver)
+    spiders = [PageSpider(fetch_mode="selenium", cache=None, driver_pool=pool) for _ in range(3)]
+    try:
+        for spider in spiders:
+            assert spider.get_product_data("IF", "2025-09-12")["success"]
+            assert spider._driver is None
+        driver = pool.acquire(timeout=0.05)
+        pool.release(driver)
+    finally:
+        for spider in spiders:
+            spider.close()
+        pool.close_all()
+
+
+if __name__ == "__main__":
+    print("浏览器连接池功能测试")
+    print("=" * 50)
+    for test in [test_reuse_and_recycle_after_pages, test_replace_crashed_driver, test_size_limit,
+                 test_spiders_share_small_pool]:
+        test()
+        print(f"✅ {test.__doc__}")
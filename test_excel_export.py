@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Excel流式导出功能测试脚本
+验证按解析结果的实际结构写入Excel、工作表划分和行数上限续写、写入后可以读回, 以及内存占用与行数无关
+"""
+
+import os
+import tempfile
+import tracemalloc
+
+from openpyxl import load_workbook
+
+from cffex_checkpoint import CrawlCheckpoint
+from cffex_models import RankingRecord, RankingType
+from cffex_pipeline import ExcelSink, ExportPipeline
+from cffex_reader import read_records
+from cffex_replay import ReplayServer
+from cffex_spider import CFFEXSpider
+
+SAMPLE_XML = "ccpm_IF_20250912_sample.xml"
+
+
+def sample_result(spider):
+    with open(SAMPLE_XML, "rb") as f:
+        contracts = spider.parse_xml_instruments(f.read())
+    result = spider._contracts_result("IF", "2025-09-12", contracts)
+    spider.annotate_records(result, "2025-09-12", "IF")
+    return result
+
+
+def test_save_parsed_result():
+    """测试save_to_excel按排名类型保存全部合约, 并能读回相同的记录"""
+    spider = CFFEXSpider(fetch_mode="xml", cache=None)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "IF.xlsx")
+        try:
+            result = sample_result(spider)
+            assert spider.save_to_excel(result, path) == path
+        finally:
+            spider.close()
+
+        workbook = load_workbook(path, read_only=True)
+        assert workbook.sheetnames == ["成交量排名", "持买单量排名", "持卖单量排名", "Metadata"]
+        workbook.close()
+
+        expected = [r for data in result["contracts"].values() for t in RankingType for r in data[t.value]]
+        records = list(read_records(path))
+        assert sorted(records, key=RankingRecord.sort_key) == sorted(expected, key=RankingRecord.sort_key)
+        assert {r.instrument_id for r in records} == {"IF2509", "IF2510", "IF2512", "IF2603"}
+
+
+def test_sheet_rollover():
+    """测试按产品分工作表, 超过行数上限时续写到新的工作表"""
+    records = [RankingRecord(RankingType.VOLUME, rank, f"会员{rank}", rank * 10, 1, "2025-09-12", product_id)
+               for product_id in ("IF", "IM") for rank in range(1, 6)]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "range.xlsx")
+        sink = ExcelSink(path, sheet_by="product", max_rows=3)
+        sink.write(records)
+        sink.close()
+        sink.close()
+
+        workbook = load_workbook(path, read_only=True)
+        assert workbook.sheetnames == ["IF", "IF_2", "IF_3", "IM", "IM_2", "IM_3"]
+        workbook.close()
+        assert list(read_records(path)) == records
+
+
+def test_resume_with_checkpoint():
+    """测试Excel文件生成前中断时不记录断点, 续爬时保留已有文件中的记录"""
+    with ReplayServer(root=None) as server, tempfile.TemporaryDirectory() as tmpdir:
+        for date in ("2025-09-11", "2025-09-12"):
+            server.add_xml("IF", date, SAMPLE_XML)
+        path = os.path.join(tmpdir, "range.xlsx")
+        checkpoint = CrawlCheckpoint(os.path.join(tmpdir, "checkpoint.jsonl"))
+        spider = server.make_spider()
+        try:
+            assert spider.stream_range_data("IF", "2025-09-11", "2025-09-11",
+                                            [ExcelSink(path, sheet_by="product")], checkpoint=checkpoint) == 252
+            assert checkpoint.is_completed("IF", "2025-09-11")
+
+            # 写入后、生成文件前中断
+            result = spider.get_product_data("IF", "2025-09-12")
+            spider.annotate_records(result, "2025-09-12", "IF")
+            crashed = ExportPipeline([ExcelSink(path, sheet_by="product")], checkpoint, buffer_size=1)
+            crashed.add(result)
+            assert crashed.written == 252 and not checkpoint.is_completed("IF", "2025-09-12")
+            # 进程退出, 未生成的文件丢弃
+            for sheet in crashed.sinks[0].workbook.worksheets:
+                sheet.close()
+
+            assert spider.stream_range_data("IF", "2025-09-11", "2025-09-12",
+                                            [ExcelSink(path, sheet_by="product")], checkpoint=checkpoint) == 252
+        finally:
+            spider.close()
+        assert checkpoint.is_completed("IF", "2025-09-12")
+        assert server.hits == {"/sj/ccpm/202509/11/IF.xml": 1, "/sj/ccpm/202509/12/IF.xml": 2}
+        records = list(read_records(path))
+        assert len(records) == 504 and {r.date for r in records} == {"2025-09-11", "2025-09-12"}
+
+
+def test_constant_memory():
+    """测试写入的行数增加时内存峰值基本不变"""
+    def peak_for(rows):
+        record = RankingRecord(RankingType.BUY, 1, "中信期货(代客)", 6277, 1317, "2025-09-12", "IF", "IF2509", "0006")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            sink = ExcelSink(os.path.join(tmpdir, "big.xlsx"))
+            tracemalloc.start()
+            for _ in range(rows // 500):
+                sink.write([record] * 500)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            sink.close()
+        return peak
+
+    small, large = peak_for(500), peak_for(3000)
+    assert large < small * 1.5
+
+
+if __name__ == "__main__":
+    print("Excel流式导出功能测试")
+    print("=" * 50)
+    for test in [test_save_parsed_result, test_sheet_rollover, test_resume_with_checkpoint, test_constant_memory]:
+        test()
+        print(f"✅ {test.__doc__}")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式导出功能测试脚本
+使用假结果生成器代替网络请求, 验证分批写入、断点记录和中断时的数据保存
+"""
+
+import csv
+import os
+import sqlite3
+import tempfile
+
+import pytest
+
+from cffex_checkpoint import CrawlCheckpoint
+from cffex_pipeline import CsvSink, ExportPipeline, ParquetSink, SQLiteSink
+from cffex_reader import read_records
+from cffex_spider import CFFEXSpider
+
+SAMPLE_XML = "ccpm_IF_20250912_sample.xml"
+CONTRACTS = ["IF2509", "IF2510", "IF2512", "IF2603"]
+
+
+def daily_result(date, product_id="IF"):
+    return {"success": True, "product_id": product_id, "date": date,
+            "data": {"volume_ranking": [
+                {"rank": "1", "member_name": "中信期货(代客)", "volume": "28247", "change": "2233"},
+                {"rank": "2", "member_name": "国泰君安(代客)", "volume": "20526", "change": "-2181"},
+                {"rank": "合计", "member_name": "", "volume": "48773", "change": "52"},
+            ]}}
+
+
+def test_stream_to_csv_and_sqlite():
+    """测试分批写入CSV和SQLite, 写入后才记录断点"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        csv_path = os.path.join(tmpdir, "rankings.csv")
+        db_path = os.path.join(tmpdir, "rankings.db")
+        checkpoint = CrawlCheckpoint(os.path.join(tmpdir, "checkpoint.jsonl"))
+        pipeline = ExportPipeline([CsvSink(csv_path), SQLiteSink(db_path)], checkpoint, buffer_size=5)
+
+        def results():
+            for date in ["2025-09-10", "2025-09-11"]:
+                yield daily_result(date)
+            # 第一批(6条)已写入并记录断点, 第二天仍在缓冲区中
+            assert checkpoint.is_completed("IF", "2025-09-10")
+            yield {"success": False, "product_id": "IF", "date": "2025-09-12"}
+
+        assert pipeline.run(results()) == 6
+        assert checkpoint.is_completed("IF", "2025-09-11")
+        assert not checkpoint.is_completed("IF", "2025-09-12")
+
+        with open(csv_path, encoding="utf-8-sig") as f:
+            rows = list(csv.DictReader(f))
+        assert len(rows) == 6 and rows[2]["rank"] == "合计" and rows[0]["instrument_id"] == ""
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("SELECT COUNT(*), SUM(volume) FROM daily_rankings").fetchone() == (4, 2 * 48773)
+        conn.close()
+
+
+def test_flush_on_error():
+    """测试中途出错时已获取的数据仍被写入"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        csv_path = os.path.join(tmpdir, "rankings.csv")
+        checkpoint = CrawlCheckpoint(os.path.join(tmpdir, "checkpoint.jsonl"))
+        pipeline = ExportPipeline([CsvSink(csv_path)], checkpoint)
+
+        def results():
+            yield daily_result("2025-09-10")
+            raise ConnectionError("连接中断")
+
+        try:
+            pipeline.run(results())
+            assert False, "应当抛出异常"
+        except ConnectionError:
+            pass
+        assert checkpoint.is_completed("IF", "2025-09-10")
+        with open(csv_path, encoding="utf-8-sig") as f:
+            assert len(list(csv.DictReader(f))) == 3
+
+
+def test_stream_all_contracts():
+    """测试多合约结果的全部合约都写入CSV、SQLite和Parquet, CSV读回时保留合约代码"""
+    pytest.importorskip("pyarrow")
+    spider = CFFEXSpider(fetch_mode="xml", cache=None)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with open(SAMPLE_XML, "rb") as f:
+            contracts = spider.parse_xml_instruments(f.read())
+        spider.close()
+        result = spider._contracts_result("IF", "2025-09-12", contracts)
+        assert result["instrument_id"] == "IF2509"
+
+        csv_path = os.path.join(tmpdir, "rankings.csv")
+        db_path = os.path.join(tmpdir, "rankings.db")
+        parquet_sink = ParquetSink(os.path.join(tmpdir, "parquet"))
+        pipeline = ExportPipeline([CsvSink(csv_path), SQLiteSink(db_path), parquet_sink])
+        assert pipeline.run([result]) == 252
+
+        csv_records = list(read_records(csv_path))
+        assert len(csv_records) == 252
+        assert sorted({r.instrument_id for r in csv_records}) == CONTRACTS
+        conn = sqlite3.connect(db_path)
+        rows = conn.execute("SELECT instrument_id, COUNT(*) FROM daily_rankings GROUP BY instrument_id").fetchall()
+        conn.close()
+        assert [instrument_id for instrument_id, _ in rows] == CONTRACTS and sum(n for _, n in rows) == 240
+        df = parquet_sink.store.read(product_id="IF")
+        assert sorted(df["instrument_id"].unique()) == CONTRACTS and len(df) == 240
+
+
+if __name__ == "__main__":
+    print("流式导出功能测试")
+    print("=" * 50)
+    for test in [test_stream_to_csv_and_sqlite, test_flush_on_error, test_stream_all_contracts]:
+        test()
+        print(f"✅ {test.__doc__}")
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+会员登记表功能测试脚本
+验证按partyid识别会员、更名后的别名查找、批量写入, 以及旧版数据仓库表结构的升级
+"""
+
+import os
+import sqlite3
+import tempfile
+
+from cffex_members import MemberRegistry
+from cffex_models import RankingRecord, RankingType
+from cffex_spider import CFFEXSpider
+from cffex_warehouse import RankingWarehouse
+
+SAMPLE_XML = "ccpm_IF_20250912_sample.xml"
+
+
+class CountingConnection:
+    """记录执行的语句, 其余调用交给SQLite连接"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.statements = []
+
+    def execute(self, sql, *args):
+        self.statements.append(sql.split()[0])
+        return self.conn.execute(sql, *args)
+
+    def executemany(self, sql, rows):
+        self.statements.append(sql.split()[0])
+        return self.conn.executemany(sql, rows)
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+
+def test_rename_keeps_member_id():
+    """测试同一partyid更名后仍是同一会员, 旧简称可以查到"""
+    registry = MemberRegistry()
+    old_id = registry.resolve("海通期货(代客)", "0018", "2024-12-31")
+    new_id = registry.resolve("国泰君安(代客)", "0018", "2025-04-01")
+    assert old_id == new_id
+    assert registry.names[new_id] == "国泰君安(代客)"
+    assert registry.member_id("海通期货(代客)") == new_id
+    assert registry.aliases(new_id) == ["海通期货(代客)", "国泰君安(代客)"]
+
+    # 较早日期的数据不会把当前简称改回旧简称
+    registry.resolve("海通期货(代客)", "0018", "2024-06-03")
+    assert registry.names[new_id] == "国泰君安(代客)"
+
+
+def test_page_rows_link_to_party():
+    """测试没有partyid的页面数据按简称归到同一会员"""
+    registry = MemberRegistry()
+    member_id = registry.resolve("中信期货(代客)", date="2025-09-11")
+    assert registry.resolve("中信期货(代客)", "0006", "2025-09-12") == member_id
+    assert registry.member_id("0006") == member_id
+    assert registry.resolve("中信期货(代客)", "0099", "2025-09-15") != member_id
+
+
+def test_warehouse_persists_registry():
+    """测试数据仓库重新打开后会员编号不变, 旧表结构自动升级"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "rankings.db")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE members (member_id INTEGER PRIMARY KEY, member_name TEXT NOT NULL UNIQUE)")
+        conn.execute("INSERT INTO members VALUES (7, '海通期货(代客)')")
+        conn.commit()
+        conn.close()
+
+        records = [
+            RankingRecord(RankingType.BUY, 1, "海通期货(代客)", 900, 10, "2024-12-31", "IF", "IF2412", "0018"),
+            RankingRecord(RankingType.BUY, 1, "国泰君安(代客)", 1200, 300, "2025-04-01", "IF", "IF2504", "0018"),
+        ]
+        warehouse = RankingWarehouse(path)
+        try:
+            warehouse.upsert_records(records)
+        finally:
+            warehouse.close()
+
+        warehouse = RankingWarehouse(path)
+        try:
+            df = warehouse.query_rankings(member_name="海通期货(代客)")
+            assert df["member_id"].tolist() == [7, 7]
+            assert set(df["member_name"]) == {"国泰君安(代客)"}
+            assert warehouse.member_net_position("0018", "IF")["long"].tolist() == [900, 1200]
+        finally:
+            warehouse.close()
+
+
+def test_batch_writes():
+    """测试批量登记时每个表只执行一次写入, 重复登记相同记录时不写入"""
+    spider = CFFEXSpider(fetch_mode="xml", cache=None)
+    with open(SAMPLE_XML, "rb") as f:
+        contracts = spider.parse_xml_instruments(f.read())
+    spider.close()
+    records = [r for data in contracts.values() for rows in data.values() for r in rows if not r.is_total]
+    for record in records:
+        record.date = "2025-09-12"
+
+    conn = CountingConnection(sqlite3.connect(":memory:"))
+    registry = MemberRegistry(conn)
+    conn.statements = []
+    member_ids = registry.resolve_records(records)
+    assert conn.statements == ["INSERT", "INSERT"]
+    assert member_ids == [registry.member_id(r.party_id) for r in records]
+    assert conn.execute("SELECT COUNT(*) FROM members").fetchone()[0] == len(set(member_ids))
+
+    conn.statements = []
+    assert registry.resolve_records(records) == member_ids
+    assert conn.statements == []
+
+    # 重新加载后得到相同的会员编号
+    reloaded = MemberRegistry(conn)
+    assert [reloaded.member_id(r.party_id) for r in records] == member_ids
+    assert reloaded.seen == registry.seen
+
+
+if __name__ == "__main__":
+    print("会员登记表功能测试")
+    print("=" * 50)
+    for test in [test_rename_keeps_member_id, test_page_rows_link_to_party, test_warehouse_persists_registry,
+                 test_batch_writes]:
+        test()
+        print(f"✅ {test.__doc__}")
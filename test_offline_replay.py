@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线回放功能测试脚本
+在本地回放服务上重放录制的XML、错误页面和调试页面, 不需要Chrome和网络
+"""
+
+import time
+
+import requests
+
+from cffex_replay import ReplayServer
+
+
+def test_replay_xml():
+    """测试通过回放服务下载并解析XML, 错误页面和缺失日期不产生数据"""
+    with ReplayServer() as server:
+        spider = server.make_spider()
+        start = time.perf_counter()
+        try:
+            result = spider.get_product_data_xml("IF", "2025-09-12")
+            assert result["success"] and list(result["contracts"]) == ["IF2509", "IF2510", "IF2512", "IF2603"]
+            assert result["data"]["volume_ranking"][-1].volume == 116676
+
+            # 交易所以状态码200返回的错误页面
+            stub = spider.get_product_data_xml("IF", "2025-09-17")
+            assert not stub["success"] and not stub["no_data"]
+            assert not spider.get_product_data_xml("IC", "2025-09-12")["success"]
+        finally:
+            spider.close()
+        assert time.perf_counter() - start < 1.0
+        assert server.hits == {"/sj/ccpm/202509/12/IF.xml": 1, "/sj/ccpm/202509/17/IF.xml": 1,
+                               "/sj/ccpm/202509/12/IC.xml": 1}
+
+
+def test_replay_pages():
+    """测试回放保存的调试页面, 没有录制页面的产品返回无数据页面"""
+    with ReplayServer() as server:
+        spider = server.make_spider()
+        try:
+            assert spider.base_url == server.page_base_url
+            with requests.Session() as session:
+                page = session.get(f"{spider.base_url}?productid=IM", timeout=5).text
+                assert list(spider.parse_page_instruments(page)) == ["IM2509", "IM2510", "IM2512", "IM2603"]
+                empty = session.get(f"{spider.base_url}?productid=TS", timeout=5).text
+                assert spider.parse_page_instruments(empty) == {}
+        finally:
+            spider.close()
+
+
+def test_added_fixtures():
+    """测试不读取目录时只回放手动添加的内容"""
+    with ReplayServer(root=None) as server:
+        server.add_xml("IM", "2025-09-12", "ccpm_IF_20250912_sample.xml")
+        assert server.respond("/sj/ccpm/202509/12/IM.xml")[0] == 200
+        assert server.respond("/sj/ccpm/202509/12/IF.xml") == (404, b"", "text/html;charset=UTF-8")
+        assert server.respond("/ccpm/?productid=IF")[0] == 404
+
+
+if __name__ == "__main__":
+    print("离线回放功能测试")
+    print("=" * 50)
+    for test in [test_replay_xml, test_replay_pages, test_added_fixtures]:
+        test()
+        print(f"✅ {test.__doc__}")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+页面就绪检测功能测试脚本
+使用假浏览器按顺序返回页面状态, 不需要Chrome
+"""
+
+from cffex_readiness import PageReadiness, STATE_JS
+
+
+class ScriptedDriver:
+    """模拟WebDriver, 每次读取页面状态时返回下一个预设状态"""
+
+    def __init__(self, states):
+        self.states = list(states)
+
+    def execute_script(self, script, *args):
+        if script == STATE_JS:
+            return self.states.pop(0) if len(self.states) > 1 else self.states[0]
+        return None
+
+
+def page_state(**kwargs):
+    state = {"ready": True, "xhrDone": 0, "hasVm": True, "isShow": False, "noResult": False,
+             "noDataVisible": False, "tables": 0, "marker": ""}
+    state.update(kwargs)
+    return state
+
+
+def test_wait_until_loaded():
+    """测试等待首次加载完成"""
+    driver = ScriptedDriver([
+        page_state(ready=False),
+        page_state(),
+        page_state(isShow=True, tables=4, marker="交易日:20250912|合约:IF2509"),
+    ])
+    readiness = PageReadiness(driver, timeout=2, poll_frequency=0.01)
+    assert readiness.wait_until_loaded() == "data"
+    assert readiness.timings[-1]["signal"] == "页面加载"
+
+
+def test_query_result_waits_for_change():
+    """测试查询结果只在XHR完成或表格变化后才算就绪"""
+    before = page_state(isShow=True, tables=4, marker="交易日:20250912|合约:IF2509")
+    driver = ScriptedDriver([
+        before,
+        page_state(xhrDone=1, noResult=True, noDataVisible=True),
+    ])
+    readiness = PageReadiness(driver, timeout=2, poll_frequency=0.01)
+    assert readiness.wait_for_query_result(before) == "no_data"
+
+    unchanged = ScriptedDriver([before])
+    readiness = PageReadiness(unchanged, timeout=0.05, poll_frequency=0.01)
+    assert readiness.wait_for_query_result(before) is None
+    assert readiness.timings[-1]["outcome"] is None
+
+
+if __name__ == "__main__":
+    print("页面就绪检测功能测试")
+    print("=" * 50)
+    for test in [test_wait_until_loaded, test_query_result_waits_for_change]:
+        test()
+        print(f"✅ {test.__doc__}")
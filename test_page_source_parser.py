@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+页面源码解析功能测试脚本
+使用保存的调试页面验证lxml解析, 不需要Chrome
+"""
+
+from cffex_models import RankingRecord, RankingType
+from cffex_spider import CFFEXSpider
+
+
+def load_page(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def test_parse_debug_page():
+    """测试从调试页面解析三个排名"""
+    spider = CFFEXSpider(cache=None)
+    data = spider.parse_page_source(load_page("debug_page_IF.html"))
+    assert len(data["volume_ranking"]) == 21
+    assert data["volume_ranking"][0] == RankingRecord(RankingType.VOLUME, 1, "中信期货(代客)", 28247, 2233,
+                                                      instrument_id="IF2509")
+    assert data["volume_ranking"][-1].volume == 116676
+    assert data["buy_position_ranking"][-1].rank == 20
+    assert data["sell_position_ranking"][-1].member_name == "南华期货(代客)"
+
+
+def test_select_contract_month():
+    """测试按合约月份选择表格"""
+    spider = CFFEXSpider(cache=None)
+    data = spider.parse_page_source(load_page("debug_page_IF.html"), contract_month="2025-12")
+    assert data["volume_ranking"][-1] == RankingRecord(RankingType.VOLUME, None, "", 86107, 11589,
+                                                      instrument_id="IF2512")
+
+
+def test_parse_all_contracts():
+    """测试一次解析出页面上的全部合约"""
+    spider = CFFEXSpider(cache=None)
+    contracts = spider.parse_page_instruments(load_page("debug_page_IM.html"))
+    assert list(contracts) == ["IM2509", "IM2510", "IM2512", "IM2603"]
+    assert all(len(data["volume_ranking"]) == 21 for data in contracts.values())
+
+
+def test_no_data_page():
+    """测试无数据页面的空模板行不被当作数据"""
+    spider = CFFEXSpider(cache=None)
+    data = spider.parse_page_source(load_page("cffex_ccpm_page.html"))
+    assert data == {"volume_ranking": [], "buy_position_ranking": [], "sell_position_ranking": []}
+
+
+if __name__ == "__main__":
+    print("页面源码解析功能测试")
+    print("=" * 50)
+    for test in [test_parse_debug_page, test_select_contract_month, test_parse_all_contracts, test_no_data_page]:
+        test()
+        print(f"✅ {test.__doc__}")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+列式存储功能测试脚本
+验证数字转换、行展开, 以及Parquet追加和分区读取 (需要pyarrow)
+"""
+
+import tempfile
+
+import pytest
+
+from cffex_storage import ParquetStore, ranking_rows
+
+
+def sample_data(date, volume):
+    return {
+        "success": True,
+        "product_id": "IF",
+        "date": date,
+        "data": {
+            "volume_ranking": [
+                {"rank": "1", "member_name": "中信期货(代客)", "volume": f"{volume:,}", "change": "+2233"},
+                {"rank": "合计", "member_name": "", "volume": f"{volume:,}", "change": "2233"},
+            ],
+            "buy_position_ranking": [
+                {"rank": "1", "member_name": "国泰君安(代客)", "volume": "9000", "change": "-42"},
+            ],
+            "sell_position_ranking": [],
+        },
+    }
+
+
+def test_ranking_rows():
+    """测试展开为带类型的行并跳过合计行"""
+    rows = ranking_rows([sample_data("2025-09-12", 28247), {"success": False}])
+    assert len(rows) == 2
+    assert rows[0] == {"date": "2025-09-12", "product_id": "IF", "instrument_id": "", "ranking_type": "volume_ranking",
+                       "rank": 1, "member_name": "中信期货(代客)", "party_id": "", "volume": 28247, "change": 2233}
+
+
+def test_append_and_read():
+    """测试按分区追加并读取, 重复日期保留最后一次"""
+    pytest.importorskip("pyarrow")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = ParquetStore(tmpdir)
+        assert store.append([sample_data("2025-08-29", 100), sample_data("2025-09-12", 200)]) == 4
+        assert store.append([sample_data("2025-09-12", 300)]) == 2
+
+        df = store.read(product_id="IF", start_date="2025-09-01")
+        assert list(df["date"].astype(str).unique()) == ["2025-09-12"]
+        assert df.loc[df["ranking_type"] == "volume_ranking", "volume"].tolist() == [300]
+        assert len(store.read()) == 4
+
+
+if __name__ == "__main__":
+    print("列式存储功能测试")
+    print("=" * 50)
+    for test in [test_ranking_rows, test_append_and_read]:
+        test()
+        print(f"✅ {test.__doc__}")
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+解析性能测试脚本
+用pytest-benchmark测量各解析路径的吞吐量 (页面/秒、记录/秒), 结果写入extra_info,
+可以用 pytest test_parser_benchmark.py --benchmark-compare 对比解析优化前后的速度;
+直接运行本脚本时不需要pytest-benchmark, 按简单计时输出吞吐量
+"""
+
+import logging
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from cffex_reader import read_records
+from cffex_replay import ReplayServer
+from cffex_validator import validate_response
+
+try:
+    import pytest_benchmark  # noqa: F401
+except ImportError:
+    pytest_benchmark = None
+
+STUB_XML = "IF_20250912.xml"
+# 已知错误页面按大小和哈希识别, 每次识别的时间上限 (秒)
+STUB_CHECK_BUDGET = 1e-4
+
+CASE_NAMES = ["xml_instruments", "xml_single_contract", "page_IF", "page_IM", "page_no_data", "csv_sections",
+              "csv_flat", "replay_fetch_xml"]
+
+
+def load(filename, mode='rb'):
+    with open(filename, mode) as f:
+        return f.read()
+
+
+def count_records(contracts):
+    return sum(len(records) for data in contracts.values() for records in data.values())
+
+
+def parser_cases(spider, server=None):
+    """
+    各解析路径
+    Returns:
+        list: (名称, 无参函数, 返回值 -> 记录数)
+    """
+    sample_xml = load("ccpm_IF_20250912_sample.xml")
+    page_if = load("debug_page_IF.html", 'r')
+    page_im = load("debug_page_IM.html", 'r')
+    no_data_page = load("cffex_ccpm_page.html", 'r')
+    cases = [
+        ("xml_instruments", lambda: spider.parse_xml_instruments(sample_xml), count_records),
+        ("xml_single_contract", lambda: spider.parse_xml_data(sample_xml),
+         lambda data: sum(len(records) for records in data.values())),
+        ("page_IF", lambda: spider.parse_page_instruments(page_if), count_records),
+        ("page_IM", lambda: spider.parse_page_instruments(page_im), count_records),
+        ("page_no_data", lambda: spider.parse_page_instruments(no_data_page), count_records),
+        ("csv_sections", lambda: list(read_records("cffex_data_20250917_170852.csv")), len),
+        ("csv_flat", lambda: list(read_records("IF_range_2025-09-08_to_2025-09-12.csv")), len),
+    ]
+    if server is not None:
+        cases.append(("replay_fetch_xml", lambda: spider.get_product_data_xml("IF", "2025-09-12"),
+                      lambda result: count_records(result["contracts"])))
+    return cases
+
+
+if pytest_benchmark is None:
+    @pytest.fixture
+    def benchmark():
+        pytest.skip("需要pytest-benchmark: pip install pytest-benchmark")
+
+
+@pytest.fixture(scope="module")
+def cases():
+    # 只测量解析本身, 不计入逐条写日志文件的时间
+    logging.disable(logging.WARNING)
+    server = ReplayServer().start()
+    spider = server.make_spider()
+    try:
+        yield {name: (func, rows) for name, func, rows in parser_cases(spider, server)}
+    finally:
+        spider.close()
+        server.stop()
+        logging.disable(logging.NOTSET)
+
+
+def record_throughput(benchmark, func, rows):
+    """运行性能测试, 把页面/秒和记录/秒写入extra_info"""
+    result = benchmark(func)
+    mean = benchmark.stats.stats.mean
+    benchmark.extra_info["rows"] = rows(result)
+    benchmark.extra_info["pages_per_second"] = round(1 / mean, 1)
+    benchmark.extra_info["rows_per_second"] = round(rows(result) / mean, 1)
+    return result
+
+
+@pytest.mark.parametrize("name", CASE_NAMES)
+def test_parse_throughput(benchmark, cases, name):
+    """测量各解析路径的吞吐量"""
+    func, rows = cases[name]
+    result = record_throughput(benchmark, func, rows)
+    if name != "page_no_data":
+        assert rows(result) > 0
+
+
+def test_stub_detection(benchmark):
+    """测量已知错误页面的识别速度, 每次应在100微秒以内"""
+    stub = load(STUB_XML)
+    check = benchmark(lambda: validate_response(stub))
+    assert check.kind == "stub"
+    assert benchmark.stats.stats.mean < STUB_CHECK_BUDGET
+
+
+class SimpleBenchmark:
+    """没有pytest-benchmark时的简单计时, 接口与benchmark夹具相同"""
+
+    def __init__(self, rounds=50):
+        self.rounds = rounds
+        self.extra_info = {}
+        self.stats = None
+
+    def __call__(self, func):
+        result = func()
+        start = time.perf_counter()
+        for _ in range(self.rounds):
+            func()
+        mean = (time.perf_counter() - start) / self.rounds
+        self.stats = SimpleNamespace(stats=SimpleNamespace(mean=mean))
+        return result
+
+
+if __name__ == "__main__":
+    print("解析性能测试")
+    print("=" * 50)
+    logging.disable(logging.WARNING)
+    with ReplayServer() as server:
+        spider = server.make_spider()
+        try:
+            for name, func, rows in parser_cases(spider, server):
+                bench = SimpleBenchmark()
+                record_throughput(bench, func, rows)
+                info = bench.extra_info
+                print(f"{name:20s} {info['pages_per_second']:>10.1f} 页/秒 {info['rows_per_second']:>12.1f} 条/秒")
+            bench = SimpleBenchmark(rounds=1000)
+            stub = load(STUB_XML)
+            bench(lambda: validate_response(stub))
+            print(f"{'stub_detection':20s} {bench.stats.stats.mean * 1e6:>10.1f} 微秒/次")
+        finally:
+            spider.close()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按会员类别汇总数据 (positionamt) 功能测试脚本
+验证一次解析同时得到排名和汇总数据, 以及汇总数据的CSV导出和数据仓库写入
+"""
+
+import csv
+import os
+import tempfile
+
+from cffex_pipeline import AmountCsvSink, ExportPipeline, SQLiteSink
+from cffex_replay import ReplayServer
+from cffex_spider import CFFEXSpider
+
+SAMPLE_XML = "ccpm_IF_20250912_sample.xml"
+
+
+def test_parse_single_pass():
+    """测试同一次解析中得到全部合约的排名和按会员类别汇总的数据"""
+    spider = CFFEXSpider(fetch_mode="xml", cache=None)
+    try:
+        with open(SAMPLE_XML, "rb") as f:
+            content = f.read()
+        document = spider.parse_xml_document(content)
+        assert document["contracts"] == spider.parse_xml_instruments(content)
+        amounts = document["position_amounts"]
+        assert [(a.instrument_id, a.member_category) for a in amounts] == [
+            ("IF2509", 0), ("IF2509", 1), ("IF2510", 0), ("IF2510", 1)]
+        assert amounts[0].volume == 116676 and amounts[0].buy_volume == 31478 and amounts[0].sell_change == -1310
+        assert amounts[1].member_category_label == "非期货公司结算会员"
+
+        # 没有positionamt节点的XML
+        plain = spider.parse_xml_document(content.split(b"<positionamt>")[0] + b"</positionRank>")
+        assert plain["position_amounts"] == [] and list(plain["contracts"]) == list(document["contracts"])
+    finally:
+        spider.close()
+
+
+def test_fetch_and_save_csv():
+    """测试下载XML后结果中带有汇总数据, 并保存为单独的CSV文件"""
+    with ReplayServer(root=None) as server, tempfile.TemporaryDirectory() as tmpdir:
+        server.add_xml("IF", "2025-09-12", SAMPLE_XML)
+        spider = server.make_spider()
+        try:
+            result = spider.get_product_data("IF", "2025-09-12")
+            spider.annotate_records(result, "2025-09-12", "IF")
+            assert len(result["position_amounts"]) == 4
+            assert {(a.date, a.product_id) for a in result["position_amounts"]} == {("2025-09-12", "IF")}
+
+            filename = spider.save_position_amounts_to_csv([result], os.path.join(tmpdir, "amounts.csv"))
+            assert spider.save_position_amounts_to_csv([{"success": False}]) is None
+        finally:
+            spider.close()
+        assert server.hits == {"/sj/ccpm/202509/12/IF.xml": 1}
+
+        with open(filename, encoding="utf-8-sig") as f:
+            rows = list(csv.DictReader(f))
+        assert len(rows) == 4
+        assert rows[0]["member_category"] == "期货公司结算会员" and rows[0]["volume"] == "116676"
+
+
+def test_pipeline_sinks():
+    """测试流式导出时汇总数据写入数据仓库的单独表和CSV文件, 重复写入时覆盖 (CSV在关闭时去重)"""
+    spider = CFFEXSpider(fetch_mode="xml", cache=None)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with open(SAMPLE_XML, "rb") as f:
+            document = spider.parse_xml_document(f.read())
+        spider.close()
+        result = spider._contracts_result("IF", "2025-09-12", document["contracts"],
+                                          position_amounts=document["position_amounts"])
+        spider.annotate_records(result, "2025-09-12", "IF")
+
+        db_path = os.path.join(tmpdir, "rankings.db")
+        csv_path = os.path.join(tmpdir, "amounts.csv")
+        for _ in range(2):
+            sqlite_sink = SQLiteSink(db_path)
+            pipeline = ExportPipeline([sqlite_sink, AmountCsvSink(csv_path)])
+            assert pipeline.run([result]) == 252
+
+        sqlite_sink = SQLiteSink(db_path)
+        try:
+            df = sqlite_sink.warehouse.query_position_amounts(product_id="IF", instrument_id="IF2509")
+            assert df["member_category"].tolist() == [0, 1] and df["volume"].tolist() == [116676, 23113]
+            assert len(sqlite_sink.warehouse.query_position_amounts()) == 4
+        finally:
+            sqlite_sink.close()
+        with open(csv_path, encoding="utf-8-sig") as f:
+            rows = list(csv.DictReader(f))
+        assert len(rows) == 4 and rows[0]["volume"] == "116676"
+        assert not os.path.exists(os.path.join(tmpdir, "amounts.tmp.csv"))
+
+        # 每次写入只在末尾追加, 关闭时去掉重复的行
+        sink = AmountCsvSink(csv_path)
+        sink.write_amounts(document["position_amounts"][:2])
+        with open(csv_path, encoding="utf-8-sig") as f:
+            assert len(list(csv.DictReader(f))) == 6
+        sink.close()
+        with open(csv_path, encoding="utf-8-sig") as f:
+            assert len(list(csv.DictReader(f))) == 4
+
+
+if __name__ == "__main__":
+    print("按会员类别汇总数据功能测试")
+    print("=" * 50)
+    for test in [test_parse_single_pass, test_fetch_and_save_csv, test_pipeline_sinks]:
+        test()
+        print(f"✅ {test.__doc__}")
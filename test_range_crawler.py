@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并发范围爬取功能测试脚本
+使用假爬虫代替网络请求, 验证结果顺序、并发上限和未取出结果的数量上限
+"""
+
+import random
+import threading
+import time
+
+from cffex_crawler import RangeCrawler, iter_dates
+from cffex_models import RankingType
+from cffex_spider import CFFEXSpider
+
+
+class FakeSpider:
+    """模拟CFFEXSpider, 记录同时进行的请求数"""
+    xml_base_url = CFFEXSpider.xml_base_url
+    lock = threading.Lock()
+    active = 0
+    max_active = 0
+    calls = 0
+
+    def get_product_data(self, product_id, date=None, contract_month=None):
+        with FakeSpider.lock:
+            FakeSpider.calls += 1
+            FakeSpider.active += 1
+            FakeSpider.max_active = max(FakeSpider.max_active, FakeSpider.active)
+        time.sleep(random.uniform(0, 0.01))
+        with FakeSpider.lock:
+            FakeSpider.active -= 1
+        return {"success": True, "product_id": product_id, "date": date,
+                "data": {"volume_ranking": [{"rank": "1"}]}}
+
+    annotate_records = CFFEXSpider.annotate_records
+
+    def release_driver(self, broken=False):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_iter_dates():
+    """测试日期范围生成"""
+    assert list(iter_dates("2025-08-30", "2025-09-02")) == [
+        "2025-08-30", "2025-08-31", "2025-09-01", "2025-09-02"]
+
+
+def test_crawl_order_and_limits():
+    """测试结果按日期、产品顺序汇总且不超过主机并发上限"""
+    crawler = RangeCrawler(max_workers=8, rate=0, per_host_limit=2, spider_factory=FakeSpider)
+    try:
+        results = crawler.crawl(["IF", "IC", "IM"], "2025-09-08", "2025-09-12")
+    finally:
+        crawler.close()
+
+    assert [(r["date"], r["product_id"]) for r in results] == [
+        (d, p) for d in iter_dates("2025-09-08", "2025-09-12") for p in ["IF", "IC", "IM"]]
+    assert FakeSpider.max_active <= 2
+    record = results[0]["data"]["volume_ranking"][0]
+    assert (record.date, record.product_id, record.ranking_type) == ("2025-09-08", "IF", RankingType.VOLUME)
+
+
+def test_bounded_window():
+    """测试消费方较慢时提交的任务不超过已取出的结果加上max_workers * 2"""
+    crawler = RangeCrawler(max_workers=2, rate=0, per_host_limit=2, spider_factory=FakeSpider)
+    FakeSpider.calls = 0
+    consumed = 0
+    try:
+        for result in crawler.iter_crawl(["IF", "IC"], "2025-09-01", "2025-10-31"):
+            consumed += 1
+            time.sleep(0.005)
+            assert FakeSpider.calls <= consumed + 4
+    finally:
+        crawler.close()
+    assert consumed == FakeSpider.calls > 50
+
+
+if __name__ == "__main__":
+    print("并发范围爬取功能测试")
+    print("=" * 50)
+    for test in [test_iter_dates, test_crawl_order_and_limits, test_bounded_window]:
+        test()
+        print(f"✅ {test.__doc__}")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+持仓排名记录模型测试脚本
+验证文本字段转换、合计行和多日结果的遍历
+"""
+
+import csv
+import os
+import tempfile
+
+from cffex_models import RankingRecord, RankingType, iter_records, to_int
+from cffex_spider import CFFEXSpider
+
+
+def test_to_int():
+    """测试数字文本转换"""
+    assert to_int("28,247") == 28247
+    assert to_int("+50") == 50
+    assert to_int("-42") == -42
+    assert to_int("") is None and to_int("-") is None and to_int("合计") is None
+
+
+def test_from_fields():
+    """测试由页面文本创建记录, 合计行名次为None"""
+    record = RankingRecord.from_fields("volume_ranking", "1", " 中信期货(代客) ", "28,247", "+2233")
+    assert record == RankingRecord(RankingType.VOLUME, 1, "中信期货(代客)", 28247, 2233)
+    total = RankingRecord.from_fields(RankingType.BUY, "合计", "", "49669", "-10")
+    assert total.is_total and total.rank_label == "合计"
+    assert RankingRecord.from_fields(RankingType.SELL, "", "", "", "") is None
+    assert not hasattr(record, "__dict__")
+
+
+def test_iter_records():
+    """测试遍历多日结果, 旧格式字典被统一为记录"""
+    all_data = [
+        {"success": True, "product_id": "IF", "date": "2025-09-12",
+         "data": {"volume_ranking": [{"rank": "1", "member_name": "中信期货(代客)", "volume": "100", "change": "5"}]}},
+        {"success": False, "product_id": "IF", "date": "2025-09-15"},
+    ]
+    records = list(iter_records(all_data))
+    assert len(records) == 1
+    assert (records[0].date, records[0].product_id, records[0].volume) == ("2025-09-12", "IF", 100)
+    assert records[0].to_dict()["ranking_type"] == "volume_ranking"
+
+
+def test_csv_exporters_accept_dict_records():
+    """测试单日和多日CSV导出都接受旧格式字典记录"""
+    result = {"success": True, "product_id": "IF", "date": "2025-09-12",
+              "data": {"volume_ranking": [{"rank": "1", "member_name": "中信期货(代客)", "volume": "28,247",
+                                           "change": "+2233"}],
+                       "buy_position_ranking": [], "sell_position_ranking": []}}
+    spider = CFFEXSpider(fetch_mode="xml", cache=None)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        try:
+            single = spider.save_to_csv(result, os.path.join(tmpdir, "single.csv"))
+            assert single and spider.save_range_data_to_csv([result], os.path.join(tmpdir, "range.csv"))
+        finally:
+            spider.close()
+        with open(single, encoding="utf-8-sig") as f:
+            rows = list(csv.reader(f))
+        assert ["1", "中信期货(代客)", "28247", "2233"] in rows
+
+
+if __name__ == "__main__":
+    print("持仓排名记录模型测试")
+    print("=" * 50)
+    for test in [test_to_int, test_from_fields, test_iter_records, test_csv_exporters_accept_dict_records]:
+        test()
+        print(f"✅ {test.__doc__}")
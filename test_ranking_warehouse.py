@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite数据仓库功能测试脚本
+使用仓库中保存的XML样本, 验证规范化写入、重复写入覆盖和历史查询
+"""
+
+import os
+import tempfile
+
+from cffex_spider import CFFEXSpider
+from cffex_warehouse import RankingWarehouse
+
+
+def sample_result(date="2025-09-12"):
+    spider = CFFEXSpider(cache=None)
+    with open("ccpm_IF_20250912_sample.xml", "rb") as f:
+        contracts = spider.parse_xml_instruments(f.read())
+    result = spider._contracts_result("IF", date, contracts)
+    spider.annotate_records(result, date, "IF")
+    return result
+
+
+def test_upsert_all_contracts():
+    """测试写入全部合约, 重复写入不产生重复数据"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        warehouse = RankingWarehouse(os.path.join(tmpdir, "rankings.db"))
+        try:
+            assert warehouse.upsert_results([sample_result()]) == 4 * 3 * 20
+            warehouse.upsert_results([sample_result()])
+            conn = warehouse.conn
+            assert conn.execute("SELECT COUNT(*) FROM daily_rankings").fetchone()[0] == 240
+            assert conn.execute("SELECT COUNT(*) FROM instruments").fetchone()[0] == 4
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+            df = warehouse.query_rankings(product_id="IF", instrument_id="IF2509", ranking_type="volume_ranking")
+            assert len(df) == 20 and df["volume"].sum() == 116676
+        finally:
+            warehouse.close()
+
+
+def test_member_net_position():
+    """测试按会员查询每日净持仓"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        warehouse = RankingWarehouse(os.path.join(tmpdir, "rankings.db"))
+        try:
+            warehouse.upsert_results([sample_result("2025-09-11"), sample_result("2025-09-12")])
+            df = warehouse.member_net_position("中信期货(代客)", "IF", start_date="2025-09-12")
+            assert df["date"].tolist() == ["2025-09-12"]
+            detail = warehouse.query_rankings(product_id="IF", start_date="2025-09-12", member_name="中信期货(代客)")
+            long = detail.loc[detail["ranking_type"] == "buy_position_ranking", "volume"].sum()
+            short = detail.loc[detail["ranking_type"] == "sell_position_ranking", "volume"].sum()
+            assert df["net"].iloc[0] == long - short
+        finally:
+            warehouse.close()
+
+
+if __name__ == "__main__":
+    print("SQLite数据仓库功能测试")
+    print("=" * 50)
+    for test in [test_upsert_all_contracts, test_member_net_position]:
+        test()
+        print(f"✅ {test.__doc__}")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自适应限速功能测试脚本
+验证令牌桶突发和补充、AIMD速率调整, 以及爬虫下载XML时把延迟和错误页面反馈给限速器
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cffex_spider import CFFEXSpider
+from cffex_throttle import AdaptiveRateLimiter, TokenBucket
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """/12/ 返回XML样本, 其他日期返回交易所的HTML错误页面 (状态码200)"""
+
+    def do_GET(self):
+        filename = "ccpm_IF_20250912_sample.xml" if "/12/" in self.path else "IF_20250912.xml"
+        with open(filename, "rb") as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_token_bucket():
+    """测试令牌桶允许突发, 之后按速率等待"""
+    bucket = TokenBucket(rate=2.0, capacity=2)
+    now = bucket.updated
+    assert bucket.reserve(now) == 0.0
+    assert bucket.reserve(now) == 0.0
+    assert bucket.reserve(now) == 0.5
+    assert bucket.reserve(now) == 1.0
+    # 2秒后补充4个令牌, 抵消之前预订的2个
+    assert bucket.reserve(now + 2.0) == 0.0
+
+
+def test_aimd_adjustment():
+    """测试正常请求线性加速, 出错或延迟过高时减半且不低于下限"""
+    limiter = AdaptiveRateLimiter(initial_rate=2.0, min_rate=0.5, max_rate=3.0, increase=0.5, latency_target=1.0)
+    for _ in range(4):
+        limiter.record("host", 0.1)
+    assert limiter.rate("host") == 3.0
+
+    limiter.record("host", 0.1, ok=False)
+    assert limiter.rate("host") == 1.5
+    # 同一批并发请求的连续失败只减速一次
+    limiter.record("host", 0.1, ok=False)
+    assert limiter.rate("host") == 1.5
+
+    limiter._stats["host"]["last_decrease"] = 0.0
+    limiter.record("host", 5.0)
+    assert limiter.rate("host") == 0.75
+    limiter._stats["host"]["last_decrease"] = 0.0
+    limiter.record("host", 0.1, ok=False, slow_down=False)
+    assert limiter.rate("host") == 0.75
+
+    stats = limiter.stats()["host"]
+    assert stats["requests"] == 8 and stats["errors"] == 3 and stats["slowdowns"] == 2
+
+
+def test_fetch_xml_feedback():
+    """测试下载到HTML错误页面时限速器减速, 正常XML时加速"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host = f"127.0.0.1:{server.server_address[1]}"
+    limiter = AdaptiveRateLimiter(initial_rate=20.0, max_rate=40.0)
+    spider = CFFEXSpider(fetch_mode="xml", cache=None, rate_limiter=limiter)
+    spider.xml_base_url = f"http://{host}/sj/ccpm/"
+    try:
+        assert spider.fetch_xml("IF", "2025-09-12").startswith(b"<?xml")
+        assert limiter.rate(host) > 20.0
+        spider.fetch_xml("IF", "2025-09-17")
+        assert limiter.rate(host) < 20.0
+        assert limiter.stats()[host]["errors"] == 1
+    finally:
+        spider.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    print("自适应限速功能测试")
+    print("=" * 50)
+    for test in [test_token_bucket, test_aimd_adjustment, test_fetch_xml_feedback]:
+        test()
+        print(f"✅ {test.__doc__}")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+响应缓存功能测试脚本
+"""
+
+import os
+import tempfile
+from datetime import datetime
+
+from cffex_cache import ResponseCache
+from cffex_replay import ReplayServer
+
+SAMPLE_XML = "ccpm_IF_20250912_sample.xml"
+
+
+def test_put_get_and_dedup():
+    """测试读写缓存及相同内容只保存一份"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = ResponseCache(os.path.join(tmpdir, "cache.db"))
+        cache.put("IF", "2025-09-12", b"<positionRank/>")
+        cache.put("IC", "2025-09-12", b"<positionRank/>")
+        assert cache.get("IF", "2025-09-12") == b"<positionRank/>"
+        assert cache.get("IF", "2025-09-11") is None
+        stats = cache.stats()
+        assert stats["entries"] == 2 and stats["blobs"] == 1
+        cache.close()
+
+
+def test_today_ttl():
+    """测试发布截止时间之前获取的数据会过期, 之后获取的数据不会过期"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        now = [datetime(2025, 9, 12, 15, 0)]
+        cache = ResponseCache(os.path.join(tmpdir, "cache.db"), today_ttl=600, clock=lambda: now[0])
+        cache.put("IF", "2025-09-12", b"today")
+        cache.put("IF", "2025-09-11", b"history")
+        now[0] = datetime(2025, 9, 12, 15, 20)
+        assert cache.get("IF", "2025-09-12") is None
+        assert cache.get("IF", "2025-09-12", allow_stale=True) == b"today"
+        assert cache.get("IF", "2025-09-11") == b"history"
+        cache.close()
+
+
+def test_refetch_before_publication():
+    """测试发布前获取的当天空文档不缓存, 第二天重新下载, 发布后获取的数据永久有效"""
+    empty = b"<?xml version='1.0' encoding='UTF-8'?><positionRank></positionRank>"
+    with tempfile.TemporaryDirectory() as tmpdir, ReplayServer(root=None) as server:
+        now = [datetime(2025, 9, 12, 10, 0)]
+        cache = ResponseCache(os.path.join(tmpdir, "cache.db"), clock=lambda: now[0])
+        # 直接写入缓存的发布前内容在第二天不再有效
+        cache.put("IM", "2025-09-12", empty)
+        now[0] = datetime(2025, 9, 13, 9, 0)
+        assert cache.get("IM", "2025-09-12") is None
+
+        server.xml[("IF", "2025-09-12")] = empty
+        spider = server.make_spider(cache=cache)
+        try:
+            now[0] = datetime(2025, 9, 12, 10, 0)
+            assert spider.get_product_data_xml("IF", "2025-09-12")["no_data"]
+            assert cache.get("IF", "2025-09-12") is None
+
+            now[0] = datetime(2025, 9, 13, 9, 0)
+            server.add_xml("IF", "2025-09-12", SAMPLE_XML)
+            assert spider.get_product_data_xml("IF", "2025-09-12")["success"]
+            now[0] = datetime(2025, 10, 13, 9, 0)
+            assert spider.get_product_data_xml("IF", "2025-09-12")["success"]
+        finally:
+            spider.close()
+        assert server.hits == {"/sj/ccpm/202509/12/IF.xml": 2}
+
+
+def test_lru_eviction():
+    """测试超过容量后淘汰最近最少使用的条目"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = ResponseCache(os.path.join(tmpdir, "cache.db"), max_bytes=2500)
+        cache.put("IF", "2025-09-08", os.urandom(1000))
+        cache.put("IF", "2025-09-09", os.urandom(1000))
+        cache.get("IF", "2025-09-08")
+        cache.put("IF", "2025-09-10", os.urandom(1000))
+        assert cache.get("IF", "2025-09-09") is None
+        assert cache.get("IF", "2025-09-08") is not None
+        assert cache.get("IF", "2025-09-10") is not None
+        cache.close()
+
+
+def test_replace_and_read_only_get():
+    """测试替换条目时删除不再被引用的旧内容, 命中缓存时不写入文件"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = ResponseCache(os.path.join(tmpdir, "cache.db"))
+        cache.put("IF", "2025-09-12", b"before")
+        cache.put("IC", "2025-09-12", b"shared")
+        cache.put("IM", "2025-09-12", b"shared")
+        cache.put("IF", "2025-09-12", b"after")
+        cache.put("IC", "2025-09-12", b"after")
+        stats = cache.stats()
+        assert stats["entries"] == 3 and stats["blobs"] == 2
+        assert cache.get("IM", "2025-09-12") == b"shared"
+
+        changes = cache.conn.total_changes
+        for _ in range(3):
+            assert cache.get("IF", "2025-09-12") == b"after"
+        assert cache.conn.total_changes == changes and not cache.conn.in_transaction
+        cache.close()
+
+
+if __name__ == "__main__":
+    print("响应缓存功能测试")
+    print("=" * 50)
+    for test in [test_put_get_and_dedup, test_today_ttl, test_refetch_before_publication, test_lru_eviction,
+                 test_replace_and_read_only_get]:
+        test()
+        print(f"✅ {test.__doc__}")
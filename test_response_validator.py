@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+响应内容校验功能测试脚本
+使用仓库中保存的错误页面和XML样本, 验证按特征识别错误页面、HTML和结构变化
+"""
+
+import os
+import tempfile
+
+import cffex_validator
+from cffex_cache import ResponseCache
+from cffex_spider import CFFEXSpider
+from cffex_validator import register_stub, validate_response
+
+STUB_FILES = ["IF_20240917.xml", "IF_20250912.xml", "IF_20250917.xml", "IF_20250917.csv"]
+SAMPLE_XML = "ccpm_IF_20250912_sample.xml"
+
+
+def load(filename):
+    with open(filename, 'rb') as f:
+        return f.read()
+
+
+def test_known_stubs():
+    """测试已知错误页面按大小和哈希直接识别"""
+    for filename in STUB_FILES:
+        check = validate_response(load(filename))
+        assert check.kind == "stub" and not check.ok, filename
+
+
+def test_classification():
+    """测试正常XML、无数据XML、HTML页面和空内容的识别"""
+    assert validate_response(load(SAMPLE_XML)).ok
+    assert validate_response('<?xml version="1.0" encoding="UTF-8"?>\n<positionRank>\n</positionRank>').ok
+    assert validate_response(load("cffex_ccpm_page.html")).kind == "html"
+    assert validate_response(load(SAMPLE_XML), content_type="text/html; charset=gb2312").kind == "html"
+    assert validate_response(b"").kind == "empty"
+
+    other = b"<html><body>\xe6\x9c\x8d\xe5\x8a\xa1\xe5\x99\xa8\xe7\xb9\x81\xe5\xbf\x99</body></html>"
+    assert validate_response(other).kind == "html"
+    # 登记的错误页面对整个进程有效, 测试结束后恢复, 不影响之后的测试
+    known_stubs = dict(cffex_validator.KNOWN_STUBS)
+    try:
+        register_stub(other, "繁忙页面")
+        assert validate_response(other).reason.startswith("繁忙页面")
+    finally:
+        cffex_validator.KNOWN_STUBS.clear()
+        cffex_validator.KNOWN_STUBS.update(known_stubs)
+    assert validate_response(other).kind == "html"
+
+
+def test_schema_drift():
+    """测试根元素或data节点字段变化时报告结构变化"""
+    check = validate_response('<?xml version="1.0"?>\n<rankList><data/></rankList>')
+    assert check.kind == "drift" and "rankList" in check.reason
+
+    renamed = load(SAMPLE_XML).replace(b"<shortname>", b"<memberName>").replace(b"</shortname>", b"</memberName>")
+    check = validate_response(renamed)
+    assert check.kind == "drift" and "shortname" in check.reason
+
+
+def test_stub_not_cached_or_parsed():
+    """测试错误页面不解析也不写入缓存, 缓存中已有的错误页面也被拒绝"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = ResponseCache(os.path.join(tmpdir, "cache.db"))
+        spider = CFFEXSpider(fetch_mode="xml", cache=cache, offline=True)
+        try:
+            assert spider.load_xml_content("IF", "2025-09-17", load(STUB_FILES[2])) is None
+            assert cache.get("IF", "2025-09-17") is None
+
+            cache.put("IF", "2025-09-12", load(STUB_FILES[1]))
+            result = spider.get_product_data_xml("IF", "2025-09-12")
+            assert not result["success"] and not result["no_data"]
+        finally:
+            spider.close()
+
+
+if __name__ == "__main__":
+    print("响应内容校验功能测试")
+    print("=" * 50)
+    for test in [test_known_stubs, test_classification, test_schema_drift, test_stub_not_cached_or_parsed]:
+        test()
+        print(f"✅ {test.__doc__}")
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+历史结果读取功能测试脚本
+使用仓库中保存的各种文件, 验证格式识别、统一读取为RankingRecord和一次性迁移
+"""
+
+import csv
+import os
+import tempfile
+
+from cffex_pipeline import AmountCsvSink, SQLiteSink
+from cffex_reader import detect_format, iter_archive, migrate_archive, read_records
+from cffex_spider import CFFEXSpider
+
+
+def volume_ranking(records):
+    return {r.rank: (r.member_name, r.volume, r.change) for r in records if r.ranking_type.value == "volume_ranking"}
+
+
+def test_detect_format():
+    """测试按内容识别各种文件格式"""
+    assert detect_format("ccpm_IF_20250912_sample.xml") == "xml"
+    assert detect_format("debug_page_IF.html") == "html"
+    assert detect_format("cffex_data_20250917_170852.csv") == "csv_sections"
+    assert detect_format("IF_range_2025-09-08_to_2025-09-12.csv") == "csv_flat"
+    for stub in ["IF_20240917.xml", "IF_20250912.xml", "IF_20250917.xml", "IF_20250917.csv"]:
+        assert detect_format(stub) == "stub"
+        assert list(read_records(stub)) == []
+
+
+def test_csv_and_xml_agree():
+    """测试分段CSV与原始XML读取出相同的成交量排名"""
+    csv_records = list(read_records("cffex_data_20250917_170852.csv"))
+    assert {(r.date, r.product_id) for r in csv_records} == {("2025-09-12", "IF")}
+
+    xml_records = [r for r in read_records("ccpm_IF_20250912_sample.xml") if r.instrument_id == "IF2509"]
+    assert {r.date for r in xml_records} == {"2025-09-12"}
+    assert len(csv_records) == 63
+    assert volume_ranking(csv_records) == volume_ranking(xml_records)
+
+
+def test_flat_csv_and_html():
+    """测试平铺CSV和调试页面的读取"""
+    records = list(read_records("IF_range_2025-09-08_to_2025-09-12.csv"))
+    assert len({r.date for r in records}) == 5
+    assert all(r.product_id == "IF" for r in records)
+
+    page_records = list(read_records("debug_page_IM.html", date="2025-09-12"))
+    assert {r.instrument_id[:2] for r in page_records} == {"IM"}
+    assert all(r.date == "2025-09-12" and r.product_id == "IM" for r in page_records)
+
+
+def test_legacy_excel():
+    """测试save_to_excel的Table_N工作表"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "legacy.xlsx")
+        rows = [{"名次": "1", "会员简称": "中信期货(代客)", "持买单量": "6,277", "比上交易日增减": "1317"},
+                {"名次": "合计", "会员简称": "", "持买单量": "6,277", "比上交易日增减": "1317"}]
+        spider = CFFEXSpider(fetch_mode="xml", cache=None)
+        try:
+            spider.save_to_excel({"success": True, "product_id": "IF", "date": "2025-09-12",
+                                  "data": [{"rows": rows}]}, path)
+        finally:
+            spider.close()
+        records = list(read_records(path))
+        assert [(r.ranking_type.value, r.rank, r.volume, r.date, r.product_id) for r in records] == [
+            ("buy_position_ranking", 1, 6277, "2025-09-12", "IF"),
+            ("buy_position_ranking", None, 6277, "2025-09-12", "IF"),
+        ]
+
+
+def test_migrate_archive():
+    """测试把多个历史文件一次性迁移到数据仓库, 包括XML中的汇总数据"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        sink = SQLiteSink(os.path.join(tmpdir, "rankings.db"))
+        files = ["ccpm_IF_20250912_sample.xml", "IF_20250912.xml", "IF_range_2025-09-08_to_2025-09-12.csv"]
+        amounts_path = os.path.join(tmpdir, "amounts.csv")
+        written = migrate_archive(files, [sink, AmountCsvSink(amounts_path)], buffer_size=100)
+        assert written == len(list(iter_archive(files)))
+        warehouse = sink.warehouse
+        try:
+            dates = warehouse.query_rankings(product_id="IF")["date"].unique().tolist()
+            assert dates == ["2025-09-08", "2025-09-09", "2025-09-10", "2025-09-11", "2025-09-12"]
+            # XML中按会员类别汇总的数据同时迁移
+            amounts = warehouse.query_position_amounts(product_id="IF")
+            assert len(amounts) == 4 and set(amounts["date"]) == {"2025-09-12"}
+        finally:
+            warehouse.close()
+        with open(amounts_path, encoding="utf-8-sig") as f:
+            assert len(list(csv.DictReader(f))) == 4
+
+
+if __name__ == "__main__":
+    print("历史结果读取功能测试")
+    print("=" * 50)
+    for test in [test_detect_format, test_csv_and_xml_agree, test_flat_csv_and_html, test_legacy_excel,
+                 test_migrate_archive]:
+        test()
+        print(f"✅ {test.__doc__}")
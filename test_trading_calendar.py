@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+交易日历功能测试脚本
+"""
+
+import os
+import tempfile
+
+from cffex_calendar import MODULE_DIR, TradingCalendar
+
+
+def test_weekends_and_holidays():
+    """测试跳过周末和休市日"""
+    calendar = TradingCalendar(no_data_file=None)
+    # 2024-09-14/15为周末, 16/17为中秋休市
+    assert calendar.trading_days("2024-09-13", "2024-09-18") == ["2024-09-13", "2024-09-18"]
+    assert calendar.is_trading_day("2025-09-12")
+    assert not calendar.is_trading_day("2025-10-01")
+
+
+def test_learned_no_data_dates():
+    """测试学习到的无数据日期会被持久化并按产品跳过"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        no_data_file = os.path.join(tmpdir, "no_data.json")
+        calendar = TradingCalendar(no_data_file=no_data_file)
+        calendar.mark_no_data("2022-07-21", "IM")
+        assert not calendar.is_trading_day("2022-07-21", "IM")
+        assert calendar.is_trading_day("2022-07-21", "IF")
+
+        reloaded = TradingCalendar(no_data_file=no_data_file)
+        assert reloaded.trading_days("2022-07-21", "2022-07-22", "IM") == ["2022-07-22"]
+
+
+def test_default_files_from_other_directory():
+    """测试从其他目录运行时仍使用模块目录中的休市日文件和无数据日期缓存"""
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.chdir(tmpdir)
+        try:
+            calendar = TradingCalendar()
+        finally:
+            os.chdir(cwd)
+    assert not calendar.is_trading_day("2025-10-01")
+    assert os.path.dirname(calendar.no_data_file) == MODULE_DIR
+
+
+if __name__ == "__main__":
+    print("交易日历功能测试")
+    print("=" * 50)
+    for test in [test_weekends_and_holidays, test_learned_no_data_dates, test_default_files_from_other_directory]:
+        test()
+        print(f"✅ {test.__doc__}")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+XML直连获取功能测试脚本
+使用仓库中保存的XML样本, 不需要浏览器和网络
+"""
+
+import os
+import tempfile
+
+from cffex_cache import ResponseCache
+from cffex_models import RankingRecord, RankingType
+from cffex_spider import CFFEXSpider
+
+SAMPLE_XML = "ccpm_IF_20250912_sample.xml"
+STUB_XML = "IF_20250912.xml"
+
+
+def load(filename):
+    with open(filename, 'rb') as f:
+        return f.read()
+
+
+def test_build_xml_url():
+    """测试XML地址构造"""
+    spider = CFFEXSpider(fetch_mode="xml", cache=None)
+    try:
+        url = spider.build_xml_url("IF", "2025-09-12")
+        assert url == "http://www.cffex.com.cn/sj/ccpm/202509/12/IF.xml"
+        # XML模式下不应启动浏览器
+        assert spider._driver is None
+    finally:
+        spider.close()
+
+
+def test_parse_xml_data():
+    """测试XML解析结果与页面结构一致"""
+    spider = CFFEXSpider(fetch_mode="xml", cache=None)
+    try:
+        data = spider.parse_xml_data(load(SAMPLE_XML))
+        assert set(data) == {"volume_ranking", "buy_position_ranking", "sell_position_ranking"}
+
+        volume = data["volume_ranking"]
+        assert len(volume) == 21  # 20名 + 合计
+        assert volume[0] == RankingRecord(RankingType.VOLUME, 1, "中信期货(代客)", 28247, 2233,
+                                      instrument_id="IF2509", party_id="0006")
+        # 合计行与页面上显示的一致
+        assert volume[-1] == RankingRecord(RankingType.VOLUME, None, "", 116676, -42, instrument_id="IF2509")
+        assert data["sell_position_ranking"][-1].volume == 50959
+    finally:
+        spider.close()
+
+
+def test_parse_xml_contract_month():
+    """测试按合约月份选择合约"""
+    spider = CFFEXSpider(fetch_mode="xml", cache=None)
+    try:
+        data = spider.parse_xml_data(load(SAMPLE_XML), contract_month="2025-12")
+        assert data["volume_ranking"][-1].volume == 86107
+    finally:
+        spider.close()
+
+
+def test_parse_error_stub():
+    """测试错误页面不会被当作数据"""
+    spider = CFFEXSpider(fetch_mode="xml", cache=None)
+    try:
+        assert spider.parse_xml_data(load(STUB_XML)) is None
+    finally:
+        spider.close()
+
+
+def test_contracts_from_one_fetch():
+    """测试一次获取返回全部合约, 多个合约月份不重复请求"""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        cache = ResponseCache(os.path.join(tmpdir, "cache.db"))
+        cache.put("IF", "2025-09-12", load(SAMPLE_XML))
+        spider = CFFEXSpider(fetch_mode="xml", cache=cache, offline=True)
+        try:
+            result = spider.get_product_data("IF", "2025-09-12")
+            assert list(result["contracts"]) == ["IF2509", "IF2510", "IF2512", "IF2603"]
+            assert result["instrument_id"] == "IF2509"
+
+            results = spider.get_contracts_data("IF", "2025-09-12", ["2025-12", "2025-11"])
+            assert results["2025-12"]["instrument_id"] == "IF2512"
+            assert results["2025-12"]["data"]["volume_ranking"][-1].volume == 86107
+            assert not results["2025-11"]["success"]
+        finally:
+            spider.close()
+
+
+if __name__ == "__main__":
+    print("XML直连获取功能测试")
+    print("=" * 50)
+    for test in [test_build_xml_url, test_parse_xml_data, test_parse_xml_contract_month, test_parse_error_stub,
+                 test_contracts_from_one_fetch]:
+        test()
+        print(f"✅ {test.__doc__}")